@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+📊 Benchmark de /check-status: serialización cacheada, 304 y pydantic
+
+Mide peticiones por segundo de GET /check-status/{frame_id} sobre un frame
+completado, en proceso (ASGI, sin red), comparando:
+
+- legacy: FrameAnalysisResponse + BovinoModel validados y serializados por
+  FastAPI con el encoder JSON estándar (camino anterior)
+- cached: bytes JSON serializados una sola vez al completar el frame y
+  servidos con un Response crudo (camino actual)
+- 304: sondeo condicional con If-None-Match igual al ETag vigente
+
+Uso (desde server/):
+    python benchmarks/check_status_benchmark.py --requests 5000 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from PIL import Image
+
+import main
+
+
+def _register_legacy_route() -> None:
+    """Ruta con el camino de serialización anterior (solo para el benchmark)"""
+
+    @main.app.get("/bench/legacy-check-status/{frame_id}", response_model=main.FrameAnalysisResponse)
+    async def legacy_check_status(frame_id: str):
+        record = main.repository.obtener_frame(frame_id)
+        main.cleanup_old_frames()
+        return main.FrameAnalysisResponse(**record.to_response_dict(), hints=main.capture_advisor.hints())
+
+
+def _sample_jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), (120, 80, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+async def _completed_frame(client: httpx.AsyncClient) -> str:
+    """Enviar un frame y esperar a que termine su análisis"""
+    response = await client.post(
+        "/submit-frame/raw", content=_sample_jpeg(), headers={"Content-Type": "image/jpeg"}
+    )
+    frame_id = response.json()["frame_id"]
+    for _ in range(600):
+        status = (await client.get(f"/check-status/{frame_id}")).json()["status"]
+        if status not in ("pending", "processing"):
+            return frame_id
+        await asyncio.sleep(0.05)
+    raise RuntimeError(f"El frame {frame_id} no terminó a tiempo")
+
+
+async def _measure(client: httpx.AsyncClient, path: str, requests: int, concurrency: int,
+                   headers: Optional[dict] = None, expected_status: int = 200) -> dict:
+    latencies = []
+    body_bytes = []
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            body_bytes.append(len(response.content))
+            if response.status_code != expected_status:
+                raise RuntimeError(f"{path} respondió {response.status_code}")
+
+    per_worker = requests // concurrency
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "body_bytes": statistics.mean(body_bytes),
+    }
+
+
+async def run(requests: int, concurrency: int) -> None:
+    _register_legacy_route()
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            frame_id = await _completed_frame(client)
+
+            # Calentamiento de ambos caminos
+            await _measure(client, f"/bench/legacy-check-status/{frame_id}", 200, 1)
+            await _measure(client, f"/check-status/{frame_id}", 200, 1)
+
+            legacy = await _measure(client, f"/bench/legacy-check-status/{frame_id}", requests, concurrency)
+            cached = await _measure(client, f"/check-status/{frame_id}", requests, concurrency)
+            etag = (await client.get(f"/check-status/{frame_id}")).headers["ETag"]
+            not_modified = await _measure(client, f"/check-status/{frame_id}", requests, concurrency,
+                                          headers={"If-None-Match": etag}, expected_status=304)
+    finally:
+        await main.shutdown_event()
+
+    print("\n📊 BENCHMARK /check-status (frame completado)")
+    print("=" * 56)
+    print(f"   Peticiones: {requests}  Concurrencia: {concurrency}")
+    print(f"   {'camino':<10}{'req/s':>12}{'p50 ms':>12}{'p99 ms':>12}{'bytes':>10}")
+    for name, result in (("legacy", legacy), ("cached", cached), ("304", not_modified)):
+        print(f"   {name:<10}{result['rps']:>12.0f}{result['p50_ms']:>12.3f}"
+              f"{result['p99_ms']:>12.3f}{result['body_bytes']:>10.0f}")
+    print(f"\n🚀 Mejora: x{cached['rps'] / legacy['rps']:.2f} req/s (cached), "
+          f"x{not_modified['rps'] / legacy['rps']:.2f} req/s (304)")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de /check-status")
+    parser.add_argument("--requests", type=int, default=5000, help="Peticiones por camino")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes concurrentes")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+📊 Benchmark de tiempo de importación (arranque del proceso)
+
+Ejecuta ``python -X importtime -c "import <módulo>"`` en un proceso nuevo y
+reporta el tiempo acumulado por módulo. Falla (código 1) si se supera el
+presupuesto o si se cargan módulos pesados que deben importarse de forma
+perezosa (TensorFlow, OpenCV, PIL, psutil), para detectar regresiones.
+
+Uso (desde server/):
+    python benchmarks/import_time_benchmark.py
+    python benchmarks/import_time_benchmark.py --module publish_model --budget-ms 800
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+# Módulos que no deben cargarse al importar el servidor o las herramientas
+LAZY_MODULES = ("tensorflow", "keras", "cv2", "PIL", "psutil")
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    """
+    Importar el módulo en un proceso nuevo con -X importtime
+
+    Returns:
+        (tiempo de pared en ms, [(módulo, self_us, acumulado_us, profundidad)])
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{completed.stderr[-2000:]}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return wall_ms, entries
+
+
+def report(module: str, top: int, budget_ms: float) -> bool:
+    wall_ms, entries = measure(module)
+    total_us = sum(self_us for _, self_us, _, _ in entries)
+    loaded = {name.split(".")[0] for name, _, _, _ in entries}
+    heavy = [name for name in LAZY_MODULES if name in loaded]
+
+    print(f"\n📊 TIEMPO DE IMPORTACIÓN: {module}")
+    print("=" * 60)
+    print(f"   Proceso completo: {wall_ms:.0f} ms")
+    print(f"   Importaciones:    {total_us / 1000:.0f} ms ({len(entries)} módulos)")
+    print(f"\n   {'módulo':<44}{'acumulado ms':>14}")
+    # Paquetes de primer nivel (profundidad 1 respecto al módulo medido) más costosos
+    first_level = sorted((e for e in entries if e[3] <= 1), key=lambda e: e[2], reverse=True)
+    for name, _, cumulative_us, _ in first_level[:top]:
+        print(f"   {name:<44}{cumulative_us / 1000:>14.1f}")
+
+    ok = True
+    if heavy:
+        print(f"\n❌ Módulos pesados cargados al importar: {', '.join(heavy)}")
+        ok = False
+    if budget_ms and total_us / 1000 > budget_ms:
+        print(f"\n❌ Presupuesto excedido: {total_us / 1000:.0f} ms > {budget_ms:.0f} ms")
+        ok = False
+    if ok:
+        print("\n✅ Dentro del presupuesto y sin módulos pesados")
+    return ok
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de tiempo de importación")
+    parser.add_argument("--module", action="append",
+                        help="Módulo a importar (repetible; por defecto main)")
+    parser.add_argument("--top", type=int, default=15, help="Módulos a mostrar")
+    parser.add_argument("--budget-ms", type=float, default=1000.0,
+                        help="Presupuesto de importación en ms (0 para desactivar)")
+    args = parser.parse_args()
+
+    results = [report(module, args.top, args.budget_ms) for module in (args.module or ["main"])]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
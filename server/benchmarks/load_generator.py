@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+📊 Generador de carga: dispositivos virtuales con el protocolo del cliente
+
+Simula N teléfonos concurrentes que siguen el flujo real de la app Flutter:
+enviar un frame cada intervalo de captura (POST /submit-frame) y consultar
+su estado cada intervalo de sondeo (GET /check-status/{frame_id}) hasta un
+estado final o hasta ``maxFrameProcessingTime``. Usa un cliente HTTP
+asíncrono con pool de conexiones y reporta en JSON: throughput, latencia
+de extremo a extremo p50/p95/p99, espera en cola del servidor y tasas de
+error.
+
+Uso (desde server/):
+    # En proceso (ASGI, sin red)
+    python benchmarks/load_generator.py --in-process --devices 20 --duration 30
+    # Contra un servidor en marcha
+    python benchmarks/load_generator.py --url http://localhost:8000 --devices 50 --output carga.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+FINAL_STATUSES = ("completed", "failed", "superseded", "expired")
+
+
+def synthetic_jpegs(count: int, size: int) -> List[bytes]:
+    """Generar JPEGs sintéticos (ruido) para no enviar siempre la misma imagen"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, size=(size * 3 // 4, size, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, "JPEG", quality=80)
+        images.append(buffer.getvalue())
+    return images
+
+
+def sample_jpegs(directory: str) -> List[bytes]:
+    """Cargar JPEGs de ejemplo de un directorio"""
+    paths = sorted(Path(directory).glob("*.jp*g"))
+    if not paths:
+        raise FileNotFoundError(f"No hay imágenes JPEG en {directory}")
+    return [path.read_bytes() for path in paths]
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 2)}
+
+
+class LoadStats:
+    """Métricas acumuladas de todos los dispositivos virtuales"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.submit_errors = 0
+        self.poll_requests = 0
+        self.poll_errors = 0
+        self.client_timeouts = 0
+        self.statuses: Dict[str, int] = {}
+        self.submit_ms: List[float] = []
+        self.end_to_end_ms: List[float] = []
+        self.queue_wait_ms: List[float] = []
+
+
+class VirtualDevice:
+    """Un teléfono: captura, envía y sondea como la app"""
+
+    def __init__(self, index: int, client: httpx.AsyncClient, images: List[bytes],
+                 stats: LoadStats, args: argparse.Namespace):
+        self.device_id = f"loadgen-{index}"
+        self.client = client
+        self.images = images
+        self.stats = stats
+        self.args = args
+        self._polls: List[asyncio.Task] = []
+
+    async def run(self, stop_at: float) -> None:
+        # Desfase aleatorio para que los dispositivos no capturen sincronizados
+        await asyncio.sleep(random.uniform(0, self.args.capture_interval))
+        while time.monotonic() < stop_at:
+            started = time.monotonic()
+            frame_id = await self._submit()
+            if frame_id is not None:
+                self._polls.append(asyncio.create_task(self._poll(frame_id, started)))
+            await asyncio.sleep(max(0.0, self.args.capture_interval - (time.monotonic() - started)))
+        await asyncio.gather(*self._polls, return_exceptions=True)
+
+    async def _submit(self) -> Optional[str]:
+        image = random.choice(self.images)
+        headers = {"X-Device-Id": self.device_id}
+        if self.args.sessions:
+            headers["X-Session-Id"] = self.device_id
+        start = time.perf_counter()
+        try:
+            if self.args.raw:
+                response = await self.client.post(
+                    "/submit-frame/raw", content=image,
+                    headers={**headers, "Content-Type": "image/jpeg"}
+                )
+            else:
+                response = await self.client.post(
+                    "/submit-frame", files={"frame": ("frame.jpg", image, "image/jpeg")},
+                    headers=headers
+                )
+        except httpx.HTTPError:
+            self.stats.submit_errors += 1
+            return None
+        self.stats.submit_ms.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            self.stats.submit_errors += 1
+            return None
+        self.stats.submitted += 1
+        return response.json()["frame_id"]
+
+    async def _poll(self, frame_id: str, started: float) -> None:
+        deadline = started + self.args.max_processing_time
+        etag = None
+        delay = self.args.poll_interval
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            headers = {"If-None-Match": etag} if etag else {}
+            try:
+                response = await self.client.get(f"/check-status/{frame_id}", headers=headers)
+            except httpx.HTTPError:
+                self.stats.poll_errors += 1
+                continue
+            self.stats.poll_requests += 1
+            if response.status_code == 304:
+                continue
+            if response.status_code != 200:
+                self.stats.poll_errors += 1
+                continue
+
+            etag = response.headers.get("ETag")
+            body = response.json()
+            if self.args.follow_hints and body.get("hints"):
+                delay = body["hints"]["poll_delay_ms"] / 1000.0
+            status = body["status"]
+            if status in FINAL_STATUSES:
+                self._record_final(body, started)
+                return
+        self.stats.client_timeouts += 1
+
+    def _record_final(self, body: dict, started: float) -> None:
+        status = body["status"]
+        self.stats.statuses[status] = self.stats.statuses.get(status, 0) + 1
+        if status != "completed":
+            return
+        self.stats.end_to_end_ms.append((time.monotonic() - started) * 1000)
+        # Espera en cola del servidor: vida del frame menos el tiempo de inferencia
+        created = datetime.fromisoformat(body["created_at"])
+        updated = datetime.fromisoformat(body["updated_at"])
+        processing_ms = (body.get("result") or {}).get("processing_time_ms") or 0
+        self.stats.queue_wait_ms.append(max(0.0, (updated - created).total_seconds() * 1000 - processing_ms))
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    images = sample_jpegs(args.images) if args.images else synthetic_jpegs(8, args.image_size)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    timeout = httpx.Timeout(args.request_timeout)
+
+    app = None
+    if args.in_process:
+        import main as server
+        app = server.app
+        await server.startup_event()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://loadgen", timeout=timeout)
+    else:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)
+
+    stats = LoadStats()
+    try:
+        start = time.monotonic()
+        stop_at = start + args.duration
+        devices = [VirtualDevice(i, client, images, stats, args) for i in range(args.devices)]
+        await asyncio.gather(*(device.run(stop_at) for device in devices))
+        elapsed = time.monotonic() - start
+    finally:
+        await client.aclose()
+        if app is not None:
+            await server.shutdown_event()
+
+    completed = stats.statuses.get("completed", 0)
+    requests = stats.submitted + stats.submit_errors + stats.poll_requests + stats.poll_errors
+    errors = stats.submit_errors + stats.poll_errors
+    return {
+        "config": {
+            "target": "in-process" if args.in_process else args.url,
+            "devices": args.devices,
+            "duration_s": args.duration,
+            "capture_interval_s": args.capture_interval,
+            "poll_interval_s": args.poll_interval,
+            "follow_hints": args.follow_hints,
+            "raw_upload": args.raw,
+        },
+        "elapsed_s": round(elapsed, 2),
+        "frames_submitted": stats.submitted,
+        "frames_completed": completed,
+        "throughput_fps": round(completed / elapsed, 2),
+        "offered_fps": round(stats.submitted / elapsed, 2),
+        "final_statuses": stats.statuses,
+        "client_timeouts": stats.client_timeouts,
+        "http_requests": requests,
+        "poll_requests": stats.poll_requests,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "timeout_rate": round(stats.client_timeouts / stats.submitted, 4) if stats.submitted else 0.0,
+        "submit_ms": percentiles(stats.submit_ms),
+        "end_to_end_ms": percentiles(stats.end_to_end_ms),
+        "queue_wait_ms": percentiles(stats.queue_wait_ms),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Generador de carga con dispositivos virtuales")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://localhost:8000", help="URL del servidor")
+    target.add_argument("--in-process", action="store_true", help="Servir la app en proceso (sin red)")
+    parser.add_argument("--devices", type=int, default=10, help="Dispositivos virtuales concurrentes")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duración en segundos")
+    parser.add_argument("--capture-interval", type=float, default=3.0, help="frameCaptureInterval (s)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Intervalo de sondeo (s)")
+    parser.add_argument("--max-processing-time", type=float, default=10.0, help="maxFrameProcessingTime (s)")
+    parser.add_argument("--follow-hints", action="store_true", help="Usar poll_delay_ms de las respuestas")
+    parser.add_argument("--sessions", action="store_true", help="Enviar X-Session-Id por dispositivo")
+    parser.add_argument("--raw", action="store_true", help="Usar /submit-frame/raw en lugar de multipart")
+    parser.add_argument("--images", help="Directorio con JPEGs de ejemplo (por defecto sintéticos)")
+    parser.add_argument("--image-size", type=int, default=640, help="Ancho de los JPEGs sintéticos")
+    parser.add_argument("--max-connections", type=int, default=100, help="Tamaño del pool HTTP")
+    parser.add_argument("--request-timeout", type=float, default=30.0, help="Timeout por petición (s)")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla aleatoria")
+    parser.add_argument("--output", help="Guardar el reporte JSON en este archivo")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = asyncio.run(run_load(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+📊 Microbenchmarks de preprocesamiento e inferencia con líneas base por máquina
+
+Cubre las variantes que afectan a _preprocess_image y _predict_breed:
+
+- decode: PIL, PIL con draft (reducción DCT), OpenCV y tf.io por preset de
+  resolución de la cámara
+- resize: interpolaciones de PIL y OpenCV hasta IMAGE_SIZE
+- pipeline: camino actual (float32 / 255) frente a uint8 sin normalizar y
+  frente al tensor pre-redimensionado por el cliente
+- inference: model.predict frente a la llamada compilada (tf.function) por
+  tamaño de batch
+- postprocess: argmax + probabilidades + entidad, y serialización de la respuesta
+
+Las variantes cuya dependencia no está instalada (OpenCV, TensorFlow) se
+reportan como omitidas. Los resultados se guardan como línea base JSON por
+máquina en benchmarks/baselines/ y el modo compare marca regresiones por
+encima de un umbral (código de salida 1).
+
+Uso (desde server/):
+    python benchmarks/microbenchmarks.py run --save
+    python benchmarks/microbenchmarks.py compare --threshold 0.10
+    python benchmarks/microbenchmarks.py run --only decode,resize --repeat 50
+"""
+
+import argparse
+import io
+import json
+import platform
+import re
+import socket
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from PIL import Image
+
+from config.settings import Settings
+
+BASELINES_DIR = Path(__file__).resolve().parent / "baselines"
+
+# Resoluciones de ResolutionPreset del plugin camera de Flutter
+CAMERA_PRESETS = {
+    "low": (320, 240),
+    "medium": (720, 480),
+    "high": (1280, 720),
+    "veryHigh": (1920, 1080),
+}
+
+BATCH_SIZES = (1, 4, 8, 16)
+
+GROUPS = ("decode", "resize", "pipeline", "inference", "postprocess")
+
+
+class Skip(Exception):
+    """La variante no puede ejecutarse en esta máquina (dependencia ausente)"""
+
+
+def optional_import(name: str):
+    try:
+        return __import__(name)
+    except ImportError:
+        raise Skip(f"{name} no instalado")
+
+
+def synthetic_jpeg(width: int, height: int, quality: int = 85) -> bytes:
+    """JPEG con gradientes y ruido: se comprime como una foto, no como ruido puro"""
+    rng = np.random.default_rng(width * height)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int) -> Dict[str, float]:
+    """Mediana, p95 y mínimo en microsegundos"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1000.0)
+    samples.sort()
+    return {
+        "median_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 2),
+        "min_us": round(samples[0], 2),
+        "repeat": repeat,
+    }
+
+
+class Suite:
+    """Registro de variantes: nombre -> fábrica que devuelve la función a medir"""
+
+    def __init__(self, settings: Settings, model_path: Optional[str]):
+        self.settings = settings
+        self.size = settings.IMAGE_SIZE
+        self.model_path = model_path
+        self.jpegs = {preset: synthetic_jpeg(w, h) for preset, (w, h) in CAMERA_PRESETS.items()}
+        self._model = None
+        self.cases: Dict[str, Callable[[], Callable[[], object]]] = {}
+        self._register()
+
+    # ------------------------------------------------------------------ registro
+
+    def _register(self) -> None:
+        for preset, data in self.jpegs.items():
+            self.cases[f"decode/pil/{preset}"] = lambda data=data: self._decode_pil(data)
+            self.cases[f"decode/pil-draft/{preset}"] = lambda data=data: self._decode_pil_draft(data)
+            self.cases[f"decode/opencv/{preset}"] = lambda data=data: self._decode_opencv(data)
+            self.cases[f"decode/tf-io/{preset}"] = lambda data=data: self._decode_tf(data)
+
+        for name, method in (("nearest", Image.NEAREST), ("bilinear", Image.BILINEAR),
+                             ("bicubic", Image.BICUBIC), ("lanczos", Image.LANCZOS),
+                             ("box", Image.BOX)):
+            self.cases[f"resize/pil-{name}/medium"] = lambda method=method: self._resize_pil(method)
+        for name in ("nearest", "linear", "area", "cubic"):
+            self.cases[f"resize/opencv-{name}/medium"] = lambda name=name: self._resize_opencv(name)
+
+        self.cases["pipeline/current-float32/medium"] = self._pipeline_current
+        self.cases["pipeline/uint8/medium"] = self._pipeline_uint8
+        self.cases["pipeline/tensor-upload"] = self._pipeline_tensor
+
+        for batch in BATCH_SIZES:
+            self.cases[f"inference/predict/b{batch}"] = lambda batch=batch: self._predict(batch)
+            self.cases[f"inference/compiled/b{batch}"] = lambda batch=batch: self._compiled(batch)
+
+        self.cases["postprocess/entity"] = self._postprocess_entity
+        self.cases["postprocess/serialize"] = self._postprocess_serialize
+
+    # ------------------------------------------------------------------ decode
+
+    def _decode_pil(self, data: bytes):
+        def run():
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            return image
+        return run
+
+    def _decode_pil_draft(self, data: bytes):
+        size = self.size
+
+        def run():
+            image = Image.open(io.BytesIO(data))
+            image.draft("RGB", (size, size))
+            image.load()
+            return image
+        return run
+
+    def _decode_opencv(self, data: bytes):
+        cv2 = optional_import("cv2")
+
+        def run():
+            return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return run
+
+    def _decode_tf(self, data: bytes):
+        tf = optional_import("tensorflow")
+        tensor = tf.constant(data)
+
+        def run():
+            return tf.io.decode_jpeg(tensor, channels=3).numpy()
+        return run
+
+    # ------------------------------------------------------------------ resize
+
+    def _medium_rgb(self) -> Image.Image:
+        return Image.open(io.BytesIO(self.jpegs["medium"])).convert("RGB")
+
+    def _resize_pil(self, method: int):
+        image = self._medium_rgb()
+        size = (self.size, self.size)
+
+        def run():
+            return image.resize(size, method)
+        return run
+
+    def _resize_opencv(self, name: str):
+        cv2 = optional_import("cv2")
+        array = np.asarray(self._medium_rgb())
+        interpolation = {"nearest": cv2.INTER_NEAREST, "linear": cv2.INTER_LINEAR,
+                         "area": cv2.INTER_AREA, "cubic": cv2.INTER_CUBIC}[name]
+        size = (self.size, self.size)
+
+        def run():
+            return cv2.resize(array, size, interpolation=interpolation)
+        return run
+
+    # ------------------------------------------------------------------ pipeline
+
+    def _pipeline_current(self):
+        from data.datasources.tensorflow_datasource_impl import TensorFlowDataSourceImpl
+
+        datasource = TensorFlowDataSourceImpl()
+        data = self.jpegs["medium"]
+
+        def run():
+            return datasource._preprocess_image(data)
+        return run
+
+    def _pipeline_uint8(self):
+        data = self.jpegs["medium"]
+        size = (self.size, self.size)
+
+        def run():
+            image = Image.open(io.BytesIO(data)).convert("RGB").resize(size)
+            return np.asarray(image)[None, ...]
+        return run
+
+    def _pipeline_tensor(self):
+        """Frame ya redimensionado por el cliente (/submit-frame/tensor)"""
+        from data.datasources.tensorflow_datasource_impl import TensorFlowDataSourceImpl
+        from data.datasources.tensor_frame import encode_tensor_frame
+        from domain.entities.frame_record import FrameEncoding
+
+        datasource = TensorFlowDataSourceImpl()
+        pixels = np.asarray(self._medium_rgb().resize((self.size, self.size)))
+        data = encode_tensor_frame(pixels)
+
+        def run():
+            return datasource._preprocess_image(data, FrameEncoding.TENSOR)
+        return run
+
+    # ------------------------------------------------------------------ inference
+
+    def _load_model(self):
+        """Modelo real si existe; si no, la arquitectura de train_model.py sin pesos"""
+        if self._model is not None:
+            return self._model
+        tf = optional_import("tensorflow")
+        if self.model_path and Path(self.model_path).exists():
+            self._model = tf.keras.models.load_model(self.model_path)
+        else:
+            base = tf.keras.applications.MobileNetV2(
+                weights=None, include_top=False, input_shape=(self.size, self.size, 3)
+            )
+            self._model = tf.keras.Sequential([
+                base,
+                tf.keras.layers.GlobalAveragePooling2D(),
+                tf.keras.layers.Dense(256, activation="relu"),
+                tf.keras.layers.Dense(len(self.settings.BREED_CHARACTERISTICS) or 10,
+                                      activation="softmax"),
+            ])
+        return self._model
+
+    def _batch(self, batch: int) -> np.ndarray:
+        rng = np.random.default_rng(batch)
+        return rng.random((batch, self.size, self.size, 3), dtype=np.float32)
+
+    def _predict(self, batch: int):
+        model = self._load_model()
+        images = self._batch(batch)
+
+        def run():
+            return model.predict(images, verbose=0)
+        return run
+
+    def _compiled(self, batch: int):
+        tf = optional_import("tensorflow")
+        model = self._load_model()
+        call = tf.function(lambda x: model(x, training=False), reduce_retracing=True)
+        images = tf.constant(self._batch(batch))
+
+        def run():
+            return call(images).numpy()
+        return run
+
+    # ------------------------------------------------------------------ postprocess
+
+    def _prediction(self) -> Tuple[List[str], np.ndarray]:
+        breeds = list(self.settings.BREED_CHARACTERISTICS) or [f"raza_{i}" for i in range(10)]
+        logits = np.random.default_rng(1).random(len(breeds)).astype(np.float32)
+        return breeds, logits / logits.sum()
+
+    def _postprocess_entity(self):
+        from data.datasources.tensorflow_datasource_impl import TensorFlowDataSourceImpl
+
+        datasource = TensorFlowDataSourceImpl()
+        breeds, prediction = self._prediction()
+        image = self._batch(1)
+
+        def run():
+            index = int(np.argmax(prediction))
+            result = datasource.build_entity(breeds[index], float(prediction[index]), image)
+            result.probabilidades = {name: float(p) for name, p in zip(breeds, prediction)}
+            return result
+        return run
+
+    def _postprocess_serialize(self):
+        from data.datasources.tensorflow_datasource_impl import TensorFlowDataSourceImpl
+        from domain.entities.frame_record import FrameRecord, FrameStatus
+
+        datasource = TensorFlowDataSourceImpl()
+        breeds, prediction = self._prediction()
+        result = datasource.build_entity(breeds[0], float(prediction[0]))
+        record = FrameRecord(frame_id="bench", status=FrameStatus.COMPLETED, result=result)
+
+        def run():
+            return record.to_response_bytes()
+        return run
+
+    # ------------------------------------------------------------------ ejecución
+
+    def run(self, only: Optional[List[str]], repeat: int, warmup: int) -> Dict[str, dict]:
+        results = {}
+        for name, factory in self.cases.items():
+            if only and name.split("/", 1)[0] not in only:
+                continue
+            # La inferencia es órdenes de magnitud más lenta: menos repeticiones
+            case_repeat = max(5, repeat // 10) if name.startswith("inference/") else repeat
+            try:
+                fn = factory()
+                results[name] = measure(fn, case_repeat, warmup)
+                print(f"  {name:<34} {results[name]['median_us']:>12.1f} µs", file=sys.stderr)
+            except Skip as e:
+                results[name] = {"skipped": str(e)}
+                print(f"  {name:<34} {'omitido':>12}  ({e})", file=sys.stderr)
+        return results
+
+
+def machine_info() -> dict:
+    info = {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pillow": Image.__version__,
+    }
+    for module in ("cv2", "tensorflow"):
+        try:
+            info[module] = __import__(module).__version__
+        except (ImportError, AttributeError):
+            info[module] = None
+    return info
+
+
+def default_baseline_path() -> Path:
+    """Una línea base por máquina: host y arquitectura"""
+    machine_id = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{socket.gethostname()}-{platform.machine()}")
+    return BASELINES_DIR / f"{machine_id}.json"
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Imprimir la comparación y devolver las variantes con regresión"""
+    regressions = []
+    print(f"{'variante':<34} {'base µs':>12} {'actual µs':>12} {'cambio':>9}")
+    for name, result in current.items():
+        base = baseline.get(name)
+        if "median_us" not in result or not base or "median_us" not in base:
+            continue
+        change = result["median_us"] / base["median_us"] - 1.0
+        flag = ""
+        if change > threshold:
+            flag = "  ⚠️ REGRESIÓN"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ✅ mejora"
+        print(f"{name:<34} {base['median_us']:>12.1f} {result['median_us']:>12.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks de preprocesamiento e inferencia")
+    parser.add_argument("mode", choices=("run", "compare"), help="run: medir; compare: medir y comparar")
+    parser.add_argument("--only", help=f"Grupos separados por comas ({', '.join(GROUPS)})")
+    parser.add_argument("--repeat", type=int, default=100, help="Repeticiones por variante")
+    parser.add_argument("--warmup", type=int, default=5, help="Iteraciones de calentamiento")
+    parser.add_argument("--model", help="Modelo .h5/.keras (por defecto MODEL_PATH)")
+    parser.add_argument("--baseline", help="Archivo de línea base (por defecto uno por máquina)")
+    parser.add_argument("--save", action="store_true", help="Guardar los resultados como línea base")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Regresión relativa tolerada en compare (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    settings = Settings()
+    only = [group.strip() for group in args.only.split(",")] if args.only else None
+    baseline_path = Path(args.baseline) if args.baseline else default_baseline_path()
+
+    baseline = None
+    if args.mode == "compare":
+        if not baseline_path.exists():
+            parser.error(f"No hay línea base en {baseline_path}; ejecutar primero 'run --save'")
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    print(f"📊 Microbenchmarks (IMAGE_SIZE={settings.IMAGE_SIZE})", file=sys.stderr)
+    suite = Suite(settings, args.model or settings.MODEL_PATH)
+    results = suite.run(only, args.repeat, args.warmup)
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "machine": machine_info(),
+        "image_size": settings.IMAGE_SIZE,
+        "results": results,
+    }
+
+    if args.save:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Línea base guardada en {baseline_path}", file=sys.stderr)
+
+    if baseline is None:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    if baseline.get("machine", {}).get("hostname") != report["machine"]["hostname"]:
+        print("⚠️ La línea base es de otra máquina: la comparación no es fiable", file=sys.stderr)
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} regresiones por encima del {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+    print("✅ Sin regresiones", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main_cli()
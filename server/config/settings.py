@@ -16,6 +16,33 @@ class Settings:
     MODEL_PATH: str = os.getenv("MODEL_PATH", "models/bovino_model.h5")
     LABELS_PATH: str = os.getenv("LABELS_PATH", "models/class_labels.json")
 
+    # Registro de modelos versionados (hot swap sin reiniciar)
+    MODEL_REGISTRY_DIR: str = os.getenv("MODEL_REGISTRY_DIR", "models/registry")
+    MODEL_VERSION: str = os.getenv("MODEL_VERSION", "")  # Vacío: la más nueva del registro
+    MODEL_REGISTRY_WATCH_SECONDS: float = float(os.getenv("MODEL_REGISTRY_WATCH_SECONDS", "0"))  # 0: sin vigilancia
+    # Frames recibidos antes de que el modelo esté listo: "queue" (esperan en cola) o "reject" (503)
+    PRE_READY_POLICY: str = os.getenv("PRE_READY_POLICY", "queue").lower()
+    PRE_READY_RETRY_AFTER_SECONDS: int = int(os.getenv("PRE_READY_RETRY_AFTER_SECONDS", "5"))
+    # Motor de inferencia: "keras" (.h5) o "tflite" (flatbuffer en mmap, compartido entre procesos)
+    MODEL_BACKEND: str = os.getenv("MODEL_BACKEND", "keras").lower()
+    TFLITE_CACHE_DIR: str = os.getenv("TFLITE_CACHE_DIR", "models/cache")
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")  # Vacío: endpoints de administración deshabilitados (403)
+
+    # Runtime de TensorFlow (0 / vacío: perfil de tune_tf_runtime.py o automático por topología)
+    TF_INTRA_OP_THREADS: int = int(os.getenv("TF_INTRA_OP_THREADS", "0"))
+    TF_INTER_OP_THREADS: int = int(os.getenv("TF_INTER_OP_THREADS", "0"))
+    TF_ONEDNN: str = os.getenv("TF_ONEDNN", "").lower()  # "on", "off" o vacío (por defecto de TF)
+    TF_KMP_AFFINITY: str = os.getenv("TF_KMP_AFFINITY", "")  # p. ej. "granularity=fine,compact,1,0"
+    TF_KMP_BLOCKTIME: str = os.getenv("TF_KMP_BLOCKTIME", "")
+    TF_RUNTIME_PROFILE: str = os.getenv("TF_RUNTIME_PROFILE", "models/tf_runtime_profile.json")
+
+    # Procesos del servidor (uvicorn --workers o serve_prefork.py): los núcleos se reparten entre todos
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Modo pre-fork: los workers comparten los pesos de un flatbuffer TFLite en mmap (MODEL_BACKEND=tflite)
+    PREFORK_SHARE_MODEL: bool = os.getenv("PREFORK_SHARE_MODEL", "True").lower() == "true"
+    PREFORK_REPORT_PATH: str = os.getenv("PREFORK_REPORT_PATH", "storage/prefork_memory.json")
+    PREFORK_REPORT_SECONDS: float = float(os.getenv("PREFORK_REPORT_SECONDS", "60"))
+
     # Configuración de imágenes
     IMAGE_SIZE: int = int(os.getenv("IMAGE_SIZE", "224"))
     BATCH_SIZE: int = int(os.getenv("BATCH_SIZE", "32"))
@@ -37,6 +64,38 @@ class Settings:
     # Configuración de cola de análisis
     MAX_QUEUE_SIZE: int = int(os.getenv("MAX_QUEUE_SIZE", "100"))
     FRAME_TIMEOUT_HOURS: int = int(os.getenv("FRAME_TIMEOUT_HOURS", "1"))
+    # Tamaño máximo del cuerpo en /submit-frame/raw
+    MAX_FRAME_BYTES: int = int(os.getenv("MAX_FRAME_BYTES", str(5 * 1024 * 1024)))
+
+    # Reglas de precisión por sesión (iguales a las del cliente Flutter)
+    PRECISION_MIN_CONFIDENCE: float = float(os.getenv("PRECISION_MIN_CONFIDENCE", "0.70"))
+    PRECISION_FINAL_CONFIDENCE: float = float(os.getenv("PRECISION_FINAL_CONFIDENCE", "0.95"))
+
+    # Planificador de frames (workers concurrentes de análisis)
+    SCHEDULER_WORKERS: int = int(os.getenv("SCHEDULER_WORKERS", "2"))
+    # Vida útil de un frame si el cliente no envía X-Deadline-Ms (maxFrameProcessingTime del cliente)
+    FRAME_DEADLINE_SECONDS: float = float(os.getenv("FRAME_DEADLINE_SECONDS", "10"))
+
+    # Recomendaciones de captura para el cliente (valores base sin carga)
+    CAPTURE_INTERVAL_MS: int = int(os.getenv("CAPTURE_INTERVAL_MS", "3000"))
+    MAX_CAPTURE_INTERVAL_MS: int = int(os.getenv("MAX_CAPTURE_INTERVAL_MS", "15000"))
+    POLL_DELAY_MS: int = int(os.getenv("POLL_DELAY_MS", "2000"))
+    MAX_POLL_DELAY_MS: int = int(os.getenv("MAX_POLL_DELAY_MS", "10000"))
+
+    # Ensamble temporal por sesión (media móvil ponderada por confianza)
+    ENSEMBLE_ENABLED: bool = os.getenv("ENSEMBLE_ENABLED", "True").lower() == "true"
+    ENSEMBLE_ALPHA: float = float(os.getenv("ENSEMBLE_ALPHA", "0.5"))
+
+    # Almacén de estado de frames: "memory" (un worker) o "sqlite" (varios workers)
+    FRAME_STORE_BACKEND: str = os.getenv("FRAME_STORE_BACKEND", "memory").lower()
+    FRAME_STORE_PATH: str = os.getenv("FRAME_STORE_PATH", "")
+
+    # Historial de análisis: "memory" o "sqlite" (persistente, modo WAL)
+    REPOSITORY_BACKEND: str = os.getenv("REPOSITORY_BACKEND", "memory").lower()
+    HISTORY_CAPACITY: int = int(os.getenv("HISTORY_CAPACITY", "100000"))
+    HISTORY_DB_PATH: str = os.getenv("HISTORY_DB_PATH", "storage/analysis_history.db")
+    HISTORY_FLUSH_INTERVAL_MS: float = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "5"))
+    HISTORY_BATCH_MAX: int = int(os.getenv("HISTORY_BATCH_MAX", "500"))
 
     # Configuración de razas bovinas (datos estáticos del dominio)
     BOVINE_BREEDS = [
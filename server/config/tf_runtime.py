@@ -0,0 +1,236 @@
+"""
+Configuración del runtime de TensorFlow según la topología de CPU
+
+Reparte los núcleos disponibles entre los workers de análisis de todos los
+procesos del servidor (WEB_CONCURRENCY) para que los thread pools
+intra/inter-op de TensorFlow no se sobresuscriban, y fija oneDNN y la
+afinidad de OpenMP/KMP. Prioridad de cada valor:
+
+1. Settings (variables de entorno explícitas)
+2. Perfil escrito por tune_tf_runtime.py (TF_RUNTIME_PROFILE)
+3. Valores automáticos a partir de la topología
+
+Las variables de entorno se aplican antes de importar TensorFlow
+(apply_environment) y los thread pools al cargar el modelo
+(configure_tensorflow).
+"""
+
+import os
+import json
+import logging
+from typing import Optional
+
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Configuración aplicada en este proceso (None hasta apply_environment)
+_current: Optional[dict] = None
+_threads_configured = False
+
+
+def _cgroup_cpu_limit() -> Optional[int]:
+    """Límite de CPU del contenedor (cgroup v2 cpu.max), si lo hay"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        return None
+    if quota == "max":
+        return None
+    return max(1, int(int(quota) // int(period)))
+
+
+def _physical_core_count() -> Optional[int]:
+    """
+    Núcleos físicos según sysfs (Linux) o /proc/cpuinfo
+
+    Sin psutil: este módulo se importa al cargar main y psutil debe cargarse
+    de forma perezosa. None si la plataforma no expone la topología.
+    """
+    allowed = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    cores = set()
+    try:
+        for entry in os.scandir("/sys/devices/system/cpu"):
+            name = entry.name
+            if not (name.startswith("cpu") and name[3:].isdigit()):
+                continue
+            if allowed is not None and int(name[3:]) not in allowed:
+                continue
+            topology = os.path.join(entry.path, "topology")
+            with open(os.path.join(topology, "physical_package_id"), "r") as f:
+                package = f.read().strip()
+            with open(os.path.join(topology, "core_id"), "r") as f:
+                core = f.read().strip()
+            cores.add((package, core))
+    except OSError:
+        cores = set()
+    if cores:
+        return len(cores)
+
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            blocks = f.read().split("\n\n")
+    except OSError:
+        return None
+    for block in blocks:
+        fields = dict(
+            (key.strip(), value.strip())
+            for key, _, value in (line.partition(":") for line in block.splitlines())
+        )
+        if "physical id" in fields and "core id" in fields:
+            cores.add((fields["physical id"], fields["core id"]))
+    return len(cores) or None
+
+
+def cpu_topology() -> dict:
+    """CPUs lógicas utilizables, núcleos físicos y límite del contenedor"""
+    if hasattr(os, "sched_getaffinity"):
+        logical = len(os.sched_getaffinity(0))
+    else:
+        logical = os.cpu_count() or 1
+
+    physical = _physical_core_count() or os.cpu_count() or logical
+
+    cgroup_limit = _cgroup_cpu_limit()
+    cores = min(physical, logical, cgroup_limit or logical)
+    return {
+        "logical_cpus": logical,
+        "physical_cores": physical,
+        "cgroup_cpu_limit": cgroup_limit,
+        "cores": cores,
+    }
+
+
+def load_profile(path: str, topology: Optional[dict] = None,
+                 backend: Optional[str] = None) -> Optional[dict]:
+    """
+    Leer el perfil del auto-tuner
+
+    Se ignora si no existe, no es válido, se midió en otra topología de CPU
+    o con otro backend de inferencia (MODEL_BACKEND).
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Perfil de runtime ilegible ({path}): {e}")
+        return None
+
+    topology = topology or cpu_topology()
+    measured = profile.get("topology", {})
+    if measured.get("cores") != topology["cores"]:
+        logger.warning(
+            f"⚠️ Perfil de runtime medido con {measured.get('cores')} núcleos "
+            f"(hay {topology['cores']}); se ignora"
+        )
+        return None
+    measured_backend = profile.get("backend", "keras")
+    if backend is not None and measured_backend != backend:
+        logger.warning(
+            f"⚠️ Perfil de runtime medido con el backend {measured_backend} "
+            f"(MODEL_BACKEND={backend}); se ignora"
+        )
+        return None
+    return profile
+
+
+def resolve_runtime_config(settings: Settings, profile: Optional[dict] = None,
+                           use_profile: bool = True) -> dict:
+    """Calcular la configuración efectiva (Settings > perfil > automático)"""
+    topology = cpu_topology()
+    if profile is None and use_profile:
+        profile = load_profile(settings.TF_RUNTIME_PROFILE, topology, settings.MODEL_BACKEND)
+    best = (profile or {}).get("best", {})
+
+    # Los workers solo vienen del perfil si no se fijaron explícitamente
+    if "SCHEDULER_WORKERS" in os.environ or not best.get("workers"):
+        workers = settings.SCHEDULER_WORKERS
+    else:
+        workers = int(best["workers"])
+    workers = max(1, workers)
+
+    # Núcleos por worker de inferencia, contando todos los procesos del servidor
+    processes = max(1, settings.WEB_CONCURRENCY)
+    share = max(1, topology["cores"] // (workers * processes))
+    profile_intra = best.get("intra_op_threads")
+    measured_processes = max(1, int((profile or {}).get("processes", 1)))
+    if profile_intra and processes > measured_processes and int(profile_intra) > share:
+        # El perfil se midió con menos procesos: sus hilos no caben en cada uno
+        logger.info(
+            f"🧵 Perfil medido con {measured_processes} proceso(s) y {profile_intra} hilos; "
+            f"con {processes} procesos se limitan a {share}"
+        )
+        profile_intra = share
+    intra = settings.TF_INTRA_OP_THREADS or profile_intra or share
+    inter = settings.TF_INTER_OP_THREADS or best.get("inter_op_threads") or 1
+
+    return {
+        "intra_op_threads": int(intra),
+        "inter_op_threads": int(inter),
+        "workers": workers,
+        "processes": processes,
+        "onednn": settings.TF_ONEDNN or best.get("onednn", ""),
+        "kmp_affinity": settings.TF_KMP_AFFINITY or best.get("kmp_affinity", ""),
+        "kmp_blocktime": settings.TF_KMP_BLOCKTIME or best.get("kmp_blocktime", ""),
+        "profile": settings.TF_RUNTIME_PROFILE if profile else None,
+        "topology": topology,
+    }
+
+
+def apply_environment(config: dict, override: bool = False) -> dict:
+    """
+    Exportar la configuración a las variables que TensorFlow y OpenMP leen al cargarse
+
+    Debe llamarse antes de importar TensorFlow. Sin override, una variable
+    ya presente en el entorno del proceso se respeta.
+    """
+    global _current
+
+    env = {
+        "TF_NUM_INTRAOP_THREADS": str(config["intra_op_threads"]),
+        "TF_NUM_INTEROP_THREADS": str(config["inter_op_threads"]),
+        "OMP_NUM_THREADS": str(config["intra_op_threads"]),
+    }
+    if config["onednn"] in ("on", "off"):
+        env["TF_ENABLE_ONEDNN_OPTS"] = "1" if config["onednn"] == "on" else "0"
+    if config["kmp_affinity"]:
+        env["KMP_AFFINITY"] = config["kmp_affinity"]
+    if config["kmp_blocktime"]:
+        env["KMP_BLOCKTIME"] = str(config["kmp_blocktime"])
+
+    for name, value in env.items():
+        if override:
+            os.environ[name] = value
+        else:
+            os.environ.setdefault(name, value)
+
+    _current = dict(config)
+    logger.info(
+        f"🧵 Runtime TF: intra={config['intra_op_threads']} inter={config['inter_op_threads']} "
+        f"workers={config['workers']} oneDNN={config['onednn'] or 'por defecto'} "
+        f"({'perfil' if config['profile'] else 'automático'}, {config['topology']['cores']} núcleos)"
+    )
+    return _current
+
+
+def configure_tensorflow(tf) -> None:
+    """Fijar los thread pools de TensorFlow (antes de que el runtime se inicialice)"""
+    global _threads_configured
+
+    if _current is None or _threads_configured:
+        return
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(_current["intra_op_threads"])
+        tf.config.threading.set_inter_op_parallelism_threads(_current["inter_op_threads"])
+    except RuntimeError:
+        # Runtime ya inicializado: rigen las variables de entorno exportadas antes
+        logger.debug("Thread pools de TensorFlow ya inicializados")
+    _threads_configured = True
+
+
+def current_config() -> Optional[dict]:
+    """Configuración aplicada en este proceso"""
+    return _current
@@ -3,7 +3,15 @@ Fuentes de datos - Implementaciones concretas
 """
 
 from .tensorflow_datasource_impl import TensorFlowDataSourceImpl
+from .model_registry import ModelRegistry
+from .frame_state_store import FrameStateStore
+from .in_memory_frame_state_store import InMemoryFrameStateStore
+from .sqlite_frame_state_store import SQLiteFrameStateStore
 
 __all__ = [
-    'TensorFlowDataSourceImpl'
-] 
\ No newline at end of file
+    'TensorFlowDataSourceImpl',
+    'ModelRegistry',
+    'FrameStateStore',
+    'InMemoryFrameStateStore',
+    'SQLiteFrameStateStore'
+]
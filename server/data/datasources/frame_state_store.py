@@ -0,0 +1,114 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import logging
+
+from domain.entities.frame_record import FrameRecord, FrameStatus
+from domain.entities.session_entity import SessionEntity
+
+logger = logging.getLogger(__name__)
+
+
+class FrameStateStore(ABC):
+    """Contrato del almacén de estado de frames (registros FrameRecord)"""
+
+    @abstractmethod
+    def put(self, record: FrameRecord) -> None:
+        """Guardar (o reemplazar) el registro de un frame"""
+        pass
+
+    @abstractmethod
+    def get(self, frame_id: str) -> Optional[FrameRecord]:
+        """
+        Obtener el registro de un frame
+
+        Returns:
+            FrameRecord con el estado del frame, None si no existe
+        """
+        pass
+
+    def get_cached_response(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float, Optional[bytes]]]:
+        """
+        Obtener en una sola lectura la versión, el estado y la respuesta
+        ya serializada de un frame, de modo que el ETag siempre corresponde
+        al cuerpo
+
+        Returns:
+            (versión, estado, updated_at, bytes JSON cacheados o None si el
+            frame sigue activo), None si el frame no existe
+        """
+        record = self.get(frame_id)
+        if record is None:
+            return None
+        return record.version, record.status, record.updated_at, record.response_body
+
+    def get_version(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float]]:
+        """
+        Obtener la versión y el estado de un frame sin leer el registro completo
+
+        Returns:
+            (versión, estado, updated_at), None si el frame no existe
+        """
+        record = self.get(frame_id)
+        return (record.version, record.status, record.updated_at) if record is not None else None
+
+    @abstractmethod
+    def update(self, frame_id: str, **fields) -> bool:
+        """
+        Actualizar campos del registro de un frame
+
+        Cada actualización incrementa la versión del registro, salvo cuando
+        solo se guarda la respuesta serializada (no cambia el estado).
+
+        Returns:
+            True si el frame existía y fue actualizado
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, frame_id: str) -> bool:
+        """Eliminar el registro de un frame"""
+        pass
+
+    @abstractmethod
+    def count_by_status(self) -> Dict[str, int]:
+        """Contar frames agrupados por estado (nombre del estado)"""
+        pass
+
+    @abstractmethod
+    def remove_older_than(self, cutoff: datetime) -> List[str]:
+        """
+        Eliminar frames creados antes de la fecha de corte (y las sesiones
+        sin actividad desde entonces)
+
+        Returns:
+            Lista de IDs de frames eliminados
+        """
+        pass
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[SessionEntity]:
+        """Obtener el estado de una sesión de filmación"""
+        pass
+
+    @abstractmethod
+    def put_session(self, session: SessionEntity) -> bool:
+        """
+        Guardar el estado de una sesión si nadie lo modificó desde que se leyó
+
+        Compara session.version con la almacenada (0: la sesión no debe
+        existir); si coinciden guarda e incrementa session.version.
+
+        Returns:
+            True si se guardó, False si otra escritura llegó antes
+        """
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """Número total de frames almacenados"""
+        pass
+
+    def close(self) -> None:
+        """Liberar recursos del almacén"""
+        pass
@@ -0,0 +1,94 @@
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+
+from domain.entities.frame_record import FrameRecord, FrameStatus
+from domain.entities.session_entity import SessionEntity
+from .frame_state_store import FrameStateStore
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryFrameStateStore(FrameStateStore):
+    """Almacén de estado de frames en memoria del proceso (un solo worker)"""
+
+    def __init__(self):
+        self._frames: Dict[str, FrameRecord] = {}
+        self._sessions: Dict[str, SessionEntity] = {}
+        self._lock = threading.Lock()
+        logger.info("🧠 InMemoryFrameStateStore inicializado")
+
+    def put(self, record: FrameRecord) -> None:
+        with self._lock:
+            self._frames[record.frame_id] = record
+
+    def get(self, frame_id: str) -> Optional[FrameRecord]:
+        # Se devuelve el propio registro: no hay segunda copia del estado
+        return self._frames.get(frame_id)
+
+    def get_version(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float]]:
+        record = self._frames.get(frame_id)
+        return (record.version, record.status, record.updated_at) if record is not None else None
+
+    def get_cached_response(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float, Optional[bytes]]]:
+        # Bajo el lock: update asigna los campos de uno en uno
+        with self._lock:
+            record = self._frames.get(frame_id)
+            if record is None:
+                return None
+            return record.version, record.status, record.updated_at, record.response_body
+
+    def update(self, frame_id: str, **fields) -> bool:
+        with self._lock:
+            record = self._frames.get(frame_id)
+            if record is None:
+                return False
+            for name, value in fields.items():
+                setattr(record, name, value)
+            if fields.keys() != {"response_body"}:
+                record.version += 1
+            return True
+
+    def delete(self, frame_id: str) -> bool:
+        with self._lock:
+            return self._frames.pop(frame_id, None) is not None
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for record in self._frames.values():
+                label = record.status.label
+                counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    def remove_older_than(self, cutoff: datetime) -> List[str]:
+        cutoff_ts = cutoff.timestamp()
+        with self._lock:
+            removed = [frame_id for frame_id, record in self._frames.items()
+                       if record.created_at < cutoff_ts]
+            for frame_id in removed:
+                del self._frames[frame_id]
+            stale_sessions = [session_id for session_id, session in self._sessions.items()
+                              if session.updated_at < cutoff_ts]
+            for session_id in stale_sessions:
+                del self._sessions[session_id]
+        return removed
+
+    def get_session(self, session_id: str) -> Optional[SessionEntity]:
+        return self._sessions.get(session_id)
+
+    def put_session(self, session: SessionEntity) -> bool:
+        # get_session devuelve la propia entidad: en un solo proceso el lock por
+        # sesión del caso de uso serializa las escrituras y la versión detecta
+        # una sesión creada dos veces
+        with self._lock:
+            stored = self._sessions.get(session.session_id)
+            if (stored.version if stored is not None else 0) != session.version:
+                return False
+            session.version += 1
+            self._sessions[session.session_id] = session
+            return True
+
+    def size(self) -> int:
+        return len(self._frames)
@@ -0,0 +1,125 @@
+import os
+import re
+import shutil
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(version: str) -> list:
+    """Orden natural de versiones ("v10" va después de "v9")"""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", version)]
+
+
+class ModelRegistry:
+    """
+    Registro de modelos versionados
+
+    Cada versión es un directorio ``<raíz>/<versión>/`` con el modelo
+    (``bovino_model.h5`` o ``bovino_model.keras``) y sus etiquetas
+    (``class_labels.json``). Solo se consideran las versiones completas;
+    ``publish`` copia el paquete a un directorio temporal y lo renombra,
+    de modo que una versión nunca se ve a medio copiar.
+    """
+
+    MODEL_FILENAMES = ("bovino_model.h5", "bovino_model.keras")
+    LABELS_FILENAME = "class_labels.json"
+
+    def __init__(self, root_dir: str = "models/registry"):
+        self.root_dir = root_dir
+
+    @staticmethod
+    def _validate_version(version: str) -> None:
+        if not version or version.startswith(".") or os.sep in version or "/" in version:
+            raise ValueError(f"Nombre de versión no válido: {version!r}")
+
+    def _model_file(self, version_dir: str) -> Optional[str]:
+        for filename in self.MODEL_FILENAMES:
+            path = os.path.join(version_dir, filename)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def versions(self) -> List[str]:
+        """Versiones completas disponibles, de la más antigua a la más nueva"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        versions = []
+        for name in os.listdir(self.root_dir):
+            version_dir = os.path.join(self.root_dir, name)
+            if name.startswith(".") or not os.path.isdir(version_dir):
+                continue
+            if self._model_file(version_dir) and os.path.exists(os.path.join(version_dir, self.LABELS_FILENAME)):
+                versions.append(name)
+        return sorted(versions, key=_version_key)
+
+    def latest(self) -> Optional[str]:
+        """Versión más nueva disponible"""
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def is_newer(self, version: str, than: Optional[str]) -> bool:
+        """Comparar dos versiones según el orden del registro"""
+        return than is None or _version_key(version) > _version_key(than)
+
+    def bundle_paths(self, version: str) -> Tuple[str, str]:
+        """
+        Rutas del modelo y las etiquetas de una versión
+
+        Raises:
+            FileNotFoundError: si la versión no existe o está incompleta
+        """
+        self._validate_version(version)
+        version_dir = os.path.join(self.root_dir, version)
+        model_path = self._model_file(version_dir)
+        labels_path = os.path.join(version_dir, self.LABELS_FILENAME)
+        if model_path is None or not os.path.exists(labels_path):
+            raise FileNotFoundError(f"Versión de modelo no encontrada o incompleta: {version}")
+        return model_path, labels_path
+
+    def modified_at(self, version: str) -> Optional[float]:
+        """
+        Última modificación de una versión (directorio o cualquiera de sus ficheros)
+
+        Sirve para detectar que una versión que falló al cargar se ha vuelto a
+        copiar o se ha completado. None si la versión no existe.
+        """
+        self._validate_version(version)
+        version_dir = os.path.join(self.root_dir, version)
+        try:
+            mtimes = [os.stat(version_dir).st_mtime]
+            with os.scandir(version_dir) as entries:
+                mtimes.extend(entry.stat().st_mtime for entry in entries)
+        except FileNotFoundError:
+            return None
+        return max(mtimes)
+
+    def publish(self, version: str, model_path: str, labels_path: str) -> str:
+        """
+        Publicar un modelo y sus etiquetas como nueva versión (renombrado atómico)
+
+        Returns:
+            Directorio de la versión publicada
+        """
+        self._validate_version(version)
+        version_dir = os.path.join(self.root_dir, version)
+        if os.path.exists(version_dir):
+            raise FileExistsError(f"La versión ya existe: {version}")
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        staging_dir = os.path.join(self.root_dir, f".{version}.{os.getpid()}.tmp")
+        os.makedirs(staging_dir)
+        try:
+            model_name = os.path.basename(model_path)
+            if model_name not in self.MODEL_FILENAMES:
+                model_name = self.MODEL_FILENAMES[0] if model_path.endswith(".h5") else self.MODEL_FILENAMES[1]
+            shutil.copy2(model_path, os.path.join(staging_dir, model_name))
+            shutil.copy2(labels_path, os.path.join(staging_dir, self.LABELS_FILENAME))
+            os.rename(staging_dir, version_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"📦 Modelo publicado en el registro: {version}")
+        return version_dir
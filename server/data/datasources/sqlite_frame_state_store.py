@@ -0,0 +1,350 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+
+from domain.entities.bovino_entity import BovinoEntity
+from domain.entities.frame_record import FrameEncoding, FrameRecord, FrameStatus
+from domain.entities.session_entity import SessionEntity
+from .frame_state_store import FrameStateStore
+
+logger = logging.getLogger(__name__)
+
+
+def default_frame_store_path() -> str:
+    """Ruta por defecto: tmpfs (/dev/shm) si existe, si no el directorio temporal"""
+    base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base_dir, "bovino_frame_state.db")
+
+
+class SQLiteFrameStateStore(FrameStateStore):
+    """
+    Almacén de estado de frames compartido entre procesos
+
+    Usa SQLite en modo WAL (idealmente sobre tmpfs) para que varios workers
+    de uvicorn vean los mismos frames sin un balanceador con afinidad.
+    """
+
+    # Versión del esquema (PRAGMA user_version); _MIGRATIONS lleva cada versión a la siguiente
+    _SCHEMA_VERSION = 8
+
+    # v1 guardaba el estado como texto: se reconstruye la tabla con el estado entero
+    _STATUS_FROM_TEXT = "CASE status {} ELSE {} END".format(
+        " ".join(f"WHEN '{status.label}' THEN {int(status)}" for status in FrameStatus),
+        int(FrameStatus.FAILED),
+    )
+    _MIGRATIONS = {
+        2: (
+            "ALTER TABLE frames RENAME TO frames_v1",
+            """
+            CREATE TABLE frames (
+                frame_id TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                image_content BLOB,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                result TEXT,
+                error TEXT
+            )
+            """,
+            f"INSERT INTO frames SELECT frame_id, {_STATUS_FROM_TEXT}, image_content, created_at, "
+            f"updated_at, result, error FROM frames_v1",
+            "DROP TABLE frames_v1",
+        ),
+        3: (
+            "ALTER TABLE frames ADD COLUMN session_id TEXT",
+            "ALTER TABLE frames ADD COLUMN session_result TEXT",
+            "ALTER TABLE frames ADD COLUMN session_locked INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE frames ADD COLUMN inference_skipped INTEGER NOT NULL DEFAULT 0",
+            """
+            CREATE TABLE sessions (
+                session_id TEXT PRIMARY KEY,
+                best_result TEXT,
+                locked INTEGER NOT NULL,
+                frames_seen INTEGER NOT NULL,
+                inferences_skipped INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """,
+        ),
+        4: (
+            "ALTER TABLE frames ADD COLUMN fused_result TEXT",
+            "ALTER TABLE sessions ADD COLUMN fused_probabilities TEXT",
+        ),
+        5: (
+            "ALTER TABLE frames ADD COLUMN response_body BLOB",
+        ),
+        6: (
+            "ALTER TABLE frames ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+            # Las respuestas cacheadas no incluían la versión: se regeneran
+            "UPDATE frames SET response_body = NULL",
+        ),
+        7: (
+            "ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+        ),
+        8: (
+            "ALTER TABLE frames ADD COLUMN encoding INTEGER NOT NULL DEFAULT 0",
+        ),
+    }
+
+    _COLUMNS = ("frame_id", "status", "image_content", "created_at",
+                "updated_at", "result", "error", "session_id",
+                "session_result", "session_locked", "inference_skipped",
+                "fused_result", "response_body", "encoding", "version")
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or default_frame_store_path()
+        self._local = threading.local()
+        self._create_schema()
+        logger.info(f"🗄️ SQLiteFrameStateStore inicializado en: {self.db_path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexión por hilo y por proceso (las conexiones no sobreviven a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self) -> None:
+        """
+        Crear o migrar el esquema
+
+        Todo ocurre dentro de BEGIN IMMEDIATE: si varios workers arrancan a
+        la vez, solo uno migra y los demás esperan y ven la versión nueva.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._migrate(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        if current > self._SCHEMA_VERSION:
+            logger.warning(f"⚠️ {self.db_path} tiene el esquema v{current}, más nuevo que v{self._SCHEMA_VERSION}")
+            return
+        has_frames = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'frames'"
+        ).fetchone() is not None
+        if has_frames and current < self._SCHEMA_VERSION:
+            # Una base anterior a user_version tiene el esquema v1
+            for version in range(max(current, 1) + 1, self._SCHEMA_VERSION + 1):
+                for statement in self._MIGRATIONS[version]:
+                    conn.execute(statement)
+            logger.info(f"🗄️ Esquema migrado de v{max(current, 1)} a v{self._SCHEMA_VERSION}")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS frames (
+                frame_id TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                image_content BLOB,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                result TEXT,
+                error TEXT,
+                session_id TEXT,
+                session_result TEXT,
+                session_locked INTEGER NOT NULL DEFAULT 0,
+                inference_skipped INTEGER NOT NULL DEFAULT 0,
+                fused_result TEXT,
+                response_body BLOB,
+                version INTEGER NOT NULL DEFAULT 1,
+                encoding INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_frames_created_at ON frames(created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_frames_status ON frames(status)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                best_result TEXT,
+                locked INTEGER NOT NULL,
+                frames_seen INTEGER NOT NULL,
+                inferences_skipped INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                fused_probabilities TEXT,
+                version INTEGER NOT NULL DEFAULT 1
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+        conn.execute(f"PRAGMA user_version = {self._SCHEMA_VERSION}")
+
+    @staticmethod
+    def _encode(column: str, value):
+        """Convertir un valor del registro a su representación en SQLite"""
+        if value is None:
+            return None
+        if column in ("status", "session_locked", "inference_skipped", "encoding"):
+            return int(value)
+        if column in ("result", "session_result", "fused_result"):
+            return json.dumps(value.to_dict())
+        return value
+
+    @staticmethod
+    def _decode(row: tuple) -> FrameRecord:
+        """Convertir una fila de SQLite en un FrameRecord"""
+        return FrameRecord(
+            frame_id=row[0],
+            status=FrameStatus(row[1]),
+            image_content=bytes(row[2]) if row[2] is not None else None,
+            created_at=row[3],
+            updated_at=row[4],
+            result=BovinoEntity.from_dict(json.loads(row[5])) if row[5] is not None else None,
+            error=row[6],
+            session_id=row[7],
+            session_result=BovinoEntity.from_dict(json.loads(row[8])) if row[8] is not None else None,
+            session_locked=bool(row[9]),
+            inference_skipped=bool(row[10]),
+            fused_result=BovinoEntity.from_dict(json.loads(row[11])) if row[11] is not None else None,
+            response_body=bytes(row[12]) if row[12] is not None else None,
+            encoding=FrameEncoding(row[13]),
+            version=row[14]
+        )
+
+    def put(self, record: FrameRecord) -> None:
+        values = [self._encode(column, getattr(record, column)) for column in self._COLUMNS]
+        self._connection().execute(
+            f"INSERT OR REPLACE INTO frames ({', '.join(self._COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in self._COLUMNS)})",
+            values,
+        )
+
+    def get(self, frame_id: str) -> Optional[FrameRecord]:
+        row = self._connection().execute(
+            f"SELECT {', '.join(self._COLUMNS)} FROM frames WHERE frame_id = ?",
+            (frame_id,),
+        ).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def get_cached_response(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float, Optional[bytes]]]:
+        # Versión y cuerpo en la misma fila: sin decodificar los resultados JSON
+        row = self._connection().execute(
+            "SELECT version, status, updated_at, response_body FROM frames WHERE frame_id = ?",
+            (frame_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], FrameStatus(row[1]), row[2], bytes(row[3]) if row[3] is not None else None
+
+    def get_version(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float]]:
+        row = self._connection().execute(
+            "SELECT version, status, updated_at FROM frames WHERE frame_id = ?", (frame_id,)
+        ).fetchone()
+        return (row[0], FrameStatus(row[1]), row[2]) if row is not None else None
+
+    def update(self, frame_id: str, **fields) -> bool:
+        unknown = set(fields) - set(self._COLUMNS[1:-1])
+        if unknown:
+            raise ValueError(f"Campos de frame desconocidos: {sorted(unknown)}")
+        if not fields:
+            return self.get(frame_id) is not None
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        if fields.keys() != {"response_body"}:
+            assignments += ", version = version + 1"
+        values = [self._encode(column, value) for column, value in fields.items()]
+        cursor = self._connection().execute(
+            f"UPDATE frames SET {assignments} WHERE frame_id = ?",
+            (*values, frame_id),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, frame_id: str) -> bool:
+        cursor = self._connection().execute(
+            "DELETE FROM frames WHERE frame_id = ?", (frame_id,)
+        )
+        return cursor.rowcount > 0
+
+    def count_by_status(self) -> Dict[str, int]:
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) FROM frames GROUP BY status"
+        ).fetchall()
+        return {FrameStatus(status).label: count for status, count in rows}
+
+    def remove_older_than(self, cutoff: datetime) -> List[str]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT frame_id FROM frames WHERE created_at < ?", (cutoff.timestamp(),)
+            ).fetchall()
+            conn.execute("DELETE FROM frames WHERE created_at < ?", (cutoff.timestamp(),))
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff.timestamp(),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [row[0] for row in rows]
+
+    def get_session(self, session_id: str) -> Optional[SessionEntity]:
+        row = self._connection().execute(
+            "SELECT session_id, best_result, locked, frames_seen, inferences_skipped, updated_at, "
+            "fused_probabilities, version FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return SessionEntity(
+            session_id=row[0],
+            best_result=BovinoEntity.from_dict(json.loads(row[1])) if row[1] is not None else None,
+            locked=bool(row[2]),
+            frames_seen=row[3],
+            inferences_skipped=row[4],
+            updated_at=row[5],
+            probabilidades_fusionadas=json.loads(row[6]) if row[6] is not None else None,
+            version=row[7]
+        )
+
+    def put_session(self, session: SessionEntity) -> bool:
+        values = (
+            json.dumps(session.best_result.to_dict()) if session.best_result is not None else None,
+            int(session.locked),
+            session.frames_seen,
+            session.inferences_skipped,
+            session.updated_at,
+            json.dumps(session.probabilidades_fusionadas)
+            if session.probabilidades_fusionadas is not None else None,
+        )
+        if session.version == 0:
+            # Sesión nueva: si otro proceso ya la creó, no se inserta
+            cursor = self._connection().execute(
+                "INSERT OR IGNORE INTO sessions (best_result, locked, frames_seen, inferences_skipped, "
+                "updated_at, fused_probabilities, session_id, version) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                (*values, session.session_id),
+            )
+        else:
+            # Compare-and-swap sobre la versión leída
+            cursor = self._connection().execute(
+                "UPDATE sessions SET best_result = ?, locked = ?, frames_seen = ?, inferences_skipped = ?, "
+                "updated_at = ?, fused_probabilities = ?, version = version + 1 "
+                "WHERE session_id = ? AND version = ?",
+                (*values, session.session_id, session.version),
+            )
+        if cursor.rowcount == 0:
+            return False
+        session.version += 1
+        return True
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM frames").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
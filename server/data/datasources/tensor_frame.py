@@ -0,0 +1,120 @@
+import struct
+from typing import Union
+
+import numpy as np
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Content-Type del frame pre-redimensionado por el cliente
+TENSOR_CONTENT_TYPE = "application/x-bovino-tensor"
+
+TENSOR_MAGIC = b"BVT1"
+
+# Cabecera little-endian de 16 bytes:
+#   magic (4) | alto u16 | ancho u16 | canales u8 | dtype u8 | códec u8 | reservado u8 | longitud del payload u32
+_HEADER = struct.Struct("<4sHHBBBBI")
+HEADER_SIZE = _HEADER.size
+
+DTYPE_UINT8 = 0
+
+CODEC_NONE = 0
+CODEC_LZ4 = 1
+CODEC_ZSTD = 2
+CODECS = {"none": CODEC_NONE, "lz4": CODEC_LZ4, "zstd": CODEC_ZSTD}
+
+
+class TensorFrameError(ValueError):
+    """Frame tensor con cabecera o tamaño inválidos"""
+
+
+class TensorCodecUnavailable(TensorFrameError):
+    """El códec de compresión del frame no está instalado en el servidor"""
+
+
+def is_tensor_frame(data: Buffer) -> bool:
+    """Distinguir un frame tensor de una imagen codificada (JPEG, PNG...)"""
+    return len(data) >= HEADER_SIZE and bytes(data[:4]) == TENSOR_MAGIC
+
+
+def encode_tensor_frame(pixels: np.ndarray, codec: str = "none") -> bytes:
+    """Serializar un array uint8 (alto, ancho, 3) con la cabecera del protocolo"""
+    if pixels.dtype != np.uint8 or pixels.ndim != 3:
+        raise TensorFrameError("Se espera un array uint8 de forma (alto, ancho, canales)")
+    height, width, channels = pixels.shape
+    payload = np.ascontiguousarray(pixels).tobytes()
+    codec_id = CODECS[codec]
+    if codec_id == CODEC_LZ4:
+        payload = _require(lz4_frame, "lz4").compress(payload)
+    elif codec_id == CODEC_ZSTD:
+        payload = _require(zstandard, "zstd").ZstdCompressor(level=1).compress(payload)
+    header = _HEADER.pack(TENSOR_MAGIC, height, width, channels, DTYPE_UINT8, codec_id, 0, len(payload))
+    return header + payload
+
+
+def decode_tensor_frame(data: Buffer, size: int, channels: int = 3) -> Buffer:
+    """
+    Validar un frame tensor y devolverlo sin comprimir
+
+    El frame debe ser de size x size x channels en uint8. Sin compresión se
+    devuelve el mismo buffer (sin copia); comprimido se descomprime con un
+    límite igual al tamaño esperado y se devuelve con la cabecera normalizada.
+
+    Raises:
+        TensorFrameError: cabecera, forma o longitud inválidas
+        TensorCodecUnavailable: códec no instalado en el servidor
+    """
+    if not is_tensor_frame(data):
+        raise TensorFrameError("Cabecera de frame tensor ausente o inválida")
+    _, height, width, frame_channels, dtype, codec, _, payload_len = _HEADER.unpack_from(data)
+    if (height, width, frame_channels) != (size, size, channels):
+        raise TensorFrameError(
+            f"Forma {height}x{width}x{frame_channels} no soportada (se espera {size}x{size}x{channels})"
+        )
+    if dtype != DTYPE_UINT8:
+        raise TensorFrameError(f"dtype {dtype} no soportado (solo uint8)")
+    if payload_len != len(data) - HEADER_SIZE:
+        raise TensorFrameError("La longitud del payload no coincide con la cabecera")
+
+    expected = height * width * frame_channels
+    if codec == CODEC_NONE:
+        if payload_len != expected:
+            raise TensorFrameError(f"Payload de {payload_len} bytes (se esperan {expected})")
+        return data
+
+    payload = data[HEADER_SIZE:]
+    if codec == CODEC_LZ4:
+        decompressor = _require(lz4_frame, "lz4").LZ4FrameDecompressor()
+        pixels = decompressor.decompress(bytes(payload), max_length=expected + 1)
+    elif codec == CODEC_ZSTD:
+        reader = _require(zstandard, "zstd").ZstdDecompressor().stream_reader(bytes(payload))
+        pixels = reader.read(expected + 1)
+    else:
+        raise TensorFrameError(f"Códec {codec} desconocido")
+    if len(pixels) != expected:
+        raise TensorFrameError(f"Payload descomprimido de {len(pixels)} bytes (se esperan {expected})")
+
+    header = _HEADER.pack(TENSOR_MAGIC, height, width, frame_channels, DTYPE_UINT8, CODEC_NONE, 0, expected)
+    return header + pixels
+
+
+def tensor_view(data: Buffer) -> np.ndarray:
+    """Vista sin copia (1, alto, ancho, canales) de un frame tensor sin comprimir"""
+    _, height, width, channels, _, _, _, _ = _HEADER.unpack_from(data)
+    return np.frombuffer(data, dtype=np.uint8, count=height * width * channels,
+                         offset=HEADER_SIZE).reshape(1, height, width, channels)
+
+
+def _require(module, name: str):
+    if module is None:
+        raise TensorCodecUnavailable(f"Compresión {name} no disponible en el servidor")
+    return module
@@ -3,6 +3,7 @@ from typing import Optional
 import logging
 
 from domain.entities.bovino_entity import BovinoEntity
+from domain.entities.frame_record import FrameEncoding
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +17,14 @@ class TensorFlowDataSource(ABC):
         pass
     
     @abstractmethod
-    async def analyze_bovino(self, image_data: bytes) -> BovinoEntity:
+    async def analyze_bovino(self, image_data: bytes,
+                             encoding: FrameEncoding = FrameEncoding.IMAGE) -> BovinoEntity:
         """
         Analizar una imagen de bovino
         
         Args:
             image_data: Datos de la imagen en bytes
+            encoding: Formato del contenido (imagen codificada o frame tensor validado)
             
         Returns:
             BovinoEntity con el resultado del análisis
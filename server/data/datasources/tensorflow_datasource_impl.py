@@ -1,31 +1,82 @@
-import tensorflow as tf
 import numpy as np
-import cv2
 import io
-from PIL import Image
 import json
 import logging
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 import random
 from datetime import datetime
 import asyncio
 import time
-import psutil
 
 from config.settings import Settings
+from config import tf_runtime
 from domain.entities.bovino_entity import BovinoEntity, BovinoDetectionResult
+from domain.entities.frame_record import FrameEncoding
 from .tensorflow_datasource import TensorFlowDataSource
+from .model_registry import ModelRegistry
+from .tensor_frame import tensor_view
+from .tflite_model import TFLiteModel, ensure_tflite
 
 logger = logging.getLogger(__name__)
 
 
+class _BufferReader(io.RawIOBase):
+    """Lector de solo lectura sobre un buffer sin copiarlo (a diferencia de io.BytesIO)"""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class LoadedModel:
+    """Modelo cargado con sus etiquetas; en un hot swap se reemplaza completo"""
+
+    __slots__ = ("version", "model", "class_labels", "breed_names", "loaded_at", "in_flight")
+
+    def __init__(self, version: str, model, class_labels: dict):
+        self.version = version
+        self.model = model
+        self.class_labels = class_labels
+        self.breed_names = list(class_labels.keys())
+        self.loaded_at = datetime.now()
+        # Inferencias en curso con este modelo (para drenarlo tras un swap)
+        self.in_flight = 0
+
+
 class TensorFlowDataSourceImpl(TensorFlowDataSource):
     """Implementación del datasource para TensorFlow"""
 
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None):
         self.settings = Settings()
-        self.model = None
-        self.class_labels = []
+        self.registry = registry
+        self._active: Optional[LoadedModel] = None
+        self._swap_lock = asyncio.Lock()
+        self.loading_version: Optional[str] = None
+        # Versión que falló al cargar -> marca de modificación en ese momento
+        self._failed_versions: Dict[str, Optional[float]] = {}
         self.model_ready = False
         self.total_analyses = 0
         self.start_time = datetime.now()
@@ -53,30 +104,45 @@ class TensorFlowDataSourceImpl(TensorFlowDataSource):
             "Gelbvieh": ["Dorado", "Mediano", "Cárnico", "Europeo"]
         }
 
+    # Vista del modelo activo (compatibilidad con el resto del datasource)
+    @property
+    def model(self):
+        return self._active.model if self._active is not None else None
+
+    @property
+    def class_labels(self) -> dict:
+        return self._active.class_labels if self._active is not None else {}
+
+    @property
+    def breed_names(self) -> List[str]:
+        return self._active.breed_names if self._active is not None else []
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._active.version if self._active is not None else None
+
+    def resolve_model_paths(self) -> Tuple[str, str, str]:
+        """Versión fijada, la más nueva del registro o el modelo por defecto"""
+        version = self.settings.MODEL_VERSION or None
+        if version is None and self.registry is not None:
+            version = self.registry.latest()
+
+        if version is not None:
+            model_path, labels_path = self.registry.bundle_paths(version)
+            return version, model_path, labels_path
+        return "default", self.settings.MODEL_PATH, self.settings.LABELS_PATH
+
     async def initialize_model(self) -> None:
         """Inicializar el modelo de TensorFlow"""
         try:
             logger.info("🤖 Inicializando modelo de TensorFlow...")
 
-            # Cargar modelo entrenado real
-            model_path = self.settings.MODEL_PATH
-            labels_path = self.settings.LABELS_PATH
-            
-            logger.info(f"📥 Cargando modelo desde: {model_path}")
-            logger.info(f"📋 Cargando etiquetas desde: {labels_path}")
-            
-            # Cargar modelo entrenado
-            self.model = tf.keras.models.load_model(model_path)
-            
-            # Cargar etiquetas de clases
-            with open(labels_path, 'r', encoding='utf-8') as f:
-                self.class_labels = json.load(f)
-            
-            # Convertir a lista de nombres de razas
-            self.breed_names = list(self.class_labels.keys())
+            version, model_path, labels_path = self.resolve_model_paths()
+            bundle = await asyncio.to_thread(self._load_bundle, version, model_path, labels_path)
+            self._active = bundle
 
             self.model_ready = True
-            logger.info(f"✅ Modelo cargado con {len(self.breed_names)} clases")
+            logger.info(f"✅ Modelo {version} cargado con {len(self.breed_names)} clases")
             logger.info(f"🐄 Razas: {self.breed_names}")
             
             self.is_initialized = True
@@ -86,46 +152,132 @@ class TensorFlowDataSourceImpl(TensorFlowDataSource):
             logger.error(f"❌ Error al inicializar modelo: {e}")
             raise
 
+    def _load_bundle(self, version: str, model_path: str, labels_path: str) -> LoadedModel:
+        """Cargar y calentar un modelo (se ejecuta fuera del event loop)"""
+        logger.info(f"📥 Cargando modelo {version} desde: {model_path}")
+        logger.info(f"📋 Cargando etiquetas desde: {labels_path}")
+
+        # Cargar modelo entrenado
+        if self.settings.MODEL_BACKEND == "tflite":
+            # Pesos en un mmap de solo lectura, compartidos con los demás procesos
+            runtime = tf_runtime.current_config() or {}
+            model = TFLiteModel(
+                ensure_tflite(model_path, self.settings.TFLITE_CACHE_DIR),
+                num_threads=runtime.get("intra_op_threads", 1),
+                max_interpreters=runtime.get("workers", self.settings.SCHEDULER_WORKERS),
+            )
+        else:
+            # TensorFlow se importa solo al cargar un modelo (arranque rápido del proceso)
+            import tensorflow as tf
+            tf_runtime.configure_tensorflow(tf)
+            model = tf.keras.models.load_model(model_path)
+
+        # Cargar etiquetas de clases
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            class_labels = json.load(f)
+
+        # Calentamiento: la primera predicción (trazado del grafo) no llega a las peticiones
+        size = self.settings.IMAGE_SIZE
+        model.predict(np.zeros((1, size, size, 3), dtype=np.float32), verbose="silent")
+
+        return LoadedModel(version, model, class_labels)
+
+    async def activate_version(self, version: str) -> str:
+        """
+        Cargar una versión del registro y activarla sin interrumpir el servicio
+
+        El modelo nuevo se carga y calienta en un hilo mientras el activo sigue
+        atendiendo; después se reemplaza la referencia (cada inferencia usa el
+        modelo que tomó al empezar) y el anterior se drena en segundo plano.
+
+        Returns:
+            Versión activa tras el cambio
+        """
+        if self.registry is None:
+            raise ValueError("No hay registro de modelos configurado")
+
+        async with self._swap_lock:
+            if self.model_version == version:
+                return version
+
+            model_path, labels_path = self.registry.bundle_paths(version)
+            # Una activación (explícita o tras un cambio en disco) vuelve a intentarlo
+            self._failed_versions.pop(version, None)
+            self.loading_version = version
+            try:
+                bundle = await asyncio.to_thread(self._load_bundle, version, model_path, labels_path)
+            except Exception:
+                self._failed_versions[version] = self.registry.modified_at(version)
+                raise
+            finally:
+                self.loading_version = None
+
+            previous = self._active
+            self._active = bundle
+            self.model_ready = True
+            logger.info(f"🔁 Modelo activo: {version} (anterior: {previous.version if previous else None})")
+
+            if previous is not None:
+                asyncio.create_task(self._drain(previous))
+            return version
+
+    async def _drain(self, bundle: LoadedModel) -> None:
+        """Esperar a que terminen las inferencias del modelo reemplazado y liberarlo"""
+        while bundle.in_flight > 0:
+            await asyncio.sleep(0.05)
+        logger.info(f"🧹 Modelo {bundle.version} drenado y liberado")
+
+    async def watch_registry(self, interval_seconds: float) -> None:
+        """Activar automáticamente las versiones nuevas que aparezcan en el registro"""
+        logger.info(f"👀 Vigilando el registro de modelos cada {interval_seconds}s")
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                latest = self.registry.latest()
+                if latest is None or not self.registry.is_newer(latest, self.model_version):
+                    continue
+                if (latest in self._failed_versions
+                        and self._failed_versions[latest] == self.registry.modified_at(latest)):
+                    continue  # Falló y no ha cambiado desde entonces
+                await self.activate_version(latest)
+            except Exception as e:
+                logger.error(f"❌ Error activando versión del registro: {e}")
+
 
 
     def is_model_ready(self) -> bool:
         """Verificar si el modelo está listo"""
         return self.model_ready
 
-    async def analyze_bovino(self, image_data: bytes) -> BovinoEntity:
+    async def analyze_bovino(self, image_data: bytes,
+                             encoding: FrameEncoding = FrameEncoding.IMAGE) -> BovinoEntity:
         """Analizar una imagen de bovino y retornar resultados"""
         try:
             if not self.model_ready:
                 raise Exception("Modelo no inicializado")
 
-            # Preprocesar la imagen
-            image = self._preprocess_image(image_data)
+            # Todo el análisis usa el modelo activo al empezar (hot swap seguro)
+            bundle = self._active
+            bundle.in_flight += 1
+            try:
+                # Preprocesar la imagen
+                image = self._preprocess_image(image_data, encoding)
 
-            # Realizar predicción
-            prediction = await self._predict_breed(image)
+                # Realizar predicción
+                prediction = await self._predict_breed(image, bundle)
+            finally:
+                bundle.in_flight -= 1
 
             # Obtener raza y confianza
             breed_index = np.argmax(prediction)
             confidence = float(prediction[breed_index])
-            breed = self.breed_names[breed_index]
-
-            # Obtener características de la raza
-            characteristics = self.settings.BREED_CHARACTERISTICS.get(breed, [])
-
-            # Estimar peso basado en la raza y características de la imagen
-            estimated_weight = self._estimate_weight(breed, confidence, image)
-
-            # Crear resultado
-            result = BovinoEntity(
-                raza=breed,
-                caracteristicas=characteristics,
-                confianza=confidence,
-                peso_estimado=estimated_weight,
-                timestamp=datetime.now(),
-                detection_result=BovinoDetectionResult.BOVINO_DETECTED,
-                precision_score=confidence,
-                processing_time_ms=0  # Se calculará en el use case
-            )
+            breed = bundle.breed_names[breed_index]
+
+            # Crear resultado (con el vector de probabilidades para el ensamble temporal)
+            result = self.build_entity(breed, confidence, image, model_version=bundle.version)
+            result.probabilidades = {
+                name: float(prob) for name, prob in zip(bundle.breed_names, prediction)
+            }
 
             self.total_analyses += 1
             logger.info(f"📊 Análisis #{self.total_analyses} completado")
@@ -136,11 +288,44 @@ class TensorFlowDataSourceImpl(TensorFlowDataSource):
             logger.error(f"Error en análisis de bovino: {e}")
             raise
 
-    def _preprocess_image(self, image_data: bytes) -> np.ndarray:
+    def build_entity(self, breed: str, confidence: float,
+                     image: Optional[np.ndarray] = None,
+                     model_version: Optional[str] = None) -> BovinoEntity:
+        """Construir el resultado de dominio para una raza y confianza dadas"""
+        # Obtener características de la raza
+        characteristics = self.settings.BREED_CHARACTERISTICS.get(breed, [])
+
+        # Estimar peso basado en la raza y características de la imagen
+        estimated_weight = self._estimate_weight(breed, confidence, image)
+
+        return BovinoEntity(
+            raza=breed,
+            caracteristicas=characteristics,
+            confianza=confidence,
+            peso_estimado=estimated_weight,
+            timestamp=datetime.now(),
+            detection_result=BovinoDetectionResult.BOVINO_DETECTED,
+            precision_score=confidence,
+            processing_time_ms=0,  # Se calculará en el use case
+            model_version=model_version or self.model_version
+        )
+
+    def _preprocess_image(self, image_data: Union[bytes, memoryview],
+                          encoding: FrameEncoding = FrameEncoding.IMAGE) -> np.ndarray:
         """Preprocesar imagen para el modelo"""
         try:
-            # Convertir bytes a imagen PIL
-            image = Image.open(io.BytesIO(image_data))
+            # Tensor ya redimensionado por el cliente y validado por su endpoint:
+            # vista sin copia, solo normalizar (nunca se deduce del contenido)
+            if encoding == FrameEncoding.TENSOR:
+                return tensor_view(image_data).astype(np.float32) / 255.0
+
+            from PIL import Image
+
+            # Decodificar directamente desde el buffer recibido (bytes o memoryview)
+            if isinstance(image_data, bytes):
+                image = Image.open(io.BytesIO(image_data))
+            else:
+                image = Image.open(io.BufferedReader(_BufferReader(image_data)))
 
             # Convertir a RGB si es necesario
             if image.mode != "RGB":
@@ -164,14 +349,17 @@ class TensorFlowDataSourceImpl(TensorFlowDataSource):
             logger.error(f"Error en preprocesamiento de imagen: {e}")
             raise
 
-    async def _predict_breed(self, image: np.ndarray) -> np.ndarray:
+    async def _predict_breed(self, image: np.ndarray,
+                             bundle: Optional[LoadedModel] = None) -> np.ndarray:
         """Realizar predicción de raza"""
         try:
-            if self.model is None:
+            bundle = bundle or self._active
+            if bundle is None or bundle.model is None:
                 raise Exception("Modelo no cargado")
                 
-            # Usar modelo real para predicción
-            prediction = self.model.predict(image, verbose="silent")
+            # Predicción fuera del event loop: los workers del planificador
+            # infieren en paralelo, cada uno con su parte de los núcleos
+            prediction = await asyncio.to_thread(bundle.model.predict, image, verbose="silent")
             return prediction[0]  # Retornar primera predicción
 
         except Exception as e:
@@ -215,15 +403,21 @@ class TensorFlowDataSourceImpl(TensorFlowDataSource):
         """Obtener información del modelo"""
         try:
             uptime = (datetime.now() - self.start_time).total_seconds()
+            import psutil
             memory_usage = psutil.Process().memory_info().rss / 1024 / 1024  # MB
 
             return {
                 "model_ready": self.model_ready,
+                "model_version": self.model_version,
+                "loading_version": self.loading_version,
+                "available_versions": self.registry.versions() if self.registry else [],
                 "total_analyses": self.total_analyses,
                 "uptime_seconds": int(uptime),
                 "memory_usage_mb": round(memory_usage, 2),
                 "class_labels": self.class_labels,
-                "breeds_supported": len(self.breeds)
+                "breeds_supported": len(self.breeds),
+                "backend": self.settings.MODEL_BACKEND,
+                "runtime": tf_runtime.current_config()
             }
         except Exception as e:
             logger.error(f"Error obteniendo información del modelo: {e}")
@@ -0,0 +1,133 @@
+"""
+Modelo TFLite de solo lectura, compartido entre procesos vía mmap
+
+El intérprete de TFLite abre el flatbuffer con mmap de solo lectura y usa
+los pesos directamente desde esas páginas (sin delegados por defecto: XNNPACK
+reempaqueta los pesos en memoria privada). Varios procesos que abren el mismo
+archivo comparten los pesos en la page cache, sin estado de TensorFlow
+heredado por fork.
+
+La conversión desde el .h5 de Keras se hace en un subproceso, de modo que
+quien la pide (el maestro de serve_prefork.py) no importa TensorFlow.
+
+Uso directo (conversión):
+    python -m data.datasources.tflite_model models/bovino_model.h5 models/cache/bovino_model.tflite
+"""
+
+import os
+import sys
+import queue
+import logging
+import threading
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = Path(__file__).resolve().parents[2]
+
+
+def tflite_path_for(model_path: str, cache_dir: str) -> str:
+    """Flatbuffer convertido; el nombre cambia si cambia el .h5"""
+    stat = os.stat(model_path)
+    name = Path(model_path).stem
+    return os.path.join(cache_dir, f"{name}-{stat.st_size}-{stat.st_mtime_ns}.tflite")
+
+
+def export_tflite(model_path: str, output_path: str) -> None:
+    """Convertir un modelo Keras a TFLite (importa TensorFlow en este proceso)"""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    flatbuffer = tf.lite.TFLiteConverter.from_keras_model(model).convert()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(flatbuffer)
+    os.replace(tmp_path, output_path)
+
+
+def ensure_tflite(model_path: str, cache_dir: str) -> str:
+    """Ruta del flatbuffer del modelo, convirtiéndolo en un subproceso si falta"""
+    output_path = tflite_path_for(model_path, cache_dir)
+    if os.path.exists(output_path):
+        return output_path
+
+    logger.info(f"🔄 Convirtiendo {model_path} a TFLite...")
+    completed = subprocess.run(
+        [sys.executable, "-m", "data.datasources.tflite_model", os.path.abspath(model_path),
+         os.path.abspath(output_path)],
+        cwd=SERVER_DIR, capture_output=True, text=True
+    )
+    if completed.returncode != 0 or not os.path.exists(output_path):
+        raise RuntimeError(f"No se pudo convertir {model_path} a TFLite:\n{completed.stderr[-2000:]}")
+    logger.info(f"✅ Modelo TFLite: {output_path} ({os.path.getsize(output_path) / 1024 ** 2:.1f} MB)")
+    return output_path
+
+
+class TFLiteModel:
+    """
+    Modelo con la interfaz predict() de Keras sobre intérpretes TFLite
+
+    Un intérprete no admite llamadas concurrentes: se crean bajo demanda
+    hasta max_interpreters (uno por worker de análisis) y se reutilizan. Todos
+    comparten los pesos del mismo mmap; cada uno solo añade su arena de
+    activaciones.
+    """
+
+    def __init__(self, path: str, num_threads: int = 1, max_interpreters: int = 1):
+        self.path = path
+        self.num_threads = num_threads
+        self.max_interpreters = max(1, max_interpreters)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_interpreter(self):
+        try:
+            # Runtime mínimo (Linux): el worker no carga todo TensorFlow
+            from tflite_runtime.interpreter import Interpreter, OpResolverType
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+            OpResolverType = tf.lite.experimental.OpResolverType
+
+        interpreter = Interpreter(
+            model_path=self.path,
+            num_threads=self.num_threads,
+            experimental_op_resolver_type=OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES,
+        )
+        interpreter.allocate_tensors()
+        return interpreter
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.max_interpreters
+            if create:
+                self._created += 1
+        if create:
+            return self._new_interpreter()
+        return self._idle.get()
+
+    def predict(self, x: np.ndarray, verbose=None, batch_size=None) -> np.ndarray:
+        interpreter = self._acquire()
+        try:
+            input_detail = interpreter.get_input_details()[0]
+            if tuple(input_detail["shape"]) != x.shape:
+                interpreter.resize_tensor_input(input_detail["index"], x.shape)
+                interpreter.allocate_tensors()
+            interpreter.set_tensor(input_detail["index"], np.asarray(x, dtype=input_detail["dtype"]))
+            interpreter.invoke()
+            return interpreter.get_tensor(interpreter.get_output_details()[0]["index"]).copy()
+        finally:
+            self._idle.put(interpreter)
+
+
+if __name__ == "__main__":
+    export_tflite(sys.argv[1], sys.argv[2])
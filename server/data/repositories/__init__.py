@@ -3,7 +3,9 @@ Repositorios de datos - Implementaciones concretas
 """
 
 from .bovino_repository_impl import BovinoRepositoryImpl
+from .sqlite_bovino_repository_impl import SQLiteBovinoRepositoryImpl
 
 __all__ = [
-    'BovinoRepositoryImpl'
-] 
\ No newline at end of file
+    'BovinoRepositoryImpl',
+    'SQLiteBovinoRepositoryImpl'
+]
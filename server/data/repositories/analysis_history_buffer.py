@@ -0,0 +1,129 @@
+import threading
+import logging
+from typing import Dict, List, Optional
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisHistoryBuffer:
+    """
+    Historial de análisis en memoria con capacidad fija
+
+    Buffer circular de columnas NumPy (26 bytes por registro): al llenarse
+    se sobrescriben los registros más antiguos y las estadísticas se
+    calculan como reducciones vectorizadas sobre las columnas.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        if capacity <= 0:
+            raise ValueError("La capacidad del historial debe ser positiva")
+        self.capacity = capacity
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.breed_index = np.zeros(capacity, dtype=np.int16)
+        self.confidence = np.zeros(capacity, dtype=np.float32)
+        self.weight = np.zeros(capacity, dtype=np.float32)
+        self.processing_ms = np.zeros(capacity, dtype=np.float32)
+        self.image_size = np.zeros(capacity, dtype=np.int32)
+        self.breed_names: List[str] = []
+        self._breed_lookup: Dict[str, int] = {}
+        self._next = 0
+        self._count = 0
+        self.total_recorded = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por las columnas"""
+        return sum(column.nbytes for column in (
+            self.timestamp, self.breed_index, self.confidence,
+            self.weight, self.processing_ms, self.image_size
+        ))
+
+    def _breed_to_index(self, breed: str) -> int:
+        index = self._breed_lookup.get(breed)
+        if index is None:
+            index = len(self.breed_names)
+            self.breed_names.append(breed)
+            self._breed_lookup[breed] = index
+        return index
+
+    def append(self, timestamp: datetime, breed: str, confidence: float,
+               weight: float, processing_ms: float, image_size: int) -> None:
+        """Agregar un registro, sobrescribiendo el más antiguo si está lleno"""
+        with self._lock:
+            i = self._next
+            self.timestamp[i] = timestamp.timestamp()
+            self.breed_index[i] = self._breed_to_index(breed)
+            self.confidence[i] = confidence
+            self.weight[i] = weight
+            self.processing_ms[i] = processing_ms
+            self.image_size[i] = image_size
+            self._next = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            self.total_recorded += 1
+
+    def _ordered_indices(self, limit: Optional[int] = None) -> np.ndarray:
+        """Índices de los registros vigentes en orden cronológico"""
+        count = self._count if limit is None else min(limit, self._count)
+        start = (self._next - count) % self.capacity
+        return (start + np.arange(count)) % self.capacity
+
+    def tail(self, limit: int = 10) -> List[dict]:
+        """Últimos registros en orden cronológico"""
+        with self._lock:
+            indices = self._ordered_indices(limit)
+            return [
+                {
+                    "timestamp": datetime.fromtimestamp(float(self.timestamp[i])),
+                    "raza": self.breed_names[self.breed_index[i]],
+                    "confianza": float(self.confidence[i]),
+                    "peso_estimado": float(self.weight[i]),
+                    "processing_time_ms": float(self.processing_ms[i]),
+                    "image_size": int(self.image_size[i]),
+                }
+                for i in indices
+            ]
+
+    def statistics(self, success_threshold: float = 0.5) -> dict:
+        """Estadísticas vectorizadas sobre los registros vigentes"""
+        with self._lock:
+            n = self._count
+            if n == 0:
+                return {
+                    "total_analyses": 0,
+                    "successful_analyses": 0,
+                    "success_rate": 0,
+                    "last_analysis": None,
+                    "average_confidence": 0.0,
+                    "average_weight_kg": 0.0,
+                    "average_processing_time_ms": 0.0,
+                    "average_image_size": 0.0,
+                    "breed_counts": {},
+                }
+
+            # Con el buffer lleno todas las posiciones son válidas; si no, las primeras n
+            confidence = self.confidence[:n]
+            successful = int(np.count_nonzero(confidence > success_threshold))
+            breed_counts = np.bincount(self.breed_index[:n], minlength=len(self.breed_names))
+            last_index = (self._next - 1) % self.capacity
+
+            return {
+                "total_analyses": n,
+                "successful_analyses": successful,
+                "success_rate": successful / n * 100,
+                "last_analysis": datetime.fromtimestamp(float(self.timestamp[last_index])),
+                "average_confidence": float(confidence.mean(dtype=np.float64)),
+                "average_weight_kg": float(self.weight[:n].mean(dtype=np.float64)),
+                "average_processing_time_ms": float(self.processing_ms[:n].mean(dtype=np.float64)),
+                "average_image_size": float(self.image_size[:n].mean(dtype=np.float64)),
+                "breed_counts": {
+                    name: int(count)
+                    for name, count in zip(self.breed_names, breed_counts) if count
+                },
+            }
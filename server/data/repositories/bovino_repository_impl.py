@@ -1,11 +1,17 @@
 import logging
-from typing import Optional
+import time
+from typing import Optional, Tuple
 from datetime import datetime, timedelta
 
 from domain.entities.bovino_entity import BovinoEntity
 from domain.entities.analysis_entity import AnalysisEntity, AnalysisStatus
+from domain.entities.frame_record import FrameEncoding, FrameRecord, FrameStatus
+from domain.entities.session_entity import SessionEntity
 from domain.repositories.bovino_repository import BovinoRepository
 from data.datasources.tensorflow_datasource_impl import TensorFlowDataSourceImpl
+from data.datasources.frame_state_store import FrameStateStore
+from data.datasources.in_memory_frame_state_store import InMemoryFrameStateStore
+from .analysis_history_buffer import AnalysisHistoryBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +19,17 @@ logger = logging.getLogger(__name__)
 class BovinoRepositoryImpl(BovinoRepository):
     """Implementación del repositorio de bovino"""
     
-    def __init__(self, datasource: TensorFlowDataSourceImpl):
+    def __init__(self, datasource: TensorFlowDataSourceImpl,
+                 frame_store: Optional[FrameStateStore] = None,
+                 history_capacity: Optional[int] = 100_000):
         self.datasource = datasource
-        self.analysis_history = []
-        self.analysis_storage = {}  # Almacenamiento en memoria para análisis
+        # Historial acotado en columnas NumPy (buffer circular); None si una
+        # subclase guarda el historial en otro sitio
+        self.analysis_history: Optional[AnalysisHistoryBuffer] = (
+            AnalysisHistoryBuffer(history_capacity) if history_capacity is not None else None
+        )
+        # Estado de frames compartido con main.py (en memoria o entre procesos)
+        self.frame_store = frame_store or InMemoryFrameStateStore()
         logger.info("🔧 BovinoRepositoryImpl inicializado")
     
     async def initialize(self) -> None:
@@ -28,21 +41,20 @@ class BovinoRepositoryImpl(BovinoRepository):
             logger.error(f"❌ Error al inicializar repositorio: {e}")
             raise
     
-    async def analizar_frame(self, frame_id: str, image_data: bytes) -> BovinoEntity:
+    async def analizar_frame(self, frame_id: str, image_data: bytes,
+                             session_id: Optional[str] = None,
+                             encoding: FrameEncoding = FrameEncoding.IMAGE) -> BovinoEntity:
         """Analizar un frame de bovino"""
         try:
             logger.info(f"🔍 Iniciando análisis de frame: {frame_id}")
             
             # Delegar el análisis al datasource
-            result = await self.datasource.analyze_bovino(image_data)
+            start_time = time.perf_counter()
+            result = await self.datasource.analyze_bovino(image_data, encoding)
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
             
             # Guardar en historial
-            self.analysis_history.append({
-                'timestamp': datetime.now(),
-                'result': result,
-                'image_size': len(image_data),
-                'frame_id': frame_id
-            })
+            self._registrar_historial(frame_id, result, len(image_data), elapsed_ms, session_id)
             
             logger.info(f"✅ Análisis completado: {result.raza} ({result.confianza:.2f}%)")
             return result
@@ -51,10 +63,99 @@ class BovinoRepositoryImpl(BovinoRepository):
             logger.error(f"❌ Error en análisis de frame {frame_id}: {e}")
             raise
     
+    def _registrar_historial(self, frame_id: str, result: BovinoEntity,
+                             image_size: int, elapsed_ms: float,
+                             session_id: Optional[str] = None) -> None:
+        """Registrar un análisis completado en el historial"""
+        if self.analysis_history is None:
+            return
+        self.analysis_history.append(
+            timestamp=datetime.now(),
+            breed=result.raza,
+            confidence=result.confianza,
+            weight=result.peso_estimado,
+            processing_ms=elapsed_ms,
+            image_size=image_size
+        )
+    
+    @staticmethod
+    def _analysis_fields(analysis: AnalysisEntity) -> dict:
+        """Campos del registro de frame que provienen de la entidad de análisis"""
+        fields = {
+            "status": FrameStatus[analysis.status.name],
+            "updated_at": analysis.updated_at.timestamp(),
+            "result": analysis.result,
+            "error": analysis.error,
+            "session_id": analysis.session_id,
+            "session_result": analysis.session_result,
+            "session_locked": analysis.session_locked,
+            "inference_skipped": analysis.inference_skipped,
+            "fused_result": analysis.fused_result,
+        }
+        if not analysis.is_pending:
+            # El frame ya no se procesará: liberar la imagen
+            fields["image_content"] = None
+        return fields
+    
+    def registrar_frame(self, frame_id: str, image_content: bytes,
+                        session_id: Optional[str] = None,
+                        encoding: FrameEncoding = FrameEncoding.IMAGE) -> FrameRecord:
+        """Registrar un frame recibido como pendiente de análisis"""
+        record = FrameRecord(frame_id=frame_id, image_content=image_content,
+                             session_id=session_id, encoding=encoding)
+        self.frame_store.put(record)
+        return record
+    
+    def descartar_frame(self, frame_id: str, status: FrameStatus, motivo: str) -> bool:
+        """Cerrar un frame pendiente sin inferencia (p. ej. superado) y liberar su imagen"""
+        updated = self.frame_store.update(
+            frame_id,
+            status=status,
+            updated_at=time.time(),
+            error=motivo,
+            image_content=None
+        )
+        if updated:
+            self._cachear_respuesta(frame_id)
+        return updated
+    
+    def _cachear_respuesta(self, frame_id: str) -> None:
+        """Serializar una sola vez la respuesta de un frame que llegó a un estado final"""
+        record = self.frame_store.get(frame_id)
+        if record is not None and not record.is_active:
+            self.frame_store.update(frame_id, response_body=record.to_response_bytes())
+    
+    def obtener_version(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float]]:
+        """Versión (ETag), estado y última actualización de un frame, sin leer el registro completo"""
+        return self.frame_store.get_version(frame_id)
+    
+    def obtener_respuesta_cacheada(self, frame_id: str) -> Optional[Tuple[int, FrameStatus, float, Optional[bytes]]]:
+        """Versión, estado, última actualización y respuesta JSON cacheada de un frame, leídos a la vez"""
+        return self.frame_store.get_cached_response(frame_id)
+    
+    def obtener_frame(self, frame_id: str) -> Optional[FrameRecord]:
+        """Obtener el registro canónico de un frame"""
+        return self.frame_store.get(frame_id)
+    
     async def obtener_analisis(self, frame_id: str) -> Optional[AnalysisEntity]:
         """Obtener el estado de un análisis"""
         try:
-            return self.analysis_storage.get(frame_id)
+            record = self.frame_store.get(frame_id)
+            if record is None:
+                return None
+            return AnalysisEntity(
+                frame_id=record.frame_id,
+                status=AnalysisStatus(record.status.label),
+                created_at=datetime.fromtimestamp(record.created_at),
+                updated_at=datetime.fromtimestamp(record.updated_at),
+                result=record.result,
+                error=record.error,
+                session_id=record.session_id,
+                session_result=record.session_result,
+                session_locked=record.session_locked,
+                inference_skipped=record.inference_skipped,
+                fused_result=record.fused_result
+            )
         except Exception as e:
             logger.error(f"❌ Error obteniendo análisis {frame_id}: {e}")
             return None
@@ -62,7 +163,16 @@ class BovinoRepositoryImpl(BovinoRepository):
     async def guardar_analisis(self, analysis: AnalysisEntity) -> None:
         """Guardar un análisis en el repositorio"""
         try:
-            self.analysis_storage[analysis.frame_id] = analysis
+            fields = self._analysis_fields(analysis)
+            # Si el frame ya fue registrado, conservar la imagen y la fecha de creación
+            if not self.frame_store.update(analysis.frame_id, **fields):
+                self.frame_store.put(FrameRecord(
+                    frame_id=analysis.frame_id,
+                    created_at=analysis.created_at.timestamp(),
+                    **fields
+                ))
+            if not analysis.is_pending:
+                self._cachear_respuesta(analysis.frame_id)
             logger.info(f"💾 Análisis guardado: {analysis.frame_id}")
         except Exception as e:
             logger.error(f"❌ Error guardando análisis: {e}")
@@ -71,24 +181,39 @@ class BovinoRepositoryImpl(BovinoRepository):
     async def actualizar_analisis(self, analysis: AnalysisEntity) -> None:
         """Actualizar un análisis existente"""
         try:
-            self.analysis_storage[analysis.frame_id] = analysis
+            self.frame_store.update(analysis.frame_id, **self._analysis_fields(analysis))
+            if not analysis.is_pending:
+                self._cachear_respuesta(analysis.frame_id)
             logger.info(f"🔄 Análisis actualizado: {analysis.frame_id}")
         except Exception as e:
             logger.error(f"❌ Error actualizando análisis: {e}")
             raise
     
+    async def obtener_sesion(self, session_id: str) -> Optional[SessionEntity]:
+        """Obtener el estado de una sesión de filmación"""
+        try:
+            return self.frame_store.get_session(session_id)
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo sesión {session_id}: {e}")
+            return None
+    
+    async def guardar_sesion(self, session: SessionEntity) -> bool:
+        """Guardar el estado de una sesión de filmación (compare-and-swap por versión)"""
+        try:
+            return self.frame_store.put_session(session)
+        except Exception as e:
+            logger.error(f"❌ Error guardando sesión {session.session_id}: {e}")
+            raise
+    
+    async def crear_resultado(self, raza: str, confianza: float) -> BovinoEntity:
+        """Construir un resultado para una raza y confianza dadas"""
+        return self.datasource.build_entity(raza, confianza)
+    
     async def limpiar_analisis_antiguos(self, horas: int = 1) -> int:
         """Limpiar análisis más antiguos que las horas especificadas"""
         try:
             cutoff_time = datetime.now() - timedelta(hours=horas)
-            frames_to_remove = []
-            
-            for frame_id, analysis in self.analysis_storage.items():
-                if analysis.created_at < cutoff_time:
-                    frames_to_remove.append(frame_id)
-            
-            for frame_id in frames_to_remove:
-                del self.analysis_storage[frame_id]
+            frames_to_remove = self.frame_store.remove_older_than(cutoff_time)
             
             logger.info(f"🧹 Eliminados {len(frames_to_remove)} análisis antiguos")
             return len(frames_to_remove)
@@ -100,16 +225,13 @@ class BovinoRepositoryImpl(BovinoRepository):
     async def obtener_estadisticas(self) -> dict:
         """Obtener estadísticas del repositorio"""
         try:
-            total_analyses = len(self.analysis_history)
-            successful_analyses = len([a for a in self.analysis_history if a['result'].confianza > 0.5])
-            
-            return {
-                "total_analyses": total_analyses,
-                "successful_analyses": successful_analyses,
-                "success_rate": (successful_analyses / total_analyses * 100) if total_analyses > 0 else 0,
-                "last_analysis": self.analysis_history[-1]['timestamp'] if self.analysis_history else None,
-                "active_analyses": len(self.analysis_storage)
-            }
+            if self.analysis_history is None:
+                return {"active_analyses": self.frame_store.size()}
+            stats = self.analysis_history.statistics(success_threshold=0.5)
+            stats["active_analyses"] = self.frame_store.size()
+            stats["history_capacity"] = self.analysis_history.capacity
+            stats["total_recorded"] = self.analysis_history.total_recorded
+            return stats
         except Exception as e:
             logger.error(f"❌ Error obteniendo estadísticas: {e}")
             return {"error": str(e)}
@@ -122,7 +244,9 @@ class BovinoRepositoryImpl(BovinoRepository):
     async def get_analysis_history(self, limit: int = 10) -> list:
         """Obtener historial de análisis"""
         try:
-            return self.analysis_history[-limit:] if self.analysis_history else []
+            if self.analysis_history is None:
+                return []
+            return self.analysis_history.tail(limit)
         except Exception as e:
             logger.error(f"❌ Error obteniendo historial: {e}")
             return []
@@ -141,4 +265,8 @@ class BovinoRepositoryImpl(BovinoRepository):
     
     async def get_statistics(self) -> dict:
         """Obtener estadísticas del repositorio (método de compatibilidad)"""
-        return await self.obtener_estadisticas() 
\ No newline at end of file
+        return await self.obtener_estadisticas()
+    
+    def close(self) -> None:
+        """Liberar recursos del repositorio"""
+        pass
@@ -0,0 +1,246 @@
+import os
+import queue
+import sqlite3
+import threading
+import logging
+from typing import List, Optional
+from datetime import datetime
+
+from domain.entities.bovino_entity import BovinoEntity
+from data.datasources.tensorflow_datasource_impl import TensorFlowDataSourceImpl
+from data.datasources.frame_state_store import FrameStateStore
+from .bovino_repository_impl import BovinoRepositoryImpl
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteBovinoRepositoryImpl(BovinoRepositoryImpl):
+    """
+    Repositorio de bovino con historial persistente en SQLite (modo WAL)
+
+    Las inserciones del historial se encolan y un hilo escritor las agrupa
+    en una sola transacción cada pocos milisegundos, de modo que el camino
+    de la petición nunca espera al disco.
+    """
+
+    _INSERT_SQL = (
+        "INSERT INTO analysis_history (frame_id, session_id, timestamp, raza, confianza, "
+        "peso_estimado, processing_time_ms, image_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    def __init__(self, datasource: TensorFlowDataSourceImpl,
+                 frame_store: Optional[FrameStateStore] = None,
+                 db_path: str = "storage/analysis_history.db",
+                 flush_interval_ms: float = 5.0,
+                 batch_max: int = 500):
+        # El historial vive en SQLite: sin buffer en memoria
+        super().__init__(datasource, frame_store, history_capacity=None)
+        self.db_path = db_path
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.batch_max = batch_max
+        self._pending: "queue.Queue[tuple]" = queue.Queue()
+        self._stop = threading.Event()
+        self._read_local = threading.local()
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._create_schema()
+
+        self._start_writer()
+        # Los hilos no sobreviven a fork (modo pre-fork): cada worker arranca su escritor
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_after_fork)
+        logger.info(f"🗄️ SQLiteBovinoRepositoryImpl con historial en: {self.db_path}")
+
+    def _start_writer(self) -> None:
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="bovino-history-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _restart_after_fork(self) -> None:
+        """Estado nuevo en el proceso hijo: cola, conexiones y escritor propios"""
+        self._pending = queue.Queue()
+        self._stop = threading.Event()
+        self._read_local = threading.local()
+        self._start_writer()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _read_connection(self) -> sqlite3.Connection:
+        """Conexión de lectura por hilo (el escritor tiene la suya)"""
+        conn = getattr(self._read_local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._read_local.conn = conn
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self._connect()
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    frame_id TEXT NOT NULL,
+                    session_id TEXT,
+                    timestamp REAL NOT NULL,
+                    raza TEXT NOT NULL,
+                    confianza REAL NOT NULL,
+                    peso_estimado REAL NOT NULL,
+                    processing_time_ms REAL NOT NULL,
+                    image_size INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_history_timestamp
+                    ON analysis_history(timestamp);
+                CREATE INDEX IF NOT EXISTS idx_history_raza_timestamp
+                    ON analysis_history(raza, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_history_confianza
+                    ON analysis_history(confianza);
+                CREATE INDEX IF NOT EXISTS idx_history_session_timestamp
+                    ON analysis_history(session_id, timestamp);
+                """
+            )
+        finally:
+            conn.close()
+
+    def _writer_loop(self) -> None:
+        """Agrupar inserciones pendientes y confirmarlas en una sola transacción"""
+        conn = self._connect()
+        try:
+            while not (self._stop.is_set() and self._pending.empty()):
+                try:
+                    first = self._pending.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                # Esperar brevemente para agrupar las inserciones que lleguen
+                self._stop.wait(self.flush_interval)
+                batch = [first]
+                while len(batch) < self.batch_max:
+                    try:
+                        batch.append(self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+
+                try:
+                    conn.execute("BEGIN")
+                    conn.executemany(self._INSERT_SQL, batch)
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    conn.execute("ROLLBACK")
+                    logger.error(f"❌ Error escribiendo {len(batch)} registros de historial: {e}")
+        finally:
+            conn.close()
+
+    def _registrar_historial(self, frame_id: str, result: BovinoEntity,
+                             image_size: int, elapsed_ms: float,
+                             session_id: Optional[str] = None) -> None:
+        """Encolar el registro para el escritor en segundo plano"""
+        self._pending.put((
+            frame_id,
+            session_id,
+            datetime.now().timestamp(),
+            result.raza,
+            result.confianza,
+            result.peso_estimado,
+            elapsed_ms,
+            image_size,
+        ))
+
+    async def obtener_estadisticas(self) -> dict:
+        """Obtener estadísticas del repositorio"""
+        try:
+            row = self._read_connection().execute(
+                "SELECT COUNT(*) AS total, "
+                "COALESCE(SUM(confianza > 0.5), 0) AS successful, "
+                "MAX(timestamp) AS last_ts "
+                "FROM analysis_history"
+            ).fetchone()
+            total_analyses = row["total"]
+            successful_analyses = row["successful"]
+
+            return {
+                "total_analyses": total_analyses,
+                "successful_analyses": successful_analyses,
+                "success_rate": (successful_analyses / total_analyses * 100) if total_analyses > 0 else 0,
+                "last_analysis": datetime.fromtimestamp(row["last_ts"]) if row["last_ts"] else None,
+                "active_analyses": self.frame_store.size(),
+                "pending_history_writes": self._pending.qsize()
+            }
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo estadísticas: {e}")
+            return {"error": str(e)}
+
+    async def get_analysis_history(self, limit: int = 10, offset: int = 0,
+                                   raza: Optional[str] = None,
+                                   min_confianza: Optional[float] = None,
+                                   session_id: Optional[str] = None,
+                                   desde: Optional[datetime] = None,
+                                   hasta: Optional[datetime] = None) -> List[dict]:
+        """
+        Obtener historial paginado y filtrado (más reciente primero)
+
+        Todos los filtros se resuelven con los índices de la tabla.
+        """
+        try:
+            conditions = []
+            params: list = []
+            if raza is not None:
+                conditions.append("raza = ?")
+                params.append(raza)
+            if min_confianza is not None:
+                conditions.append("confianza >= ?")
+                params.append(min_confianza)
+            if session_id is not None:
+                conditions.append("session_id = ?")
+                params.append(session_id)
+            if desde is not None:
+                conditions.append("timestamp >= ?")
+                params.append(desde.timestamp())
+            if hasta is not None:
+                conditions.append("timestamp < ?")
+                params.append(hasta.timestamp())
+
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = self._read_connection().execute(
+                f"SELECT frame_id, session_id, timestamp, raza, confianza, peso_estimado, "
+                f"processing_time_ms, image_size FROM analysis_history {where} "
+                f"ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+
+            return [
+                {
+                    "frame_id": row["frame_id"],
+                    "session_id": row["session_id"],
+                    "timestamp": datetime.fromtimestamp(row["timestamp"]),
+                    "raza": row["raza"],
+                    "confianza": row["confianza"],
+                    "peso_estimado": row["peso_estimado"],
+                    "processing_time_ms": row["processing_time_ms"],
+                    "image_size": row["image_size"],
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo historial: {e}")
+            return []
+
+    def close(self) -> None:
+        """Vaciar la cola de escritura y cerrar conexiones"""
+        self._stop.set()
+        self._writer.join(timeout=5.0)
+        conn = getattr(self._read_local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._read_local.conn = None
+        logger.info("🗄️ Historial SQLite cerrado")
@@ -6,8 +6,14 @@ Entidades inmutables que representan los conceptos de negocio
 
 from .bovino_entity import BovinoEntity
 from .analysis_entity import AnalysisEntity
+from .frame_record import FrameEncoding, FrameRecord, FrameStatus
+from .session_entity import SessionEntity
 
 __all__ = [
     'BovinoEntity',
-    'AnalysisEntity'
+    'AnalysisEntity',
+    'FrameEncoding',
+    'FrameRecord',
+    'FrameStatus',
+    'SessionEntity'
 ] 
\ No newline at end of file
@@ -12,6 +12,8 @@ class AnalysisStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    SUPERSEDED = "superseded"
+    EXPIRED = "expired"
 
 
 @dataclass
@@ -23,6 +25,11 @@ class AnalysisEntity:
     updated_at: datetime
     result: Optional[BovinoEntity] = None
     error: Optional[str] = None
+    session_id: Optional[str] = None
+    session_result: Optional[BovinoEntity] = None
+    session_locked: bool = False
+    inference_skipped: bool = False
+    fused_result: Optional[BovinoEntity] = None
 
     def __post_init__(self):
         """Validaciones de dominio"""
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional
 from enum import Enum
 
 
@@ -22,6 +22,10 @@ class BovinoEntity:
     detection_result: BovinoDetectionResult = BovinoDetectionResult.BOVINO_DETECTED
     precision_score: float = 0.0
     processing_time_ms: int = 0
+    # Probabilidad por raza (para el ensamble temporal; no se expone en la API)
+    probabilidades: Optional[Dict[str, float]] = None
+    # Versión del modelo que produjo el resultado
+    model_version: Optional[str] = None
 
     def __post_init__(self):
         """Validaciones de dominio"""
@@ -58,4 +62,33 @@ class BovinoEntity:
     @property
     def es_bovino_detectado(self) -> bool:
         """Verificar si se detectó un bovino"""
-        return self.detection_result == BovinoDetectionResult.BOVINO_DETECTED 
\ No newline at end of file
+        return self.detection_result == BovinoDetectionResult.BOVINO_DETECTED
+
+    def to_dict(self) -> dict:
+        """Representación serializable (formato de respuesta de la API)"""
+        return {
+            "raza": self.raza,
+            "caracteristicas": list(self.caracteristicas),
+            "confianza": self.confianza,
+            "timestamp": self.timestamp.isoformat(),
+            "peso_estimado": self.peso_estimado,
+            "detection_result": self.detection_result.value,
+            "precision_score": self.precision_score,
+            "processing_time_ms": self.processing_time_ms,
+            "model_version": self.model_version
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BovinoEntity":
+        """Reconstruir la entidad desde su representación serializable"""
+        return cls(
+            raza=data["raza"],
+            caracteristicas=list(data["caracteristicas"]),
+            confianza=data["confianza"],
+            peso_estimado=data["peso_estimado"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            detection_result=BovinoDetectionResult(data["detection_result"]),
+            precision_score=data["precision_score"],
+            processing_time_ms=data["processing_time_ms"] or 0,
+            model_version=data.get("model_version")
+        )
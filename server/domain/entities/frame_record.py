@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import Optional
+from enum import IntEnum
+import json
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .bovino_entity import BovinoEntity
+
+
+def encode_json(data: dict) -> bytes:
+    """Serializar a JSON (orjson si está disponible, si no la librería estándar)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FrameStatus(IntEnum):
+    """Estados de un frame (entero compacto; la API expone el nombre)"""
+    PENDING = 0
+    PROCESSING = 1
+    COMPLETED = 2
+    FAILED = 3
+    SUPERSEDED = 4  # Descartado antes de la inferencia por un frame más nuevo del mismo dispositivo
+    EXPIRED = 5  # Descartado antes de la inferencia por vencer su plazo
+
+    @property
+    def label(self) -> str:
+        """Nombre del estado tal como lo ve el cliente"""
+        return self.name.lower()
+
+
+class FrameEncoding(IntEnum):
+    """Formato del contenido de un frame, según el endpoint que lo recibió"""
+    IMAGE = 0  # Imagen codificada (JPEG, PNG...) de /submit-frame y /submit-frame/raw
+    TENSOR = 1  # Frame tensor ya validado por /submit-frame/tensor
+
+
+class FrameRecord:
+    """
+    Registro canónico del estado de un frame
+
+    Única copia del estado de un frame (cola, estado y resultado), propiedad
+    del repositorio. Usa __slots__ y marcas de tiempo epoch para minimizar
+    la memoria por frame.
+    """
+
+    __slots__ = ("frame_id", "status", "image_content", "created_at",
+                 "updated_at", "result", "error", "session_id",
+                 "session_result", "session_locked", "inference_skipped",
+                 "fused_result", "response_body", "version", "encoding")
+
+    def __init__(self, frame_id: str, status: FrameStatus = FrameStatus.PENDING,
+                 image_content: Optional[bytes] = None,
+                 created_at: Optional[float] = None,
+                 updated_at: Optional[float] = None,
+                 result: Optional[BovinoEntity] = None,
+                 error: Optional[str] = None,
+                 session_id: Optional[str] = None,
+                 session_result: Optional[BovinoEntity] = None,
+                 session_locked: bool = False,
+                 inference_skipped: bool = False,
+                 fused_result: Optional[BovinoEntity] = None,
+                 response_body: Optional[bytes] = None,
+                 version: int = 1,
+                 encoding: FrameEncoding = FrameEncoding.IMAGE):
+        if not frame_id:
+            raise ValueError("Frame ID no puede estar vacío")
+        now = time.time()
+        self.frame_id = frame_id
+        self.status = status
+        self.image_content = image_content
+        self.created_at = created_at if created_at is not None else now
+        self.updated_at = updated_at if updated_at is not None else self.created_at
+        self.result = result
+        self.error = error
+        # Resultado vigente de la sesión según las reglas de precisión
+        self.session_id = session_id
+        self.session_result = session_result
+        self.session_locked = session_locked
+        self.inference_skipped = inference_skipped
+        # Resultado del ensamble temporal de la sesión tras este frame
+        self.fused_result = fused_result
+        # Respuesta JSON serializada una sola vez al llegar a un estado final
+        self.response_body = response_body
+        # Contador de versión del estado (ETag); lo incrementa el almacén en cada cambio
+        self.version = version
+        self.encoding = encoding
+
+    @property
+    def is_active(self) -> bool:
+        """Verificar si el frame sigue pendiente o en procesamiento"""
+        return self.status in (FrameStatus.PENDING, FrameStatus.PROCESSING)
+
+    def to_response_dict(self) -> dict:
+        """Renderizar la respuesta de la API directamente desde el registro"""
+        response = {
+            "frame_id": self.frame_id,
+            "status": self.status.label,
+            "version": self.version,
+            "result": self.result.to_dict() if self.result is not None else None,
+            "error": self.error,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "updated_at": datetime.fromtimestamp(self.updated_at).isoformat()
+        }
+        if self.session_id is not None:
+            response["session"] = {
+                "session_id": self.session_id,
+                "locked": self.session_locked,
+                "result": self.session_result.to_dict() if self.session_result is not None else None,
+                "fused_result": self.fused_result.to_dict() if self.fused_result is not None else None,
+                "inference_skipped": self.inference_skipped
+            }
+        return response
+
+    def to_response_bytes(self) -> bytes:
+        """Respuesta de la API ya serializada a JSON"""
+        return encode_json(self.to_response_dict())
@@ -0,0 +1,111 @@
+from typing import Dict, Optional, Tuple
+import time
+
+from .bovino_entity import BovinoEntity
+
+
+class SessionEntity:
+    """
+    Estado de una sesión de filmación (un animal)
+
+    Aplica en el servidor las reglas de precisión del cliente:
+    1. Nunca aceptar resultados con confianza menor al mínimo (70%)
+    2. El primer resultado aceptado debe alcanzar el mínimo
+    3. Con confianza mayor o igual al umbral final (95%) el resultado se bloquea
+    4. En otro caso solo se reemplaza si la nueva confianza es mayor
+
+    Además mantiene un ensamble temporal: media móvil exponencial, ponderada
+    por confianza, de los vectores de probabilidad de los frames de la sesión
+    (estado O(clases)).
+
+    version es la del estado leído del almacén (0 si aún no se guardó): al
+    guardar se compara con la almacenada para no pisar escrituras de otro
+    proceso.
+    """
+
+    __slots__ = ("session_id", "best_result", "locked", "frames_seen",
+                 "inferences_skipped", "updated_at", "probabilidades_fusionadas", "version")
+
+    def __init__(self, session_id: str, best_result: Optional[BovinoEntity] = None,
+                 locked: bool = False, frames_seen: int = 0,
+                 inferences_skipped: int = 0, updated_at: Optional[float] = None,
+                 probabilidades_fusionadas: Optional[Dict[str, float]] = None,
+                 version: int = 0):
+        if not session_id:
+            raise ValueError("Session ID no puede estar vacío")
+        self.session_id = session_id
+        self.best_result = best_result
+        self.locked = locked
+        self.frames_seen = frames_seen
+        self.inferences_skipped = inferences_skipped
+        self.updated_at = updated_at if updated_at is not None else time.time()
+        self.probabilidades_fusionadas = probabilidades_fusionadas
+        self.version = version
+
+    def evaluar_resultado(self, result: BovinoEntity, min_confianza: float,
+                          confianza_final: float) -> bool:
+        """
+        Aplicar las reglas de precisión a un nuevo resultado
+
+        Returns:
+            True si el resultado reemplazó al mejor resultado de la sesión
+        """
+        self.frames_seen += 1
+        self.updated_at = time.time()
+
+        if self.locked or result.confianza < min_confianza:
+            return False
+        if self.best_result is not None and result.confianza <= self.best_result.confianza:
+            return False
+
+        self.best_result = result
+        self.locked = result.confianza >= confianza_final
+        return True
+
+    def fusionar(self, probabilidades: Dict[str, float], confianza: float,
+                 alpha: float) -> Tuple[str, float]:
+        """
+        Incorporar las probabilidades de un frame a la media móvil
+
+        El peso del frame es alpha * confianza: los frames dudosos mueven
+        poco el resultado fusionado.
+
+        Returns:
+            Raza y confianza del resultado fusionado
+        """
+        if not self.probabilidades_fusionadas:
+            self.probabilidades_fusionadas = dict(probabilidades)
+        else:
+            peso = min(1.0, max(0.0, alpha * confianza))
+            fusion = self.probabilidades_fusionadas
+            for raza in fusion.keys() | probabilidades.keys():
+                fusion[raza] = (1.0 - peso) * fusion.get(raza, 0.0) + peso * probabilidades.get(raza, 0.0)
+
+        fusion = self.probabilidades_fusionadas
+        total = sum(fusion.values()) or 1.0
+        raza = max(fusion, key=fusion.get)
+        return raza, min(1.0, fusion[raza] / total)
+
+    def registrar_frame_omitido(self) -> None:
+        """Contabilizar un frame resuelto con el resultado bloqueado (sin inferencia)"""
+        self.frames_seen += 1
+        self.inferences_skipped += 1
+        self.updated_at = time.time()
+
+    def reiniciar(self) -> None:
+        """Nuevo animal: descartar el resultado y desbloquear la sesión"""
+        self.best_result = None
+        self.locked = False
+        self.probabilidades_fusionadas = None
+        self.updated_at = time.time()
+
+    def to_dict(self) -> dict:
+        """Representación serializable"""
+        return {
+            "session_id": self.session_id,
+            "locked": self.locked,
+            "result": self.best_result.to_dict() if self.best_result is not None else None,
+            "fused_probabilities": self.probabilidades_fusionadas,
+            "frames_seen": self.frames_seen,
+            "inferences_skipped": self.inferences_skipped
+        }
@@ -4,19 +4,25 @@ from datetime import datetime
 
 from ..entities.bovino_entity import BovinoEntity
 from ..entities.analysis_entity import AnalysisEntity
+from ..entities.session_entity import SessionEntity
+from ..entities.frame_record import FrameEncoding
 
 
 class BovinoRepository(ABC):
     """Contrato del repositorio para análisis de bovinos"""
     
     @abstractmethod
-    async def analizar_frame(self, frame_id: str, image_data: bytes) -> BovinoEntity:
+    async def analizar_frame(self, frame_id: str, image_data: bytes,
+                             session_id: Optional[str] = None,
+                             encoding: FrameEncoding = FrameEncoding.IMAGE) -> BovinoEntity:
         """
         Analizar un frame de bovino
         
         Args:
             frame_id: ID único del frame
             image_data: Datos de la imagen en bytes
+            session_id: Sesión de filmación a la que pertenece el frame
+            encoding: Formato del contenido, fijado por el endpoint que lo recibió
             
         Returns:
             BovinoEntity con el resultado del análisis
@@ -81,4 +87,45 @@ class BovinoRepository(ABC):
         Returns:
             Diccionario con estadísticas
         """
-        pass 
\ No newline at end of file
+        pass
+    
+    @abstractmethod
+    async def obtener_sesion(self, session_id: str) -> Optional[SessionEntity]:
+        """
+        Obtener el estado de una sesión de filmación
+        
+        Args:
+            session_id: ID de la sesión
+            
+        Returns:
+            SessionEntity si existe, None si no existe
+        """
+        pass
+    
+    @abstractmethod
+    async def guardar_sesion(self, session: SessionEntity) -> bool:
+        """
+        Guardar el estado de una sesión si no cambió desde que se leyó
+        
+        Args:
+            session: Entidad de sesión a guardar (con la versión leída)
+            
+        Returns:
+            True si se guardó, False si otra escritura llegó antes
+        """
+        pass
+    
+    @abstractmethod
+    async def crear_resultado(self, raza: str, confianza: float) -> BovinoEntity:
+        """
+        Construir un resultado para una raza y confianza dadas
+        (por ejemplo, el resultado fusionado de una sesión)
+        
+        Args:
+            raza: Raza identificada
+            confianza: Confianza del resultado
+            
+        Returns:
+            BovinoEntity con características y peso estimado de la raza
+        """
+        pass
@@ -4,8 +4,9 @@ Casos de Uso - Clean Architecture
 Casos de uso que implementan la lógica de negocio
 """
 
-from .analizar_bovino_usecase import AnalizarBovinoUseCase
+from .analizar_bovino_usecase import AnalizarBovinoUseCase, ReiniciarSesionUseCase
 
 __all__ = [
-    'AnalizarBovinoUseCase'
+    'AnalizarBovinoUseCase',
+    'ReiniciarSesionUseCase'
 ] 
\ No newline at end of file
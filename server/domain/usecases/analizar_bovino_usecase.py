@@ -1,27 +1,87 @@
-from typing import Optional
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+import asyncio
 import logging
+import weakref
 from datetime import datetime
 
 from ..entities.bovino_entity import BovinoEntity
 from ..entities.analysis_entity import AnalysisEntity, AnalysisStatus
+from ..entities.session_entity import SessionEntity
+from ..entities.frame_record import FrameEncoding
 from ..repositories.bovino_repository import BovinoRepository
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Reintentos cuando otro proceso guarda la misma sesión entre la lectura y la escritura
+MAX_REINTENTOS_SESION = 5
+
+# Un lock por sesión activa (se liberan solos cuando nadie los usa)
+_locks_sesion: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _lock_sesion(session_id: str) -> asyncio.Lock:
+    lock = _locks_sesion.get(session_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _locks_sesion[session_id] = lock
+    return lock
+
+
+async def _actualizar_sesion(bovino_repository: BovinoRepository, session_id: str,
+                            modificar: Callable[[SessionEntity], Awaitable[T]]) -> Tuple[SessionEntity, T]:
+    """
+    Leer, modificar y guardar una sesión sin perder actualizaciones
+
+    Dentro del proceso las modificaciones de una sesión se serializan con un
+    asyncio.Lock; entre procesos el guardado es compare-and-swap sobre la
+    versión, y si otro proceso escribió antes se relee y se vuelve a aplicar
+    la modificación.
+
+    Returns:
+        Sesión guardada y el valor devuelto por modificar
+    """
+    async with _lock_sesion(session_id):
+        for _ in range(MAX_REINTENTOS_SESION):
+            session = await bovino_repository.obtener_sesion(session_id)
+            if session is None:
+                session = SessionEntity(session_id=session_id)
+            resultado = await modificar(session)
+            if await bovino_repository.guardar_sesion(session):
+                return session, resultado
+            logger.info(f"🔁 Sesión {session_id} modificada por otro proceso, reintentando")
+    raise RuntimeError(f"No se pudo guardar la sesión {session_id} tras {MAX_REINTENTOS_SESION} intentos")
+
 
 class AnalizarBovinoUseCase:
     """Caso de uso para análisis de bovinos"""
     
-    def __init__(self, bovino_repository: BovinoRepository):
+    def __init__(self, bovino_repository: BovinoRepository,
+                 min_confianza: float = 0.70, confianza_final: float = 0.95,
+                 ensemble_alpha: Optional[float] = 0.5):
         self.bovino_repository = bovino_repository
+        # Reglas de precisión por sesión (mismas que el cliente Flutter)
+        self.min_confianza = min_confianza
+        self.confianza_final = confianza_final
+        # Ensamble temporal por sesión (None lo desactiva)
+        self.ensemble_alpha = ensemble_alpha
     
-    async def execute(self, frame_id: str, image_data: bytes) -> AnalysisEntity:
+    async def execute(self, frame_id: str, image_data: bytes,
+                      session_id: Optional[str] = None,
+                      encoding: FrameEncoding = FrameEncoding.IMAGE) -> AnalysisEntity:
         """
         Ejecutar análisis de bovino
         
+        Si el frame pertenece a una sesión cuyo resultado ya está bloqueado
+        (confianza >= umbral final), se responde con ese resultado sin
+        ejecutar inferencia.
+        
         Args:
             frame_id: ID único del frame
             image_data: Datos de la imagen
+            session_id: Sesión de filmación (opcional)
+            encoding: Formato del contenido, fijado por el endpoint que lo recibió
             
         Returns:
             AnalysisEntity con el resultado
@@ -29,29 +89,48 @@ class AnalizarBovinoUseCase:
         try:
             logger.info(f"🔄 Iniciando análisis de frame: {frame_id}")
             
-            # Crear entidad de análisis inicial
+            if session_id:
+                # Lectura sin lock: el caso habitual (sesión sin bloquear) no escribe aquí
+                session = await self.bovino_repository.obtener_sesion(session_id)
+                if session is not None and session.locked:
+                    bloqueado = await self._completar_con_sesion_bloqueada(frame_id, session_id)
+                    if bloqueado is not None:
+                        return bloqueado
+            
+            # Crear entidad de análisis ya en procesamiento (una sola escritura)
             analysis = AnalysisEntity(
                 frame_id=frame_id,
-                status=AnalysisStatus.PENDING,
+                status=AnalysisStatus.PROCESSING,
                 created_at=datetime.now(),
-                updated_at=datetime.now()
+                updated_at=datetime.now(),
+                session_id=session_id
             )
-            
-            # Guardar análisis inicial
             await self.bovino_repository.guardar_analisis(analysis)
             
-            # Marcar como procesando
-            analysis.mark_as_processing()
-            await self.bovino_repository.actualizar_analisis(analysis)
-            
             # Realizar análisis
             start_time = datetime.now()
-            bovino_result = await self.bovino_repository.analizar_frame(frame_id, image_data)
+            bovino_result = await self.bovino_repository.analizar_frame(frame_id, image_data, session_id, encoding)
             
             # Calcular tiempo de procesamiento
             processing_time = (datetime.now() - start_time).total_seconds() * 1000
             bovino_result.processing_time_ms = int(processing_time)
             
+            # Aplicar reglas de precisión de la sesión (sobre el resultado fusionado)
+            if session_id:
+                async def aplicar(session: SessionEntity) -> BovinoEntity:
+                    candidate = await self._fusionar(session, bovino_result)
+                    if session.evaluar_resultado(candidate, self.min_confianza, self.confianza_final):
+                        logger.info(f"🎯 Sesión {session_id}: nuevo mejor resultado "
+                                    f"{candidate.raza} ({candidate.confianza:.2f})"
+                                    f"{' - bloqueado' if session.locked else ''}")
+                    return candidate
+
+                session, candidate = await _actualizar_sesion(self.bovino_repository, session_id, aplicar)
+                if candidate is not bovino_result:
+                    analysis.fused_result = candidate
+                analysis.session_result = session.best_result
+                analysis.session_locked = session.locked
+            
             # Marcar como completado
             analysis.mark_as_completed(bovino_result)
             await self.bovino_repository.actualizar_analisis(analysis)
@@ -73,11 +152,84 @@ class AnalizarBovinoUseCase:
                     status=AnalysisStatus.FAILED,
                     created_at=datetime.now(),
                     updated_at=datetime.now(),
-                    error=str(e)
+                    error=str(e),
+                    session_id=session_id
                 )
                 await self.bovino_repository.guardar_analisis(analysis)
             
             raise
+    
+    async def _fusionar(self, session: SessionEntity, result: BovinoEntity) -> BovinoEntity:
+        """Actualizar el ensamble temporal de la sesión y devolver el resultado fusionado"""
+        if self.ensemble_alpha is None or not result.probabilidades:
+            return result
+        
+        raza, confianza = session.fusionar(result.probabilidades, result.confianza, self.ensemble_alpha)
+        fused = await self.bovino_repository.crear_resultado(raza, confianza)
+        fused.processing_time_ms = result.processing_time_ms
+        return fused
+    
+    async def _completar_con_sesion_bloqueada(self, frame_id: str,
+                                              session_id: str) -> Optional[AnalysisEntity]:
+        """
+        Completar el frame con el resultado bloqueado de la sesión
+        
+        Returns:
+            AnalysisEntity completado, None si la sesión se desbloqueó entretanto
+        """
+        async def omitir(session: SessionEntity) -> bool:
+            if session.locked:
+                session.registrar_frame_omitido()
+            return session.locked
+        
+        session, locked = await _actualizar_sesion(self.bovino_repository, session_id, omitir)
+        if not locked:
+            return None
+        
+        analysis = AnalysisEntity(
+            frame_id=frame_id,
+            status=AnalysisStatus.COMPLETED,
+            created_at=datetime.now(),
+            updated_at=datetime.now(),
+            result=session.best_result,
+            session_id=session.session_id,
+            session_result=session.best_result,
+            session_locked=True,
+            inference_skipped=True
+        )
+        await self.bovino_repository.guardar_analisis(analysis)
+        
+        logger.info(f"🔒 Sesión {session.session_id} bloqueada: frame {frame_id} "
+                    f"resuelto sin inferencia ({session.inferences_skipped} omitidos)")
+        return analysis
+
+
+class ReiniciarSesionUseCase:
+    """Caso de uso para reiniciar una sesión cuando el cliente enfoca un nuevo animal"""
+    
+    def __init__(self, bovino_repository: BovinoRepository):
+        self.bovino_repository = bovino_repository
+    
+    async def execute(self, session_id: str) -> SessionEntity:
+        """
+        Reiniciar la sesión (desbloquear y descartar el mejor resultado)
+        
+        Args:
+            session_id: ID de la sesión
+            
+        Returns:
+            SessionEntity reiniciada
+        """
+        try:
+            async def reiniciar(session: SessionEntity) -> None:
+                session.reiniciar()
+            
+            session, _ = await _actualizar_sesion(self.bovino_repository, session_id, reiniciar)
+            logger.info(f"🔄 Sesión reiniciada: {session_id}")
+            return session
+        except Exception as e:
+            logger.error(f"❌ Error reiniciando sesión {session_id}: {e}")
+            raise
 
 
 class ObtenerAnalisisUseCase:
@@ -5,14 +5,14 @@ from fastapi import (
     UploadFile,
     File,
     HTTPException,
-    BackgroundTasks
+    Header,
+    Request
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
+from fastapi.responses import JSONResponse, Response
 import json
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
 from datetime import datetime, timedelta
 import uuid
@@ -27,11 +27,19 @@ configure_openCV_warnings()
 configure_tensorflow_warnings()
 
 # Importaciones de Clean Architecture
-from domain.usecases import AnalizarBovinoUseCase
-from data.repositories import BovinoRepositoryImpl
-from data.datasources import TensorFlowDataSourceImpl
-from models.api_models import BovinoModel, BovinoAnalysisRequest, AnalysisStatus, BovinoDetectionResult
+from domain.usecases import AnalizarBovinoUseCase, ReiniciarSesionUseCase
+from data.repositories import BovinoRepositoryImpl, SQLiteBovinoRepositoryImpl
+from data.datasources import TensorFlowDataSourceImpl, ModelRegistry, InMemoryFrameStateStore, SQLiteFrameStateStore
+from data.datasources.tensor_frame import (
+    TENSOR_CONTENT_TYPE, TensorFrameError, TensorCodecUnavailable, decode_tensor_frame
+)
+from domain.entities.frame_record import FrameEncoding, FrameStatus, encode_json
+from services.frame_scheduler import FrameScheduler
+from services.capture_hints import CaptureHintAdvisor
+from services.memory_report import current_process_memory
+from models.api_models import BovinoModel
 from config.settings import Settings
+from config import tf_runtime
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -39,6 +47,9 @@ logger = logging.getLogger(__name__)
 
 # Configuración de la aplicación
 settings = Settings()
+
+# Hilos de TensorFlow y OpenMP repartidos entre los workers (antes de cargar TF)
+runtime_config = tf_runtime.apply_environment(tf_runtime.resolve_runtime_config(settings))
 app = FastAPI(
     title="🐄 Bovino IA Server",
     description="Servidor para análisis de ganado bovino con estimación de peso",
@@ -55,26 +66,66 @@ app.add_middleware(
 )
 
 # Inicializar Clean Architecture
-datasource = TensorFlowDataSourceImpl()
-repository = BovinoRepositoryImpl(datasource)
-analizar_bovino_usecase = AnalizarBovinoUseCase(repository)
-
-# Cola de análisis (en memoria - en producción usar Redis/Celery)
-analysis_queue: Dict[str, dict] = {}
+model_registry = ModelRegistry(settings.MODEL_REGISTRY_DIR)
+datasource = TensorFlowDataSourceImpl(model_registry)
+if settings.FRAME_STORE_BACKEND == "sqlite":
+    # Estado compartido entre workers de uvicorn (--workers N)
+    frame_store = SQLiteFrameStateStore(settings.FRAME_STORE_PATH or None)
+else:
+    frame_store = InMemoryFrameStateStore()
+if settings.REPOSITORY_BACKEND == "sqlite":
+    repository = SQLiteBovinoRepositoryImpl(
+        datasource,
+        frame_store,
+        db_path=settings.HISTORY_DB_PATH,
+        flush_interval_ms=settings.HISTORY_FLUSH_INTERVAL_MS,
+        batch_max=settings.HISTORY_BATCH_MAX
+    )
+else:
+    repository = BovinoRepositoryImpl(datasource, frame_store, history_capacity=settings.HISTORY_CAPACITY)
+analizar_bovino_usecase = AnalizarBovinoUseCase(
+    repository,
+    min_confianza=settings.PRECISION_MIN_CONFIDENCE,
+    confianza_final=settings.PRECISION_FINAL_CONFIDENCE,
+    ensemble_alpha=settings.ENSEMBLE_ALPHA if settings.ENSEMBLE_ENABLED else None
+)
+reiniciar_sesion_usecase = ReiniciarSesionUseCase(repository)
 
 class FrameAnalysisRequest(BaseModel):
     """Solicitud de análisis de frame"""
     frame_id: str
     timestamp: datetime
 
+class FrameSessionModel(BaseModel):
+    """Estado de la sesión de filmación tras el frame"""
+    session_id: str
+    locked: bool
+    result: Optional[BovinoModel] = None  # Mejor resultado de la sesión
+    fused_result: Optional[BovinoModel] = None  # Ensamble temporal tras este frame
+    inference_skipped: bool
+
+class CaptureHintsModel(BaseModel):
+    """Recomendaciones de captura según la carga del servidor"""
+    load: float
+    capture_interval_ms: int
+    resolution_preset: str  # "low", "medium", "high"
+    poll_delay_ms: int
+
 class FrameAnalysisResponse(BaseModel):
     """Respuesta de análisis de frame"""
     frame_id: str
-    status: str  # "pending", "processing", "completed", "failed"
+    status: str  # "pending", "processing", "completed", "failed", "superseded", "expired"
+    version: int  # Versión del estado (ETag)
     result: Optional[BovinoModel] = None  # BovinoModel directamente cuando completado
     error: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    session: Optional[FrameSessionModel] = None  # Solo con X-Session-Id
+    hints: CaptureHintsModel
+
+# Las rutas de frames devuelven el JSON ya serializado (frame_response), sin
+# validación de FastAPI; el modelo solo documenta el esquema en OpenAPI
+FRAME_RESPONSES = {200: {"model": FrameAnalysisResponse, "description": "Estado del frame"}}
 
 class HealthResponse(BaseModel):
     """Respuesta de health check"""
@@ -82,6 +133,7 @@ class HealthResponse(BaseModel):
     timestamp: datetime
     queue_size: int
     active_analyses: int
+    model_ready: bool = False
 
 @app.on_event("startup")
 async def startup_event():
@@ -91,15 +143,42 @@ async def startup_event():
     print(f"📊 Tamaño de imagen: {settings.IMAGE_SIZE}x{settings.IMAGE_SIZE}")
     print(f"⚖️ Rango de peso: {settings.MIN_WEIGHT}-{settings.MAX_WEIGHT} kg")
     
+    # El servidor acepta conexiones de inmediato (/livez); el modelo se carga
+    # y calienta en segundo plano y /readyz cambia cuando está listo
+    app.state.model_error = None
+    frame_scheduler.start()
+    app.state.model_loader = asyncio.create_task(load_model_in_background())
+    logger.info(f"📡 Servidor corriendo en: http://{settings.HOST}:{settings.PORT} (cargando modelo)")
+
+async def load_model_in_background():
+    """Cargar y calentar el modelo sin bloquear el arranque del servidor"""
     try:
-        # Inicializar Clean Architecture
+        # Inicializar Clean Architecture (la carga de TensorFlow corre en un hilo)
         await repository.initialize()
+        frame_scheduler.set_ready()
+        if settings.MODEL_REGISTRY_WATCH_SECONDS > 0:
+            app.state.registry_watcher = asyncio.create_task(
+                datasource.watch_registry(settings.MODEL_REGISTRY_WATCH_SECONDS)
+            )
         logger.info("✅ Clean Architecture inicializada correctamente")
-        logger.info("✅ Servidor Bovino IA iniciado correctamente")
-        logger.info(f"📡 Servidor corriendo en: http://{settings.HOST}:{settings.PORT}")
+        logger.info("✅ Servidor Bovino IA listo para inferencia")
     except Exception as e:
+        app.state.model_error = str(e)
         logger.error(f"❌ Error al inicializar Clean Architecture: {e}")
-        raise
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de cierre del servidor"""
+    loader = getattr(app.state, "model_loader", None)
+    if loader is not None:
+        loader.cancel()
+    await frame_scheduler.stop()
+    watcher = getattr(app.state, "registry_watcher", None)
+    if watcher is not None:
+        watcher.cancel()
+    repository.close()
+    frame_store.close()
+    logger.info("👋 Servidor Bovino IA detenido")
 
 @app.get("/", response_model=dict)
 async def root():
@@ -111,8 +190,13 @@ async def root():
         "architecture": "Clean Architecture",
         "endpoints": {
             "submit_frame": "/submit-frame",
+            "submit_frame_raw": "/submit-frame/raw",
+            "submit_frame_tensor": "/submit-frame/tensor",
             "check_status": "/check-status/{frame_id}",
             "health": "/health",
+            "livez": "/livez",
+            "readyz": "/readyz",
+            "models": "/models",
             "docs": "/docs"
         },
         "features": [
@@ -127,23 +211,67 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Verificar estado del servidor y cola"""
-    active_analyses = len([item for item in analysis_queue.values() 
-                          if item["status"] in ["pending", "processing"]])
+    status_counts = frame_store.count_by_status()
+    active_analyses = status_counts.get("pending", 0) + status_counts.get("processing", 0)
+    
+    model_ready = datasource.is_model_ready()
+    if model_ready:
+        status = "healthy"
+    elif getattr(app.state, "model_error", None):
+        status = "unhealthy"
+    else:
+        status = "starting"
     
     return HealthResponse(
-        status="healthy",
+        status=status,
         timestamp=datetime.now(),
-        queue_size=len(analysis_queue),
-        active_analyses=active_analyses
+        queue_size=sum(status_counts.values()),
+        active_analyses=active_analyses,
+        model_ready=model_ready
     )
 
-@app.post("/submit-frame", response_model=FrameAnalysisResponse)
+@app.get("/livez")
+async def liveness():
+    """Liveness: el proceso está vivo y atiende peticiones (no depende del modelo)"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness: el modelo está cargado y caliente; listo para recibir tráfico"""
+    if datasource.is_model_ready():
+        return {"status": "ready", "model_version": datasource.model_version}
+    error = getattr(app.state, "model_error", None)
+    return JSONResponse(
+        status_code=503,
+        content={"status": "failed" if error else "loading", "error": error}
+    )
+
+def check_admission() -> None:
+    """Política para frames recibidos antes de que el modelo esté listo"""
+    if datasource.is_model_ready():
+        return
+    if getattr(app.state, "model_error", None) or settings.PRE_READY_POLICY == "reject":
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo no disponible todavía",
+            headers={"Retry-After": str(settings.PRE_READY_RETRY_AFTER_SECONDS)}
+        )
+
+@app.post("/submit-frame", response_class=Response, responses=FRAME_RESPONSES)
 async def submit_frame(
-    background_tasks: BackgroundTasks,
-    frame: UploadFile = File(...)
+    frame: UploadFile = File(...),
+    session_id: Optional[str] = Header(None, alias="X-Session-Id"),
+    device_id: Optional[str] = Header(None, alias="X-Device-Id"),
+    deadline_ms: Optional[float] = Header(None, alias="X-Deadline-Ms")
 ):
     """
     Enviar frame para análisis asíncrono usando Clean Architecture
+    
+    Si el dispositivo (X-Device-Id, o la sesión si no se envía) ya tenía un
+    frame en cola, ese frame queda como "superseded" y no se procesa.
+    X-Deadline-Ms indica cuánto tiempo sigue siendo útil el frame (por
+    defecto FRAME_DEADLINE_SECONDS); si no puede analizarse a tiempo queda
+    como "expired".
     """
     try:
         logger.info("📸 Nueva solicitud de análisis de frame recibida")
@@ -160,160 +288,345 @@ async def submit_frame(
         
         logger.info(f"✅ Tipo de archivo válido: {frame.content_type}")
         
-        # Generar ID único
-        frame_id = str(uuid.uuid4())
-        timestamp = datetime.now()
-        
         # Leer contenido del archivo
         image_content = await frame.read()
         logger.info(f"📊 Contenido leído: {len(image_content)} bytes")
         
-        # Crear entrada en cola
-        analysis_queue[frame_id] = {
-            "frame_id": frame_id,
-            "status": "pending",
-            "image_content": image_content,
-            "created_at": timestamp,
-            "updated_at": timestamp,
-            "result": None,
-            "error": None
-        }
+        return enqueue_frame(image_content, session_id, device_id, deadline_ms)
         
-        logger.info(f"📋 Frame agregado a cola: {frame_id}")
-        logger.info(f"📊 Tamaño de cola actual: {len(analysis_queue)}")
-        
-        # Iniciar procesamiento en background usando Clean Architecture
-        background_tasks.add_task(process_frame_with_clean_architecture, frame_id)
-        logger.info(f"🚀 Procesamiento iniciado para frame: {frame_id}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error al enviar frame: {e}")
+        print(f"❌ Error al enviar frame: {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+@app.post("/submit-frame/raw", response_class=Response, responses=FRAME_RESPONSES)
+async def submit_frame_raw(
+    request: Request,
+    session_id: Optional[str] = Header(None, alias="X-Session-Id"),
+    device_id: Optional[str] = Header(None, alias="X-Device-Id"),
+    deadline_ms: Optional[float] = Header(None, alias="X-Deadline-Ms")
+):
+    """
+    Enviar frame como cuerpo binario (sin multipart)
+    
+    El cuerpo (image/jpeg o application/octet-stream) se lee una sola vez en
+    un buffer preasignado y se pasa como memoryview hasta la decodificación.
+    Mismas cabeceras y respuesta que /submit-frame.
+    """
+    try:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        if content_type not in RAW_CONTENT_TYPES:
+            raise HTTPException(status_code=415, detail=f"Tipo de contenido no soportado: {content_type or 'ninguno'}")
         
-        print(f"📸 Frame {frame_id} enviado para análisis")
+        image_content = await read_raw_body(request, settings.MAX_FRAME_BYTES)
+        if not image_content:
+            raise HTTPException(status_code=400, detail="Cuerpo vacío")
         
-        return FrameAnalysisResponse(
-            frame_id=frame_id,
-            status="pending",
-            created_at=timestamp,
-            updated_at=timestamp
-        )
+        return enqueue_frame(image_content, session_id, device_id, deadline_ms)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Error al enviar frame: {e}")
-        print(f"❌ Error al enviar frame: {e}")
+        logger.error(f"❌ Error al enviar frame (raw): {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
-@app.get("/check-status/{frame_id}", response_model=FrameAnalysisResponse)
-async def check_frame_status(frame_id: str):
+@app.post("/submit-frame/tensor", response_class=Response, responses=FRAME_RESPONSES)
+async def submit_frame_tensor(
+    request: Request,
+    session_id: Optional[str] = Header(None, alias="X-Session-Id"),
+    device_id: Optional[str] = Header(None, alias="X-Device-Id"),
+    deadline_ms: Optional[float] = Header(None, alias="X-Deadline-Ms")
+):
     """
-    Consultar estado de análisis de frame
+    Enviar frame ya redimensionado por el cliente (sin decodificación JPEG)
+    
+    Cuerpo application/x-bovino-tensor: cabecera de 16 bytes y un buffer
+    uint8 RGB de IMAGE_SIZE x IMAGE_SIZE x 3, opcionalmente comprimido con
+    LZ4 o zstd. El worker lo usa como vista np.frombuffer sin copia.
+    Mismas cabeceras y respuesta que /submit-frame.
     """
     try:
-        if frame_id not in analysis_queue:
-            raise HTTPException(status_code=404, detail="Frame no encontrado")
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        if content_type != TENSOR_CONTENT_TYPE:
+            raise HTTPException(status_code=415, detail=f"Tipo de contenido no soportado: {content_type or 'ninguno'}")
+        
+        body = await read_raw_body(request, settings.MAX_FRAME_BYTES)
+        try:
+            tensor = decode_tensor_frame(body, settings.IMAGE_SIZE)
+        except TensorCodecUnavailable as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except TensorFrameError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        frame_data = analysis_queue[frame_id]
+        return enqueue_frame(tensor, session_id, device_id, deadline_ms, FrameEncoding.TENSOR)
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error al enviar frame (tensor): {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+RAW_CONTENT_TYPES = ("image/jpeg", "image/jpg", "application/octet-stream")
+
+async def read_raw_body(request: Request, max_bytes: int) -> memoryview:
+    """Leer el cuerpo de la petición una sola vez, con límite de tamaño"""
+    declared = request.headers.get("content-length")
+    if declared is not None:
+        try:
+            size = int(declared)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Content-Length inválido: {declared}")
+        if size < 0:
+            raise HTTPException(status_code=400, detail=f"Content-Length inválido: {declared}")
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Frame demasiado grande (máximo {max_bytes} bytes)")
+        # Buffer preasignado: cada chunk se copia una vez a su posición final
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        offset = 0
+        async for chunk in request.stream():
+            end = offset + len(chunk)
+            if end > size:
+                raise HTTPException(status_code=400, detail="El cuerpo excede Content-Length")
+            view[offset:end] = chunk
+            offset = end
+        return view[:offset]
+    
+    # Transferencia por chunks sin Content-Length
+    buffer = bytearray()
+    async for chunk in request.stream():
+        if len(buffer) + len(chunk) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Frame demasiado grande (máximo {max_bytes} bytes)")
+        buffer += chunk
+    return memoryview(buffer)
+
+def enqueue_frame(image_content, session_id: Optional[str], device_id: Optional[str],
+                  deadline_ms: Optional[float],
+                  encoding: FrameEncoding = FrameEncoding.IMAGE) -> Response:
+    """Registrar el frame y encolarlo en el planificador"""
+    check_admission()
+    
+    # Generar ID único
+    frame_id = str(uuid.uuid4())
+    
+    # Crear entrada en cola (registro canónico del repositorio)
+    record = repository.registrar_frame(frame_id, image_content, session_id, encoding)
+    
+    logger.info(f"📋 Frame agregado a cola: {frame_id}")
+    logger.info(f"📊 Tamaño de cola actual: {frame_store.size()}")
+    
+    # Recomendaciones según la carga previa: el propio frame no cuenta como carga
+    hints = capture_advisor.hints()
+    
+    # Encolar en el planificador (el último frame de cada dispositivo gana)
+    deadline_s = deadline_ms / 1000.0 if deadline_ms is not None else None
+    frame_scheduler.submit(frame_id, device_id or session_id, session_id, deadline_s)
+    logger.info(f"🚀 Frame encolado para procesamiento: {frame_id}")
+    
+    print(f"📸 Frame {frame_id} enviado para análisis")
+    
+    return frame_response(record, hints=hints)
+
+@app.get("/check-status/{frame_id}", response_class=Response, responses={
+    **FRAME_RESPONSES,
+    304: {"description": "El frame no cambió desde el ETag enviado en If-None-Match"}
+})
+async def check_frame_status(
+    frame_id: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    Consultar estado de análisis de frame
+    
+    Con If-None-Match igual al ETag actual responde 304 sin construir ni
+    serializar el cuerpo.
+    """
+    try:
         # Limpiar frames antiguos (más de 1 hora)
         cleanup_old_frames()
         
-        # Obtener resultado del análisis
-        result = frame_data["result"]
+        # Sondeo condicional: solo se consulta la versión del frame
+        state = repository.obtener_version(frame_id)
+        if state is not None and etag_matches(if_none_match, state[0]):
+            return Response(status_code=304, headers=frame_cache_headers(*state))
         
-        if result is None:
-            # Frame aún procesándose
-            return FrameAnalysisResponse(
-                frame_id=frame_id,
-                status=frame_data["status"],
-                result=None,
-                error=frame_data["error"],
-                created_at=frame_data["created_at"],
-                updated_at=frame_data["updated_at"]
-            )
+        # Frames finalizados: respuesta serializada al completarse, leída
+        # junto con su versión para que el ETag corresponda al cuerpo
+        cached = repository.obtener_respuesta_cacheada(frame_id)
+        if cached is not None and cached[3] is not None:
+            return frame_response(body=cached[3], state=cached[:3])
         
-        # Frame completado - devolver directamente el BovinoModel
-        return FrameAnalysisResponse(
-            frame_id=frame_id,
-            status=frame_data["status"],
-            result=result,  # BovinoModel directamente
-            error=frame_data["error"],
-            created_at=frame_data["created_at"],
-            updated_at=frame_data["updated_at"]
-        )
+        record = repository.obtener_frame(frame_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Frame no encontrado")
         
+        # Frames activos: renderizar directamente desde el registro
+        return frame_response(record)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error al consultar estado: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
-async def process_frame_with_clean_architecture(frame_id: str):
+async def process_frame_with_clean_architecture(frame_id: str, session_id: Optional[str] = None):
     """
     Procesar frame usando Clean Architecture
     """
     try:
-        if frame_id not in analysis_queue:
+        record = repository.obtener_frame(frame_id)
+        if record is None or record.image_content is None:
             logger.error(f"❌ Frame {frame_id} no encontrado en cola")
             return
+        if record.status != FrameStatus.PENDING:
+            # Superado (u otro estado final) entre la admisión y el worker
+            logger.info(f"⏭️ Frame {frame_id} omitido: estado {record.status.label}")
+            return
         
         logger.info(f"🔍 Iniciando procesamiento de frame {frame_id} con Clean Architecture...")
-        
-        # Marcar como procesando
-        analysis_queue[frame_id]["status"] = "processing"
-        analysis_queue[frame_id]["updated_at"] = datetime.now()
-        
         print(f"🔍 Procesando frame {frame_id}...")
         
         # Obtener contenido de imagen
-        image_content = analysis_queue[frame_id]["image_content"]
+        image_content = record.image_content
         logger.info(f"📊 Imagen obtenida de cola: {len(image_content)} bytes")
         
-        # Usar Clean Architecture: UseCase
+        # Usar Clean Architecture: UseCase (actualiza el registro del frame)
         logger.info(f"🎯 Ejecutando análisis con Clean Architecture...")
-        analysis_entity = await analizar_bovino_usecase.execute(frame_id, image_content)
+        analysis_entity = await analizar_bovino_usecase.execute(
+            frame_id, image_content, session_id, record.encoding
+        )
         bovino_entity = analysis_entity.result
         
-        if bovino_entity is None:
-            raise Exception("No se pudo obtener resultado del análisis")
-            
         logger.info(f"✅ Análisis completado usando Clean Architecture para frame {frame_id}")
-        
-        # Convertir entidad a modelo de API
-        bovino_model = BovinoModel(
-            raza=bovino_entity.raza,
-            caracteristicas=bovino_entity.caracteristicas,
-            confianza=bovino_entity.confianza,
-            peso_estimado=bovino_entity.peso_estimado,
-            timestamp=bovino_entity.timestamp,
-            detection_result=BovinoDetectionResult.BOVINO_DETECTED,
-            precision_score=bovino_entity.precision_score,
-            processing_time_ms=bovino_entity.processing_time_ms
-        )
-        
-        # Guardar directamente el BovinoModel
-        analysis_queue[frame_id]["result"] = bovino_model
-        analysis_queue[frame_id]["status"] = "completed"
-        analysis_queue[frame_id]["updated_at"] = datetime.now()
-        
         logger.info(f"📊 Resultado guardado: {bovino_entity.raza} ({bovino_entity.confianza:.2f}%)")
         print(f"✅ Frame {frame_id} procesado exitosamente con Clean Architecture")
         
     except Exception as e:
+        # El caso de uso ya marcó el frame como fallido en el repositorio
         logger.error(f"❌ Error procesando frame {frame_id}: {e}")
-        
-        # Marcar como fallido
-        analysis_queue[frame_id]["error"] = str(e)
-        analysis_queue[frame_id]["status"] = "failed"
-        analysis_queue[frame_id]["updated_at"] = datetime.now()
-        
         print(f"❌ Error procesando frame {frame_id}: {e}")
 
+frame_scheduler = FrameScheduler(
+    repository,
+    process_frame_with_clean_architecture,
+    workers=runtime_config["workers"],
+    default_deadline_s=settings.FRAME_DEADLINE_SECONDS
+)
+capture_advisor = CaptureHintAdvisor(
+    frame_scheduler,
+    capture_interval_ms=settings.CAPTURE_INTERVAL_MS,
+    max_capture_interval_ms=settings.MAX_CAPTURE_INTERVAL_MS,
+    poll_delay_ms=settings.POLL_DELAY_MS,
+    max_poll_delay_ms=settings.MAX_POLL_DELAY_MS
+)
+
+def frame_cache_headers(version: int, status: FrameStatus, updated_at: float) -> dict:
+    """
+    Cabeceras ETag y Cache-Control de la respuesta de un frame
+    
+    El ETag es débil porque identifica el estado del frame, no las
+    recomendaciones que acompañan al cuerpo. Un frame activo puede cachearse
+    hasta su propia finalización estimada (según su estado y desde cuándo
+    está en él). Uno finalizado ya no cambia, pero sus recomendaciones sí:
+    se revalida en cada sondeo (no-cache) en lugar de marcarse immutable.
+    """
+    if status in (FrameStatus.PENDING, FrameStatus.PROCESSING):
+        remaining = frame_scheduler.expected_remaining_s(status, updated_at)
+        cache_control = f"private, max-age={int(remaining or 0)}"
+    else:
+        cache_control = "private, no-cache"
+    return {"ETag": f'W/"{version}"', "Cache-Control": cache_control}
+
+def frame_response(record=None, body: Optional[bytes] = None,
+                   state: Optional[Tuple[int, FrameStatus, float]] = None,
+                   hints: Optional[dict] = None) -> Response:
+    """
+    Respuesta de un frame con las recomendaciones de captura según la carga
+    
+    Los frames finalizados traen su JSON ya serializado (body, con su
+    versión, estado y última actualización en state); solo se serializan
+    las recomendaciones, que dependen de la carga del momento, y se insertan
+    antes de la llave de cierre. Al enviar un frame se pasan ya calculadas
+    (hints) con la carga medida antes de encolarlo.
+    """
+    if body is None:
+        body, state = record.to_response_bytes(), (record.version, record.status, record.updated_at)
+    content = body[:-1] + b',"hints":' + encode_json(hints if hints is not None else capture_advisor.hints()) + b'}'
+    return Response(content=content, media_type="application/json",
+                    headers=frame_cache_headers(*state))
+
+def etag_matches(if_none_match: Optional[str], version: int) -> bool:
+    """Comprobar si el ETag enviado por el cliente corresponde a la versión actual"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = f'"{version}"'
+    return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Consultar el resultado vigente de una sesión de filmación"""
+    session = await repository.obtener_sesion(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    return JSONResponse(content=session.to_dict())
+
+@app.post("/sessions/{session_id}/reset")
+async def reset_session(session_id: str):
+    """Nuevo animal: desbloquear la sesión y volver a inferir"""
+    session = await reiniciar_sesion_usecase.execute(session_id)
+    return JSONResponse(content=session.to_dict())
+
+def require_admin(token: Optional[str]) -> None:
+    """Validar el token de administración (sin ADMIN_TOKEN los endpoints quedan deshabilitados)"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoints de administración deshabilitados: define ADMIN_TOKEN")
+    if token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+@app.get("/models")
+async def list_models():
+    """Versiones del registro de modelos y versión activa"""
+    return {
+        "active_version": datasource.model_version,
+        "loading_version": datasource.loading_version,
+        "versions": model_registry.versions()
+    }
+
+@app.post("/models/{version}/activate", status_code=202)
+async def activate_model(
+    version: str,
+    admin_token: Optional[str] = Header(None, alias="X-Admin-Token")
+):
+    """
+    Activar una versión del registro sin reiniciar (hot swap)
+    
+    El modelo se carga y calienta en segundo plano; los frames se siguen
+    atendiendo con el modelo activo hasta el cambio.
+    """
+    require_admin(admin_token)
+    try:
+        model_registry.bundle_paths(version)
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    async def activate():
+        try:
+            await datasource.activate_version(version)
+        except Exception as e:
+            logger.error(f"❌ Error activando modelo {version}: {e}")
+    
+    asyncio.create_task(activate())
+    return {"status": "loading", "version": version, "active_version": datasource.model_version}
+
 def cleanup_old_frames():
     """Limpiar frames antiguos de la cola"""
-    cutoff_time = datetime.now() - timedelta(hours=1)
-    frames_to_remove = []
-    
-    for frame_id, frame_data in analysis_queue.items():
-        if frame_data["created_at"] < cutoff_time:
-            frames_to_remove.append(frame_id)
+    cutoff_time = datetime.now() - timedelta(hours=settings.FRAME_TIMEOUT_HOURS)
     
-    for frame_id in frames_to_remove:
-        del analysis_queue[frame_id]
+    for frame_id in frame_store.remove_older_than(cutoff_time):
         print(f"🗑️ Frame {frame_id} eliminado por antigüedad")
 
 
@@ -321,15 +634,14 @@ def cleanup_old_frames():
 @app.get("/stats")
 async def get_stats():
     """Obtener estadísticas del servidor"""
-    total_frames = len(analysis_queue)
-    pending_frames = len([item for item in analysis_queue.values() 
-                         if item["status"] == "pending"])
-    processing_frames = len([item for item in analysis_queue.values() 
-                           if item["status"] == "processing"])
-    completed_frames = len([item for item in analysis_queue.values() 
-                          if item["status"] == "completed"])
-    failed_frames = len([item for item in analysis_queue.values() 
-                        if item["status"] == "failed"])
+    status_counts = frame_store.count_by_status()
+    total_frames = sum(status_counts.values())
+    pending_frames = status_counts.get("pending", 0)
+    processing_frames = status_counts.get("processing", 0)
+    completed_frames = status_counts.get("completed", 0)
+    failed_frames = status_counts.get("failed", 0)
+    superseded_frames = status_counts.get("superseded", 0)
+    expired_frames = status_counts.get("expired", 0)
     
     # Obtener estadísticas del datasource
     model_info = await datasource.get_model_info()
@@ -340,12 +652,18 @@ async def get_stats():
         "processing": processing_frames,
         "completed": completed_frames,
         "failed": failed_frames,
+        "superseded": superseded_frames,
+        "expired": expired_frames,
+        "scheduler": frame_scheduler.stats(),
+        "load": frame_scheduler.load_signal(),
         "server_uptime": "running",
         "model_loaded": datasource.is_model_ready(),
-        "model_info": model_info
+        "model_info": model_info,
+        "process": {"pid": os.getpid(), "memory": current_process_memory()}
     }
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host=settings.HOST,
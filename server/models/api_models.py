@@ -37,6 +37,10 @@ class BovinoModel(BaseModel):
         default=None,
         description="Tiempo de procesamiento en milisegundos"
     )
+    model_version: Optional[str] = Field(
+        default=None,
+        description="Versión del modelo que produjo el resultado"
+    )
 
 class BovinoAnalysisRequest(BaseModel):
     """Solicitud de análisis de bovino"""
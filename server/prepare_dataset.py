@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+🗜️ Conversión del dataset a un formato listo para entrenar
+
+Recorre el dataset una sola vez con un pool de procesos. Cada imagen se
+decodifica y redimensiona a IMAGE_SIZE con PIL, igual que en el servidor,
+y se escribe como uint8 en uno de dos formatos:
+
+- tfrecord: shards TFRecord con los píxeles, la etiqueta y el hash
+- memmap: un único archivo uint8 (N, IMAGE_SIZE, IMAGE_SIZE, 3) más un índice de etiquetas
+
+Es incremental: manifest.json guarda el hash SHA-1 del contenido de cada
+imagen convertida, y las ya convertidas se omiten (también los
+duplicados, con un aviso si están en otra raza). El manifiesto se guarda a
+medida que se cierran shards o se sincronizan filas, así que una ejecución
+interrumpida conserva su progreso. train_model.py consume cualquiera de los dos formatos con
+--data.
+
+Uso:
+    python prepare_dataset.py --output ~/Datasets/Bovino/prepared --format tfrecord
+    python prepare_dataset.py --output ~/Datasets/Bovino/memmap --format memmap --workers 8
+"""
+
+import os
+import io
+import json
+import time
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+MEMMAP_FILE = "images.uint8"
+MANIFEST_VERSION = 1
+# Filas del memmap entre guardados del manifiesto (una conversión interrumpida conserva lo ya guardado)
+CHECKPOINT_ROWS = 1000
+
+# Estado de cada proceso del pool (fijado por _init_worker)
+_image_size = 224
+_known: frozenset = frozenset()
+
+
+def _init_worker(image_size: int, known: frozenset) -> None:
+    global _image_size, _known
+    _image_size = image_size
+    _known = known
+
+
+def _convert(task):
+    """Leer, hashear y, si es nueva, decodificar y redimensionar una imagen"""
+    from PIL import Image
+
+    path, label = task
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        if digest in _known:
+            return ("skip", digest, path, label)
+        image = Image.open(io.BytesIO(data)).convert("RGB").resize((_image_size, _image_size))
+        return ("ok", digest, path, label, np.asarray(image, dtype=np.uint8).tobytes())
+    except Exception as e:
+        return ("error", path, str(e))
+
+
+def load_manifest(output_dir: Path) -> Optional[dict]:
+    path = output_dir / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(output_dir: Path, manifest: dict) -> None:
+    """Escritura atómica: el manifiesto solo referencia datos ya escritos"""
+    tmp_path = output_dir / (MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, output_dir / MANIFEST_FILE)
+
+
+class TFRecordShardWriter:
+    """
+    Shards TFRecord de tamaño fijo; cada ejecución escribe shards nuevos
+
+    Un shard solo entra en el manifiesto al cerrarse; synced() indica que
+    todo lo escrito hasta ahora está en shards cerrados.
+    """
+
+    def __init__(self, output_dir: Path, manifest: dict, shard_size: int):
+        import tensorflow as tf
+
+        self.tf = tf
+        self.output_dir = output_dir
+        self.manifest = manifest
+        self.shard_size = shard_size
+        self.run_id = time.strftime("%Y%m%d%H%M%S")
+        self._writer = None
+        self._shard_name = None
+        self._in_shard = 0
+        self._synced = False
+
+    def _open_shard(self) -> None:
+        self._shard_name = f"part-{self.run_id}-{len(self.manifest['shards']):05d}.tfrecord"
+        self._writer = self.tf.io.TFRecordWriter(str(self.output_dir / self._shard_name))
+        self._in_shard = 0
+
+    def write(self, digest: str, label: int, pixels: bytes) -> dict:
+        if self._writer is None:
+            self._open_shard()
+        feature = self.tf.train.Feature
+        example = self.tf.train.Example(features=self.tf.train.Features(feature={
+            "image": feature(bytes_list=self.tf.train.BytesList(value=[pixels])),
+            "label": feature(int64_list=self.tf.train.Int64List(value=[label])),
+            "hash": feature(bytes_list=self.tf.train.BytesList(value=[digest.encode("ascii")])),
+        }))
+        self._writer.write(example.SerializeToString())
+        self._in_shard += 1
+        location = {"shard": self._shard_name}
+        if self._in_shard >= self.shard_size:
+            self.close()
+        return location
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self.manifest["shards"].append(self._shard_name)
+            self._writer = None
+            self._synced = True
+
+    def synced(self) -> bool:
+        synced, self._synced = self._synced, False
+        return synced
+
+
+class MemmapWriter:
+    """
+    Archivo uint8 crudo (N, S, S, 3) al que se añaden filas
+
+    Cada CHECKPOINT_ROWS filas se sincroniza a disco y synced() lo indica.
+    """
+
+    def __init__(self, output_dir: Path, manifest: dict):
+        self.path = output_dir / MEMMAP_FILE
+        self.manifest = manifest
+        row_bytes = manifest["image_size"] ** 2 * 3
+        # Filas escritas por una ejecución interrumpida que el manifiesto no registra
+        committed = len(manifest["entries"]) * row_bytes
+        with open(self.path, "ab") as f:
+            f.truncate(committed)
+        self._file = open(self.path, "ab")
+        self._row = len(manifest["entries"])
+        self._unsynced = 0
+
+    def write(self, digest: str, label: int, pixels: bytes) -> dict:
+        self._file.write(pixels)
+        location = {"row": self._row}
+        self._row += 1
+        self._unsynced += 1
+        return location
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def synced(self) -> bool:
+        if self._unsynced < CHECKPOINT_ROWS:
+            return False
+        self._sync()
+        return True
+
+    def close(self) -> None:
+        self._sync()
+        self._file.close()
+
+
+def convert(dataset_path: Path, output_dir: Path, fmt: str, image_size: int, workers: int,
+            shard_size: int, breeds: List[str], max_per_breed: Optional[int] = None) -> bool:
+    from train_model import list_dataset_files
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    if manifest is None:
+        manifest = {"version": MANIFEST_VERSION, "format": fmt, "image_size": image_size,
+                    "breeds": breeds, "entries": [], "shards": []}
+    elif (manifest["format"], manifest["image_size"], manifest["breeds"]) != (fmt, image_size, breeds):
+        logger.error(
+            f"❌ {output_dir} contiene {manifest['format']} a {manifest['image_size']}px con otras razas; "
+            f"usar otro --output"
+        )
+        return False
+
+    if fmt == "tfrecord":
+        # Shards de una ejecución interrumpida que nunca llegaron al manifiesto
+        for orphan in set(p.name for p in output_dir.glob("part-*.tfrecord")) - set(manifest["shards"]):
+            logger.info(f"🧹 Eliminando shard incompleto {orphan}")
+            (output_dir / orphan).unlink()
+
+    paths, labels = list_dataset_files(dataset_path, breeds, max_per_breed)
+    known = frozenset(entry["hash"] for entry in manifest["entries"])
+    logger.info(f"🗜️ {len(paths)} imágenes, {len(known)} ya convertidas; {workers} procesos")
+
+    writer = (TFRecordShardWriter(output_dir, manifest, shard_size) if fmt == "tfrecord"
+              else MemmapWriter(output_dir, manifest))
+    # Etiqueta de cada contenido ya visto (para detectar la misma imagen en dos razas)
+    seen = {entry["hash"]: entry["label"] for entry in manifest["entries"]}
+    pending = []
+    converted = skipped = failed = 0
+    started = time.perf_counter()
+
+    def commit() -> None:
+        manifest["entries"].extend(pending)
+        pending.clear()
+        _save_manifest(output_dir, manifest)
+
+    # spawn: los procesos del pool no heredan TensorFlow (no es seguro tras fork)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=_init_worker, initargs=(image_size, known)) as pool:
+        for result in pool.imap_unordered(_convert, zip(paths, labels), chunksize=16):
+            if result[0] == "error":
+                failed += 1
+                logger.warning(f"⚠️ Error convirtiendo {result[1]}: {result[2]}")
+                continue
+            digest, path, label = result[1], result[2], result[3]
+            if digest in seen:
+                skipped += 1
+                if seen[digest] != label:
+                    logger.warning(
+                        f"⚠️ {path} ({breeds[label]}) tiene el mismo contenido que una imagen de "
+                        f"{breeds[seen[digest]]}; se conserva solo la primera"
+                    )
+                continue
+            location = writer.write(digest, label, result[4])
+            pending.append({"hash": digest, "label": label, "path": path, **location})
+            seen[digest] = label
+            converted += 1
+            if writer.synced():
+                commit()
+            if converted % 500 == 0:
+                logger.info(f"📦 {converted} convertidas ({converted / (time.perf_counter() - started):.0f} img/s)")
+
+    writer.close()
+    commit()
+    logger.info(
+        f"✅ {converted} convertidas, {skipped} omitidas, {failed} con error en "
+        f"{time.perf_counter() - started:.1f}s; total {len(manifest['entries'])} en {output_dir}"
+    )
+    return failed == 0
+
+
+def main_cli() -> None:
+    from train_model import BREEDS, DEFAULT_DATASET_PATH
+
+    parser = argparse.ArgumentParser(description="Convertir el dataset a TFRecord o memmap uint8")
+    parser.add_argument("--dataset", type=Path, default=DEFAULT_DATASET_PATH, help="Carpeta con una subcarpeta por raza")
+    parser.add_argument("--output", type=Path, required=True, help="Directorio del dataset convertido")
+    parser.add_argument("--format", choices=("tfrecord", "memmap"), default="tfrecord")
+    parser.add_argument("--image-size", type=int, default=int(os.getenv("IMAGE_SIZE", "224")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos de decodificación")
+    parser.add_argument("--shard-size", type=int, default=1024, help="Imágenes por shard TFRecord")
+    parser.add_argument("--max-per-breed", type=int, help="Limitar imágenes por raza (pruebas rápidas)")
+    args = parser.parse_args()
+
+    ok = convert(args.dataset, args.output.expanduser(), args.format, args.image_size,
+                 max(1, args.workers), args.shard_size, BREEDS, args.max_per_breed)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
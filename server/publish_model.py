@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+📦 Publicar un modelo entrenado en el registro de modelos versionados
+
+Uso:
+    python publish_model.py <versión> [modelo.h5] [class_labels.json]
+
+El servidor lo activa con POST /models/<versión>/activate o, si
+MODEL_REGISTRY_WATCH_SECONDS > 0, automáticamente al detectarlo.
+"""
+
+import sys
+
+from config.settings import Settings
+from data.datasources.model_registry import ModelRegistry
+
+
+def publish_model():
+    """Copiar el modelo y sus etiquetas al registro como una nueva versión"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return False
+
+    settings = Settings()
+    version = sys.argv[1]
+    model_path = sys.argv[2] if len(sys.argv) > 2 else settings.MODEL_PATH
+    labels_path = sys.argv[3] if len(sys.argv) > 3 else settings.LABELS_PATH
+
+    registry = ModelRegistry(settings.MODEL_REGISTRY_DIR)
+    try:
+        version_dir = registry.publish(version, model_path, labels_path)
+    except Exception as e:
+        print(f"❌ Error publicando el modelo: {e}")
+        return False
+
+    print(f"✅ Versión {version} publicada en: {version_dir}")
+    print(f"📋 Versiones disponibles: {', '.join(registry.versions())}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if publish_model() else 1)
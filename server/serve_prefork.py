@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+🍴 Servidor pre-fork: pesos del modelo compartidos entre workers vía mmap
+
+El proceso maestro no crea estado de TensorFlow (el runtime no sobrevive a
+un fork): solo se asegura de que exista el flatbuffer TFLite del modelo,
+convirtiéndolo en un subproceso, abre el socket y hace fork de los workers
+(uvicorn). Cada worker carga el modelo con MODEL_BACKEND=tflite tras el
+fork; el intérprete abre el flatbuffer con mmap de solo lectura, así que los
+pesos están una sola vez en memoria (page cache) para todos los workers.
+El estado de los frames se comparte por SQLite (FRAME_STORE_BACKEND=sqlite,
+forzado).
+
+Con --no-share (PREFORK_SHARE_MODEL=False) cada worker carga su propio
+modelo con MODEL_BACKEND tal como esté configurado (línea base de memoria).
+
+El maestro escribe periódicamente (y con SIGUSR1) un reporte de memoria
+única frente a compartida por worker en PREFORK_REPORT_PATH.
+
+Uso:
+    python serve_prefork.py --workers 8
+    python serve_prefork.py --workers 8 --no-share   # línea base sin compartir
+    kill -USR1 <pid del maestro> && cat storage/prefork_memory.json
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import signal
+import socket
+import logging
+import argparse
+
+logger = logging.getLogger("prefork")
+
+
+def run_worker(server, sock: socket.socket) -> None:
+    """Proceso hijo: servir la app sobre el socket heredado (carga su modelo al arrancar)"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+    import uvicorn
+    config = uvicorn.Config(server.app, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class PreforkMaster:
+    """Crea, vigila y reemplaza los workers; reporta su memoria"""
+
+    def __init__(self, server, sock: socket.socket, workers: int, share: bool,
+                 report_path: str, report_seconds: float):
+        self.server = server
+        self.sock = sock
+        self.workers = workers
+        self.share = share
+        self.report_path = report_path
+        self.report_seconds = report_seconds
+        self.children = set()
+        self.stopping = False
+        self._report_requested = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.server, self.sock)
+            finally:
+                os._exit(0)
+        self.children.add(pid)
+        logger.info(f"🍴 Worker {pid} iniciado")
+
+    def stop(self, *_) -> None:
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def request_report(self, *_) -> None:
+        self._report_requested = True
+
+    def report(self) -> None:
+        from services.memory_report import memory_report
+
+        report = memory_report(os.getpid(), sorted(self.children))
+        report["shared_model"] = self.share
+        report["timestamp"] = time.time()
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        totals = report["totals"]
+        logger.info(
+            f"📊 Memoria: {totals['processes']} procesos, PSS total {totals['pss_mb']} MB "
+            f"(RSS sumada {totals['rss_mb']} MB), única por worker {report['per_worker_unique_mb']} MB, "
+            f"ahorro por compartir {totals['saved_by_sharing_mb']} MB"
+        )
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGUSR1, self.request_report)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        next_report = time.monotonic() + min(10.0, self.report_seconds)
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            if pid == 0:
+                if self._report_requested or (not self.stopping and time.monotonic() >= next_report):
+                    self._report_requested = False
+                    self.report()
+                    next_report = time.monotonic() + self.report_seconds
+                time.sleep(0.2)
+                continue
+
+            self.children.discard(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+            logger.warning(f"⚠️ Worker {pid} terminó (código {code}); reemplazándolo")
+            time.sleep(1.0)
+            self.spawn()
+
+        logger.info("👋 Servidor pre-fork detenido")
+        return 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Servidor pre-fork con modelo compartido")
+    parser.add_argument("--workers", type=int, help="Procesos worker (por defecto WEB_CONCURRENCY)")
+    parser.add_argument("--host", help="Host (por defecto HOST)")
+    parser.add_argument("--port", type=int, help="Puerto (por defecto PORT)")
+    parser.add_argument("--no-share", action="store_true", help="Cada worker carga su propio modelo")
+    args = parser.parse_args()
+
+    # Antes de importar la app: Settings y el runtime de TF leen el entorno al cargarse
+    from dotenv import load_dotenv
+    load_dotenv()
+    if args.workers:
+        os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    if os.getenv("FRAME_STORE_BACKEND", "memory").lower() != "sqlite":
+        print("ℹ️ FRAME_STORE_BACKEND=sqlite (el estado de los frames debe compartirse entre workers)")
+        os.environ["FRAME_STORE_BACKEND"] = "sqlite"
+    share = not args.no_share and os.getenv("PREFORK_SHARE_MODEL", "True").lower() == "true"
+    if share:
+        os.environ["MODEL_BACKEND"] = "tflite"
+
+    import main as server
+    from data.datasources.tflite_model import ensure_tflite
+    settings = server.settings
+    workers = max(1, settings.WEB_CONCURRENCY)
+
+    if share:
+        # La conversión corre en un subproceso: el maestro no importa TensorFlow
+        try:
+            _, model_path, _ = server.datasource.resolve_model_paths()
+            ensure_tflite(model_path, settings.TFLITE_CACHE_DIR)
+        except Exception as e:
+            logger.error(f"❌ No se pudo preparar el modelo TFLite: {e}")
+            sys.exit(1)
+    if "tensorflow" in sys.modules:
+        logger.error("❌ TensorFlow se importó en el proceso maestro; no es seguro hacer fork")
+        sys.exit(1)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host or settings.HOST, args.port or settings.PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Objetos existentes fuera del GC: recorrerlos tocaría sus páginas y rompería el copy-on-write
+    gc.freeze()
+
+    logger.info(
+        f"🍴 Pre-fork: {workers} workers en http://{args.host or settings.HOST}:{args.port or settings.PORT} "
+        f"({'pesos TFLite compartidos' if share else 'un modelo por worker'})"
+    )
+    master = PreforkMaster(
+        server, sock, workers, share,
+        report_path=settings.PREFORK_REPORT_PATH,
+        report_seconds=settings.PREFORK_REPORT_SECONDS,
+    )
+    sys.exit(master.run())
+
+
+if __name__ == "__main__":
+    main_cli()
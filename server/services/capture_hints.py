@@ -0,0 +1,63 @@
+import logging
+
+from .frame_scheduler import FrameScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureHintAdvisor:
+    """
+    Recomendaciones de captura para el cliente según la carga del servidor
+
+    Control de flujo en lazo cerrado: a partir de la señal de carga del
+    planificador (profundidad de cola, tiempo de servicio EWMA y uso de
+    workers) se recomienda al cliente el intervalo de captura, el preset de
+    resolución y la espera antes del siguiente sondeo, para que reduzca el
+    ritmo antes de que el servidor se sature.
+    """
+
+    # Umbrales de carga (por worker) para bajar el preset de resolución
+    MEDIUM_LOAD = 0.5
+    LOW_LOAD = 1.0
+
+    def __init__(self, scheduler: FrameScheduler,
+                 capture_interval_ms: int = 3000,
+                 max_capture_interval_ms: int = 15000,
+                 poll_delay_ms: int = 2000,
+                 min_poll_delay_ms: int = 250,
+                 max_poll_delay_ms: int = 10000):
+        self.scheduler = scheduler
+        self.capture_interval_ms = capture_interval_ms
+        self.max_capture_interval_ms = max_capture_interval_ms
+        self.poll_delay_ms = poll_delay_ms
+        self.min_poll_delay_ms = min_poll_delay_ms
+        self.max_poll_delay_ms = max_poll_delay_ms
+
+    def resolution_preset(self, load: float) -> str:
+        """Preset de resolución (low, medium, high) para una carga dada"""
+        if load < self.MEDIUM_LOAD:
+            return "high"
+        if load < self.LOW_LOAD:
+            return "medium"
+        return "low"
+
+    def hints(self) -> dict:
+        """Recomendaciones para incluir en las respuestas de la API"""
+        signal = self.scheduler.load_signal()
+        load = signal["load"]
+
+        # Con carga > 1 el intervalo crece en proporción a la sobrecarga
+        capture_interval = self.capture_interval_ms * max(1.0, load)
+
+        # Sondear cuando el resultado probablemente esté listo
+        if signal["service_time_ms"] > 0:
+            poll_delay = signal["expected_wait_ms"] + signal["service_time_ms"]
+        else:
+            poll_delay = self.poll_delay_ms
+
+        return {
+            "load": round(load, 2),
+            "capture_interval_ms": int(min(capture_interval, self.max_capture_interval_ms)),
+            "resolution_preset": self.resolution_preset(load),
+            "poll_delay_ms": int(min(max(poll_delay, self.min_poll_delay_ms), self.max_poll_delay_ms)),
+        }
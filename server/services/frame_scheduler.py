@@ -0,0 +1,238 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from domain.entities.frame_record import FrameStatus
+from data.repositories.bovino_repository_impl import BovinoRepositoryImpl
+
+logger = logging.getLogger(__name__)
+
+
+class FrameScheduler:
+    """
+    Planificador de frames por plazo (EDF) con admisión "el último frame gana"
+
+    Cada frame lleva un plazo (deadline) tras el cual el cliente ya no espera
+    la respuesta. Los workers toman siempre el frame con el plazo más
+    cercano y descartan como ``expired`` los que no pueden terminar a tiempo
+    según el tiempo de servicio estimado, sin ejecutar inferencia.
+
+    Además cada dispositivo tiene como mucho un frame pendiente: si llega un
+    frame nuevo mientras el anterior del mismo dispositivo sigue en cola, el
+    anterior se marca como ``superseded``.
+
+    El estado de admisión es local al proceso: con varios workers de uvicorn
+    cada uno planifica los frames que recibe.
+    """
+
+    # Límites (segundos) de los cubos del histograma de holgura al despachar
+    SLACK_BUCKETS = (0.0, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+    def __init__(self, repository: BovinoRepositoryImpl,
+                 process: Callable[[str, Optional[str]], Awaitable[None]],
+                 workers: int = 2,
+                 default_deadline_s: float = 10.0,
+                 service_time_alpha: float = 0.2):
+        if workers <= 0:
+            raise ValueError("El número de workers debe ser positivo")
+        self.repository = repository
+        self.process = process
+        self.workers = workers
+        self.default_deadline_s = default_deadline_s
+        self.service_time_alpha = service_time_alpha
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._sequence = itertools.count()
+        # Dispositivo -> frame pendiente (aún no tomado por un worker)
+        self._pending_by_device: Dict[str, str] = {}
+        # Tiempo de servicio estimado (media móvil exponencial, segundos)
+        self.service_time_s = 0.0
+        self.superseded_total = 0
+        self.expired_total = 0
+        self.processed_total = 0
+        # Frames vivos en cola (sin contar superados) y workers ocupados
+        self._queued = 0
+        self._busy = 0
+        # Un cubo por límite más el cubo de desbordamiento
+        self._slack_counts: List[int] = [0] * (len(self.SLACK_BUCKETS) + 1)
+
+    def start(self) -> None:
+        """Arrancar los workers en el event loop actual"""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._ready = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"frame-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"🗂️ FrameScheduler iniciado con {self.workers} workers")
+
+    def set_ready(self) -> None:
+        """Permitir que los workers empiecen a despachar (modelo listo)"""
+        if self._queue is None:
+            self.start()
+        self._ready.set()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready is not None and self._ready.is_set()
+
+    async def stop(self) -> None:
+        """Detener los workers (los frames en cola quedan pendientes)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, frame_id: str, device_id: Optional[str] = None,
+               session_id: Optional[str] = None,
+               deadline_s: Optional[float] = None) -> Optional[str]:
+        """
+        Encolar un frame para análisis
+
+        Args:
+            frame_id: ID del frame
+            device_id: Dispositivo de origen (coalescencia por dispositivo)
+            session_id: Sesión de filmación
+            deadline_s: Segundos hasta que el frame deja de ser útil
+                (por defecto ``default_deadline_s``)
+
+        Returns:
+            ID del frame superado por este (None si no había ninguno)
+        """
+        if self._queue is None:
+            self.start()
+
+        superseded = None
+        if device_id:
+            superseded = self._pending_by_device.get(device_id)
+            self._pending_by_device[device_id] = frame_id
+            if superseded is not None:
+                self.repository.descartar_frame(
+                    superseded, FrameStatus.SUPERSEDED,
+                    f"Superado por el frame {frame_id}"
+                )
+                self.superseded_total += 1
+                self._queued -= 1
+                logger.info(f"⏭️ Frame {superseded} superado por {frame_id} (dispositivo {device_id})")
+
+        budget = self.default_deadline_s if deadline_s is None else deadline_s
+        deadline = time.monotonic() + budget
+        self._queue.put_nowait((deadline, next(self._sequence), frame_id, device_id, session_id))
+        self._queued += 1
+        return superseded
+
+    def queue_size(self) -> int:
+        """Entradas en cola (incluye frames ya superados aún no retirados)"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _take(self, frame_id: str, device_id: Optional[str]) -> bool:
+        """Retirar el frame de la admisión; False si fue superado"""
+        if not device_id:
+            return True
+        if self._pending_by_device.get(device_id) != frame_id:
+            return False
+        del self._pending_by_device[device_id]
+        return True
+
+    def _record_slack(self, slack: float) -> None:
+        self._slack_counts[bisect.bisect_right(self.SLACK_BUCKETS, slack)] += 1
+
+    async def _worker(self) -> None:
+        while True:
+            # Los frames recibidos antes de que el modelo esté listo esperan en cola
+            await self._ready.wait()
+            deadline, _, frame_id, device_id, session_id = await self._queue.get()
+            try:
+                if not self._take(frame_id, device_id):
+                    continue
+                self._queued -= 1
+
+                # Holgura: tiempo restante menos el tiempo de servicio esperado
+                slack = deadline - time.monotonic() - self.service_time_s
+                self._record_slack(slack)
+                if slack < 0:
+                    self.repository.descartar_frame(
+                        frame_id, FrameStatus.EXPIRED,
+                        "Plazo vencido antes del análisis"
+                    )
+                    self.expired_total += 1
+                    logger.info(f"⌛ Frame {frame_id} expirado sin inferencia (holgura {slack:.2f}s)")
+                    continue
+
+                start = time.monotonic()
+                self._busy += 1
+                try:
+                    await self.process(frame_id, session_id)
+                finally:
+                    self._busy -= 1
+                elapsed = time.monotonic() - start
+                self.service_time_s += self.service_time_alpha * (elapsed - self.service_time_s)
+                self.processed_total += 1
+            except Exception as e:
+                logger.error(f"❌ Error en worker procesando frame {frame_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def load_signal(self) -> dict:
+        """
+        Señal de carga actual
+
+        ``load`` es la carga ofrecida por worker: (en cola + en proceso) / workers.
+        Por debajo de 1 hay workers libres; por encima, los frames esperan.
+        """
+        expected_wait_s = self._queued * self.service_time_s / self.workers
+        return {
+            "queue_depth": self._queued,
+            "busy_workers": self._busy,
+            "utilization": self._busy / self.workers,
+            "service_time_ms": self.service_time_s * 1000,
+            "expected_wait_ms": expected_wait_s * 1000,
+            "load": (self._queued + self._busy) / self.workers,
+        }
+
+    def expected_remaining_s(self, status: FrameStatus, since: float) -> Optional[float]:
+        """
+        Tiempo estimado hasta que termine un frame activo
+
+        Args:
+            status: Estado del frame (pendiente o en proceso)
+            since: Epoch en que el frame entró en ese estado (updated_at)
+
+        Returns:
+            Segundos restantes, None si aún no hay tiempo de servicio medido
+        """
+        if self.service_time_s <= 0:
+            return None
+        expected = self.service_time_s
+        if status == FrameStatus.PENDING:
+            expected += self._queued * self.service_time_s / self.workers
+        return max(0.0, expected - (time.time() - since))
+
+    def slack_histogram(self) -> Dict[str, int]:
+        """Histograma de holgura al despachar (cubos en segundos)"""
+        labels = [f"<{self.SLACK_BUCKETS[0]:g}s"]
+        labels += [f"{low:g}-{high:g}s" for low, high in zip(self.SLACK_BUCKETS, self.SLACK_BUCKETS[1:])]
+        labels.append(f">={self.SLACK_BUCKETS[-1]:g}s")
+        return dict(zip(labels, self._slack_counts))
+
+    def stats(self) -> dict:
+        """Estadísticas de admisión y planificación"""
+        return {
+            "workers": self.workers,
+            "ready": self.is_ready,
+            "queue_size": self.queue_size(),
+            "queued": self._queued,
+            "busy_workers": self._busy,
+            "devices_pending": len(self._pending_by_device),
+            "processed_total": self.processed_total,
+            "superseded_total": self.superseded_total,
+            "expired_total": self.expired_total,
+            "service_time_ms": round(self.service_time_s * 1000, 1),
+            "slack_histogram": self.slack_histogram(),
+        }
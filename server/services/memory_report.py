@@ -0,0 +1,92 @@
+import os
+import logging
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Campos de /proc/<pid>/smaps_rollup (en kB)
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty",
+                 "Private_Clean", "Private_Dirty", "Swap")
+
+
+def _smaps_rollup(pid: int) -> Optional[Dict[str, int]]:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    values = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in _SMAPS_FIELDS:
+            values[name] = int(rest.split()[0])
+    return values
+
+
+def process_memory(pid: int) -> Optional[dict]:
+    """
+    Memoria de un proceso separada en única y compartida (MB)
+
+    - unique_mb: páginas privadas (USS); lo que se libera al terminar el proceso
+    - shared_mb: páginas compartidas con otros procesos (p. ej. pesos heredados por fork)
+    - pss_mb: RSS proporcional; la suma de PSS es el consumo real del conjunto
+    """
+    rollup = _smaps_rollup(pid)
+    if rollup is not None:
+        kb = 1024.0
+        return {
+            "rss_mb": round(rollup.get("Rss", 0) / kb, 1),
+            "pss_mb": round(rollup.get("Pss", 0) / kb, 1),
+            "unique_mb": round((rollup.get("Private_Clean", 0) + rollup.get("Private_Dirty", 0)) / kb, 1),
+            "shared_mb": round((rollup.get("Shared_Clean", 0) + rollup.get("Shared_Dirty", 0)) / kb, 1),
+            "swap_mb": round(rollup.get("Swap", 0) / kb, 1),
+        }
+
+    # Sin /proc (macOS): psutil da USS y, según la plataforma, PSS y compartida
+    try:
+        import psutil
+        info = psutil.Process(pid).memory_full_info()
+    except Exception as e:
+        logger.debug(f"Memoria del proceso {pid} no disponible: {e}")
+        return None
+    mb = 1024.0 * 1024.0
+    return {
+        "rss_mb": round(info.rss / mb, 1),
+        "pss_mb": round(getattr(info, "pss", info.uss) / mb, 1),
+        "unique_mb": round(info.uss / mb, 1),
+        "shared_mb": round(getattr(info, "shared", 0) / mb, 1),
+        "swap_mb": round(getattr(info, "swap", 0) / mb, 1),
+    }
+
+
+def memory_report(master_pid: int, worker_pids: Iterable[int]) -> dict:
+    """Memoria del proceso maestro y de cada worker, con totales"""
+    workers = {}
+    for pid in worker_pids:
+        memory = process_memory(pid)
+        if memory is not None:
+            workers[str(pid)] = memory
+
+    master = process_memory(master_pid)
+    processes = list(workers.values()) + ([master] if master else [])
+    total_rss = sum(memory["rss_mb"] for memory in processes)
+    total_pss = sum(memory["pss_mb"] for memory in processes)
+    return {
+        "master": master,
+        "workers": workers,
+        "totals": {
+            "processes": len(processes),
+            # Lo que sumaría la RSS si nada se compartiera frente al consumo real
+            "rss_mb": round(total_rss, 1),
+            "pss_mb": round(total_pss, 1),
+            "unique_mb": round(sum(memory["unique_mb"] for memory in processes), 1),
+            "saved_by_sharing_mb": round(total_rss - total_pss, 1),
+        },
+        "per_worker_unique_mb": round(
+            sum(memory["unique_mb"] for memory in workers.values()) / len(workers), 1
+        ) if workers else None,
+    }
+
+
+def current_process_memory() -> Optional[dict]:
+    return process_memory(os.getpid())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+🔬 Búsqueda de hiperparámetros de la cabeza sobre embeddings cacheados
+
+Calcula (o reutiliza) la caché de embeddings de train_model.py y reparte
+los trials del espacio de búsqueda entre un pool de procesos. Cada proceso
+queda fijado a su propio subconjunto de núcleos, con los thread pools de
+TensorFlow del mismo tamaño. Todos leen el mismo memmap .npy, así que los
+embeddings se comparten vía page cache.
+
+Cada trial se evalúa con k-fold estratificado. Al final se escribe el
+leaderboard ordenado (leaderboard.json) y se reentrena la mejor
+configuración con todas las imágenes: el modelo completo queda en
+--output, listo para copiar a models/.
+
+Uso:
+    python sweep_head.py --data ~/Datasets/Bovino/prepared --feature-cache ~/.cache/bovino/features
+    python sweep_head.py --feature-cache ~/.cache/bovino/features --space space.json --trials 40 --folds 5
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import itertools
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Espacio por defecto (valores de cada hiperparámetro de build_head)
+DEFAULT_SPACE = {
+    "dropout": [0.0, 0.2, 0.4],
+    "units": [128, 256, 512],
+    "hidden_dropout": [0.2, 0.3, 0.5],
+    "learning_rate": [0.003, 0.001, 0.0003],
+}
+
+# Estado de cada proceso del pool (fijado por _init_worker)
+_features = None
+_labels = None
+_num_classes = 0
+
+
+def _init_worker(cores_queue, features_path: str, labels: List[int], num_classes: int) -> None:
+    """Fijar el proceso a sus núcleos y limitar TensorFlow a ellos antes de importarlo"""
+    global _features, _labels, _num_classes
+
+    cores = cores_queue.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    threads = str(len(cores))
+    os.environ["TF_NUM_INTRAOP_THREADS"] = threads
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ["OMP_NUM_THREADS"] = threads
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
+
+    import tensorflow as tf
+    # Cada fold crea su propio modelo: los avisos de retracing no aplican
+    tf.get_logger().setLevel(logging.ERROR)
+    tf.config.threading.set_intra_op_parallelism_threads(len(cores))
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    _features = np.load(features_path, mmap_mode="r")
+    _labels = np.array(labels, dtype=np.int32)
+    _num_classes = num_classes
+
+
+def _run_trial(task) -> dict:
+    """Entrenar y evaluar una configuración en cada fold"""
+    from sklearn.model_selection import StratifiedKFold
+    from tensorflow import keras
+    from train_model import build_head
+
+    trial_id, params, folds, epochs, batch_size, seed = task
+    params = dict(params)
+    learning_rate = params.pop("learning_rate")
+    started = time.perf_counter()
+
+    accuracies, losses = [], []
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    for train_rows, val_rows in splitter.split(np.zeros(len(_labels)), _labels):
+        x_train, y_train = np.asarray(_features[train_rows]), _labels[train_rows]
+        x_val, y_val = np.asarray(_features[val_rows]), _labels[val_rows]
+
+        keras.backend.clear_session()
+        keras.utils.set_random_seed(seed)
+        head = build_head(_num_classes, _features.shape[1], learning_rate, **params)
+        head.fit(x_train, y_train, epochs=epochs, batch_size=batch_size, shuffle=True, verbose=0)
+        loss, accuracy = head.evaluate(x_val, y_val, verbose=0)
+        accuracies.append(float(accuracy))
+        losses.append(float(loss))
+
+    return {
+        "trial": trial_id,
+        "params": {**params, "learning_rate": learning_rate},
+        "accuracy_mean": round(float(np.mean(accuracies)), 4),
+        "accuracy_std": round(float(np.std(accuracies)), 4),
+        "loss_mean": round(float(np.mean(losses)), 4),
+        "fold_accuracies": [round(value, 4) for value in accuracies],
+        "seconds": round(time.perf_counter() - started, 2),
+        "pid": os.getpid(),
+    }
+
+
+def load_space(value: Optional[str]) -> Dict[str, list]:
+    """Espacio de búsqueda desde un archivo JSON o un JSON en línea"""
+    if not value:
+        return DEFAULT_SPACE
+    if os.path.exists(value):
+        with open(value, "r", encoding="utf-8") as f:
+            space = json.load(f)
+    else:
+        space = json.loads(value)
+    unknown = set(space) - set(DEFAULT_SPACE)
+    if unknown:
+        raise ValueError(f"Hiperparámetros desconocidos: {', '.join(sorted(unknown))}")
+    # Los no indicados quedan fijos en su valor por defecto de train_model.py
+    from train_model import HEAD_DEFAULTS
+    return {name: list(space.get(name, [HEAD_DEFAULTS[name]])) for name in DEFAULT_SPACE}
+
+
+def sample_trials(space: Dict[str, list], trials: Optional[int], seed: int) -> List[dict]:
+    """Rejilla completa, o una muestra aleatoria de ella con --trials"""
+    names = list(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    if trials and trials < len(grid):
+        grid = random.Random(seed).sample(grid, trials)
+    return grid
+
+
+def core_groups(cores_per_trial: int) -> List[set]:
+    """Subconjuntos disjuntos de los núcleos disponibles, uno por proceso"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    groups = [set(cpus[i:i + cores_per_trial])
+              for i in range(0, len(cpus) - cores_per_trial + 1, cores_per_trial)]
+    return groups or [set(cpus)]
+
+
+def run_sweep(features_path: str, labels: List[int], num_classes: int, trials: List[dict],
+              folds: int, epochs: int, batch_size: int, seed: int, cores_per_trial: int) -> List[dict]:
+    groups = core_groups(cores_per_trial)
+    workers = max(1, min(len(groups), len(trials)))
+    logger.info(
+        f"🔬 {len(trials)} trials × {folds} folds en {workers} procesos "
+        f"({cores_per_trial} núcleo(s) cada uno)"
+    )
+
+    # spawn: los procesos fijan su afinidad e hilos antes de importar TensorFlow
+    context = multiprocessing.get_context("spawn")
+    cores_queue = context.Queue()
+    for group in groups[:workers]:
+        cores_queue.put(group)
+
+    tasks = [(i, params, folds, epochs, batch_size, seed) for i, params in enumerate(trials)]
+    results = []
+    with context.Pool(workers, initializer=_init_worker,
+                      initargs=(cores_queue, features_path, labels, num_classes)) as pool:
+        for result in pool.imap_unordered(_run_trial, tasks):
+            results.append(result)
+            logger.info(
+                f"📈 [{len(results)}/{len(trials)}] {result['params']} → "
+                f"{result['accuracy_mean']:.4f} ± {result['accuracy_std']:.4f} ({result['seconds']}s)"
+            )
+
+    return sorted(results, key=lambda r: (-r["accuracy_mean"], r["loss_mean"]))
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros de la cabeza sobre embeddings")
+    parser.add_argument("--dataset", type=Path, help="Carpeta con una subcarpeta por raza")
+    parser.add_argument("--data", type=Path, help="Dataset convertido con prepare_dataset.py")
+    parser.add_argument("--feature-cache", required=True, help="Directorio de la caché de embeddings")
+    parser.add_argument("--image-size", type=int, default=224)
+    parser.add_argument("--max-per-breed", type=int, help="Limitar imágenes por raza (pruebas rápidas)")
+    parser.add_argument("--space", help="Espacio de búsqueda: archivo JSON o JSON en línea")
+    parser.add_argument("--trials", type=int, help="Muestrear N configuraciones de la rejilla")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--cores-per-trial", type=int, default=1, help="Núcleos fijados a cada proceso")
+    parser.add_argument("--output", type=Path, default=Path("models") / "sweep", help="Leaderboard y mejor modelo")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import train_model
+    from tensorflow import keras
+
+    breeds = train_model.BREEDS
+    if args.dataset is None:
+        args.dataset = train_model.DEFAULT_DATASET_PATH
+    try:
+        space = load_space(args.space)
+        ids, labels, dataset = train_model.ordered_samples(args, args.image_size, breeds, args.batch_size)
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ {e}")
+        raise SystemExit(1)
+    if not ids:
+        logger.error("❌ No se encontraron imágenes")
+        raise SystemExit(1)
+
+    features, labels, features_path = train_model.cached_features(
+        os.path.expanduser(args.feature_cache), ids, labels, dataset, args.image_size, breeds
+    )
+    trials = sample_trials(space, args.trials, args.seed)
+    started = time.perf_counter()
+    leaderboard = run_sweep(features_path, labels.tolist(), len(breeds), trials, args.folds,
+                            args.epochs, args.batch_size, args.seed, max(1, args.cores_per_trial))
+    elapsed = time.perf_counter() - started
+
+    output = args.output
+    output.mkdir(parents=True, exist_ok=True)
+    with open(output / "leaderboard.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "features": features_path,
+            "samples": len(labels),
+            "folds": args.folds,
+            "epochs": args.epochs,
+            "batch_size": args.batch_size,
+            "space": space,
+            "seconds": round(elapsed, 1),
+            "results": leaderboard,
+        }, f, indent=2)
+
+    print(f"\n🏆 Leaderboard ({len(leaderboard)} trials, {elapsed:.1f}s)")
+    for rank, result in enumerate(leaderboard[:10], start=1):
+        print(f"  {rank:>2}. {result['accuracy_mean']:.4f} ± {result['accuracy_std']:.4f}  {result['params']}")
+
+    # Mejor configuración reentrenada con todas las imágenes
+    best = dict(leaderboard[0]["params"])
+    learning_rate = best.pop("learning_rate")
+    keras.utils.set_random_seed(args.seed)
+    head = train_model.build_head(len(breeds), features.shape[1], learning_rate, **best)
+    head.fit(np.asarray(features), labels, epochs=args.epochs, batch_size=args.batch_size,
+             shuffle=True, verbose=0)
+    model = train_model.attach_head(train_model.build_backbone(args.image_size), head)
+    model.save(str(output / "bovino_model.h5"))
+    with open(output / "class_labels.json", "w", encoding="utf-8") as f:
+        json.dump({breed: idx for idx, breed in enumerate(breeds)}, f, indent=2, ensure_ascii=False)
+    with open(output / "best_params.json", "w", encoding="utf-8") as f:
+        json.dump(leaderboard[0], f, indent=2)
+    logger.info(f"💾 Mejor modelo y leaderboard en: {output}")
+
+
+if __name__ == "__main__":
+    main_cli()
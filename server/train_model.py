@@ -1,166 +1,723 @@
 #!/usr/bin/env python3
 """
 🐄 Script de Entrenamiento para Modelo de Clasificación de Razas Bovinas
+
+Las imágenes se leen con un pipeline tf.data en streaming (listado paralelo,
+decodificación y resize con AUTOTUNE, caché opcional en disco, shuffle,
+batch y prefetch): la memoria queda acotada por el buffer de shuffle y
+escala al dataset completo.
+
+Con --data se entrena desde un dataset convertido por prepare_dataset.py
+(shards TFRecord o memmap uint8) sin decodificar JPEG. Con --feature-cache
+el backbone congelado se ejecuta una sola vez por imagen, sus embeddings se
+guardan en un memmap .npy y solo se entrena la cabeza sobre ellos. Con
+--finetune-block se cachean (float16) las activaciones a la entrada de ese
+bloque y se entrenan los bloques superiores junto a la cabeza.
+
+Uso:
+    python train_model.py
+    python train_model.py --epochs 30 --cache-dir ~/.cache/bovino --shuffle-buffer 4096
+    python train_model.py --data ~/Datasets/Bovino/prepared
+    python train_model.py --data ~/Datasets/Bovino/prepared --feature-cache ~/.cache/bovino/features
+    python train_model.py --data ~/Datasets/Bovino/prepared --feature-cache ~/.cache/bovino/features --finetune-block 13
 """
 
 import os
 import json
+import hashlib
 import logging
+import argparse
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 from keras import layers
-from keras.preprocessing.image import ImageDataGenerator
 from keras.applications import MobileNetV2
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple
 from sklearn.model_selection import train_test_split
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def main():
-    """Función principal de entrenamiento"""
-    logger.info("🐄 Iniciando entrenamiento del modelo bovino")
-    
-    # Configuración
-    dataset_path = Path.home() / "Datasets" / "Bovino" / "Cattle Breeds"
-    models_dir = Path("models")
-    models_dir.mkdir(exist_ok=True)
-    
-    image_size = 224
-    batch_size = 32
-    epochs = 20  # Reducido para prueba rápida
-    
-    # Razas disponibles
-    breeds = [
-        "Ayrshire cattle",
-        "Brown Swiss cattle", 
-        "Holstein Friesian cattle",
-        "Jersey cattle",
-        "Red Dane cattle"
-    ]
-    
-    # Mapeo de razas
-    breed_mapping = {
-        "Ayrshire cattle": "Ayrshire",
-        "Brown Swiss cattle": "Brown Swiss",
-        "Holstein Friesian cattle": "Holstein",
-        "Jersey cattle": "Jersey", 
-        "Red Dane cattle": "Red Dane"
-    }
-    
-    logger.info(f"📁 Dataset: {dataset_path}")
-    logger.info(f"📊 Razas: {len(breeds)}")
-    
-    # Verificar dataset
-    if not dataset_path.exists():
-        logger.error(f"❌ Dataset no encontrado en: {dataset_path}")
-        return False
-    
-    # Cargar datos
-    logger.info("📥 Cargando datos...")
-    images = []
-    labels = []
-    
-    for breed_folder in dataset_path.iterdir():
-        if breed_folder.is_dir():
-            breed_name = breed_folder.name
-            if breed_name in breeds:
-                logger.info(f"📂 Procesando: {breed_name}")
-                
-                image_files = list(breed_folder.glob("*.jpg")) + list(breed_folder.glob("*.jpeg")) + list(breed_folder.glob("*.png"))
-                
-                for img_path in image_files[:50]:  # Limitar a 50 imágenes por raza para prueba
-                    try:
-                        img = tf.keras.preprocessing.image.load_img(
-                            img_path, 
-                            target_size=(image_size, image_size)
-                        )
-                        img_array = tf.keras.preprocessing.image.img_to_array(img)
-                        img_array = img_array / 255.0
-                        
-                        images.append(img_array)
-                        labels.append(breed_name)
-                        
-                    except Exception as e:
-                        logger.warning(f"⚠️ Error cargando {img_path}: {e}")
-    
-    if len(images) == 0:
-        logger.error("❌ No se pudieron cargar imágenes")
+AUTOTUNE = tf.data.AUTOTUNE
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n")
+
+# Razas disponibles
+BREEDS = [
+    "Ayrshire cattle",
+    "Brown Swiss cattle",
+    "Holstein Friesian cattle",
+    "Jersey cattle",
+    "Red Dane cattle"
+]
+
+# Mapeo de razas
+BREED_MAPPING = {
+    "Ayrshire cattle": "Ayrshire",
+    "Brown Swiss cattle": "Brown Swiss",
+    "Holstein Friesian cattle": "Holstein",
+    "Jersey cattle": "Jersey",
+    "Red Dane cattle": "Red Dane"
+}
+
+DEFAULT_DATASET_PATH = Path.home() / "Datasets" / "Bovino" / "Cattle Breeds"
+
+
+def _is_image_file(path: str) -> bool:
+    """Cabecera JPEG o PNG (lo que decodifica el pipeline); lee solo los primeros bytes"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(8).startswith(IMAGE_SIGNATURES)
+    except OSError:
         return False
-    
-    X = np.array(images)
-    y = np.array(labels)
-    
-    logger.info(f"📈 Total de imágenes: {len(X)}")
-    
-    # Dividir datos
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+
+
+def _list_breed_folder(folder: Path, max_per_breed: Optional[int]) -> Tuple[List[str], int]:
+    """Imágenes válidas de una carpeta y cuántos archivos se descartaron"""
+    files = sorted(
+        entry.path for entry in os.scandir(folder)
+        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
     )
-    
-    # Convertir etiquetas
-    label_to_index = {breed: idx for idx, breed in enumerate(breeds)}
-    y_train_encoded = np.array([label_to_index[label] for label in y_train])
-    y_test_encoded = np.array([label_to_index[label] for label in y_test])
-    
-    # Crear modelo
-    logger.info("🏗️ Creando modelo...")
-    
+    valid, skipped = [], 0
+    for path in files:
+        if max_per_breed and len(valid) >= max_per_breed:
+            break
+        if _is_image_file(path):
+            valid.append(path)
+        else:
+            skipped += 1
+            logger.warning(f"⚠️ Error cargando {path}: no es una imagen JPEG/PNG")
+    return valid, skipped
+
+
+def list_dataset_files(dataset_path: Path, breeds: List[str],
+                       max_per_breed: Optional[int] = None) -> Tuple[List[str], List[int]]:
+    """Listar las imágenes de cada raza en paralelo (una carpeta por hilo)"""
+    folders = [dataset_path / breed for breed in breeds if (dataset_path / breed).is_dir()]
+    with ThreadPoolExecutor(max_workers=max(1, len(folders))) as pool:
+        listings = list(pool.map(lambda folder: _list_breed_folder(folder, max_per_breed), folders))
+
+    paths, labels = [], []
+    for folder, (files, skipped) in zip(folders, listings):
+        logger.info(f"📂 {folder.name}: {len(files)} imágenes" + (f" ({skipped} descartadas)" if skipped else ""))
+        paths.extend(files)
+        labels.extend([breeds.index(folder.name)] * len(files))
+    return paths, labels
+
+
+def stratified_split(paths: List[str], labels: List[int], val_fraction: float,
+                     seed: int = 42) -> Tuple[List[str], List[str], List[int], List[int]]:
+    """División estratificada train/validación sobre las listas de archivos"""
+    return train_test_split(paths, labels, test_size=val_fraction, random_state=seed, stratify=labels)
+
+
+def _decode_and_resize(image_size: int):
+    def decode(path, label):
+        image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        image = tf.image.resize(image, (image_size, image_size))
+        # uint8 hasta después de la caché: ocupa 4 veces menos que float32
+        return tf.cast(tf.round(image), tf.uint8), label
+    return decode
+
+
+def cache_path(cache_dir: str, split: str, paths: List[str], image_size: int) -> str:
+    """Archivo de caché por split; cambia si cambia la lista de archivos o el tamaño"""
+    digest = hashlib.sha1("\n".join(paths).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{split}_{image_size}_{digest}")
+
+
+def normalize(image, label):
+    """uint8 [0, 255] → float32 [0, 1] (igual que el preprocesamiento del servidor)"""
+    return tf.cast(image, tf.float32) / 255.0, label
+
+
+def build_dataset(paths: List[str], labels: List[int], image_size: int, batch_size: int,
+                  training: bool, cache_file: Optional[str] = None,
+                  shuffle_buffer: int = 2048, seed: int = 42) -> tf.data.Dataset:
+    """
+    Pipeline tf.data desde una lista de archivos
+
+    Sin caché se baraja la lista completa de rutas (barato) antes de decodificar;
+    con caché el orden queda fijado en la primera época y se baraja con un buffer
+    después de leerla.
+    """
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if training and not cache_file:
+        dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.map(_decode_and_resize(image_size), num_parallel_calls=AUTOTUNE,
+                          deterministic=not training)
+    # Un archivo dañado con cabecera válida se omite (con aviso) en vez de abortar el entrenamiento
+    dataset = dataset.ignore_errors(log_warning=True)
+    if cache_file:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        dataset = dataset.cache(cache_file)
+    return finalize_dataset(dataset, batch_size, training, shuffle_buffer, seed)
+
+
+def finalize_dataset(dataset: tf.data.Dataset, batch_size: int, training: bool,
+                     shuffle_buffer: int, seed: int = 42) -> tf.data.Dataset:
+    """Shuffle con buffer acotado, normalización, batch y prefetch"""
+    if training:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, drop_remainder=False)
+    dataset = dataset.map(normalize, num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE)
+
+
+def load_prepared(data_dir: Path, image_size: int, breeds: List[str]) -> dict:
+    """Manifiesto de un dataset convertido; debe coincidir en tamaño y razas"""
+    from prepare_dataset import load_manifest
+
+    manifest = load_manifest(data_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"{data_dir} no contiene un dataset convertido (manifest.json)")
+    if manifest["image_size"] != image_size or manifest["breeds"] != breeds:
+        raise ValueError(
+            f"{data_dir} se convirtió a {manifest['image_size']}px con otras razas; "
+            f"volver a convertirlo con --image-size {image_size}"
+        )
+    return manifest
+
+
+def build_tfrecord_dataset(data_dir: Path, manifest: dict, hashes: List[str], batch_size: int,
+                           training: bool, shuffle_buffer: int = 2048, seed: int = 42) -> tf.data.Dataset:
+    """
+    Pipeline desde los shards TFRecord, filtrado a las imágenes de un split
+
+    Al entrenar los shards se leen intercalados y en orden aleatorio; si no,
+    uno tras otro, en el orden del manifiesto. Cada registro se filtra por su
+    hash contra una tabla con las del split.
+    """
+    image_size = manifest["image_size"]
+    files = [str(data_dir / shard) for shard in manifest["shards"]]
+    split = tf.lookup.StaticHashTable(
+        tf.lookup.KeyValueTensorInitializer(tf.constant(hashes), tf.ones(len(hashes), tf.int32)),
+        default_value=0
+    )
+    features = {
+        "image": tf.io.FixedLenFeature([], tf.string),
+        "label": tf.io.FixedLenFeature([], tf.int64),
+        "hash": tf.io.FixedLenFeature([], tf.string),
+    }
+
+    def parse(record):
+        example = tf.io.parse_single_example(record, features)
+        image = tf.reshape(tf.io.decode_raw(example["image"], tf.uint8), (image_size, image_size, 3))
+        return image, tf.cast(example["label"], tf.int32), example["hash"]
+
+    dataset = tf.data.Dataset.from_tensor_slices(files)
+    if training:
+        dataset = dataset.shuffle(len(files), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.interleave(tf.data.TFRecordDataset, cycle_length=min(len(files), 8) if training else 1,
+                                 num_parallel_calls=AUTOTUNE, deterministic=not training)
+    dataset = dataset.map(parse, num_parallel_calls=AUTOTUNE, deterministic=not training)
+    dataset = dataset.filter(lambda image, label, digest: split.lookup(digest) > 0)
+    dataset = dataset.map(lambda image, label, digest: (image, label))
+    return finalize_dataset(dataset, batch_size, training, shuffle_buffer, seed)
+
+
+def memmap_batches(array: np.ndarray, labels: np.ndarray, rows: List[int], batch_size: int,
+                   training: bool, seed: int = 42) -> tf.data.Dataset:
+    """
+    Batches (sin normalizar) de un array en disco, filas seleccionadas por índice
+
+    Se barajan los índices de fila (shuffle completo sin buffer de datos)
+    y cada batch se copia del memmap con una sola lectura indexada.
+    """
+    dtype = tf.as_dtype(array.dtype)
+
+    def gather(indices):
+        indices = np.sort(indices)
+        return np.ascontiguousarray(array[indices]), labels[indices]
+
+    def load_batch(indices):
+        batch, batch_labels = tf.numpy_function(gather, [indices], (dtype, tf.int32))
+        batch.set_shape((None, *array.shape[1:]))
+        batch_labels.set_shape((None,))
+        return batch, batch_labels
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.array(rows, dtype=np.int64))
+    if training:
+        dataset = dataset.shuffle(len(rows), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, drop_remainder=False)
+    return dataset.map(load_batch, num_parallel_calls=AUTOTUNE, deterministic=not training)
+
+
+def build_memmap_dataset(data_dir: Path, manifest: dict, rows: List[int], batch_size: int,
+                         training: bool, seed: int = 42) -> tf.data.Dataset:
+    """Pipeline desde el memmap uint8 de prepare_dataset.py"""
+    from prepare_dataset import MEMMAP_FILE
+
+    image_size = manifest["image_size"]
+    entries = manifest["entries"]
+    images = np.memmap(data_dir / MEMMAP_FILE, dtype=np.uint8, mode="r",
+                       shape=(len(entries), image_size, image_size, 3))
+    labels = np.array([entry["label"] for entry in entries], dtype=np.int32)
+
+    dataset = memmap_batches(images, labels, rows, batch_size, training, seed)
+    dataset = dataset.map(normalize, num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE)
+
+
+def build_prepared_datasets(data_dir: Path, image_size: int, breeds: List[str], batch_size: int,
+                            val_fraction: float, shuffle_buffer: int = 2048,
+                            seed: int = 42) -> Tuple[tf.data.Dataset, tf.data.Dataset, int, int]:
+    """Datasets de entrenamiento y validación (división estratificada) desde TFRecord o memmap"""
+    manifest = load_prepared(data_dir, image_size, breeds)
+    entries = manifest["entries"]
+    labels = [entry["label"] for entry in entries]
+
+    if manifest["format"] == "memmap":
+        train_rows, val_rows, _, _ = stratified_split(list(range(len(entries))), labels, val_fraction, seed)
+        train_ds = build_memmap_dataset(data_dir, manifest, train_rows, batch_size, training=True, seed=seed)
+        val_ds = build_memmap_dataset(data_dir, manifest, val_rows, batch_size, training=False)
+        return train_ds, val_ds, len(train_rows), len(val_rows)
+
+    hashes = [entry["hash"] for entry in entries]
+    train_hashes, val_hashes, _, _ = stratified_split(hashes, labels, val_fraction, seed)
+    train_ds = build_tfrecord_dataset(data_dir, manifest, train_hashes, batch_size, training=True,
+                                      shuffle_buffer=shuffle_buffer, seed=seed)
+    val_ds = build_tfrecord_dataset(data_dir, manifest, val_hashes, batch_size, training=False)
+    return train_ds, val_ds, len(train_hashes), len(val_hashes)
+
+
+# Hiperparámetros de la cabeza de clasificación
+HEAD_DEFAULTS = {
+    "dropout": 0.2,
+    "units": 256,
+    "hidden_dropout": 0.3,
+    "learning_rate": 0.001,
+}
+
+
+def build_backbone(image_size: int) -> keras.Model:
+    """MobileNetV2 preentrenado y congelado, sin la capa de clasificación"""
     base_model = MobileNetV2(
         weights='imagenet',
         include_top=False,
         input_shape=(image_size, image_size, 3)
     )
     base_model.trainable = False
-    
-    model = keras.Sequential([
-        base_model,
-        layers.GlobalAveragePooling2D(),
-        layers.Dropout(0.2),
-        layers.Dense(256, activation='relu'),
-        layers.Dropout(0.3),
-        layers.Dense(len(breeds), activation='softmax')
-    ])
-    
+    return base_model
+
+
+def head_layers(num_classes: int, dropout: float = HEAD_DEFAULTS["dropout"],
+                units: int = HEAD_DEFAULTS["units"],
+                hidden_dropout: float = HEAD_DEFAULTS["hidden_dropout"]) -> list:
+    return [
+        layers.Dropout(dropout),
+        layers.Dense(units, activation='relu'),
+        layers.Dropout(hidden_dropout),
+        layers.Dense(num_classes, activation='softmax')
+    ]
+
+
+def compile_model(model: keras.Model, learning_rate: float = HEAD_DEFAULTS["learning_rate"]) -> keras.Model:
     model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
         loss='sparse_categorical_crossentropy',
         metrics=['accuracy']
     )
-    
+    return model
+
+
+def build_model(num_classes: int, image_size: int) -> keras.Model:
+    """MobileNetV2 congelado + cabeza de clasificación"""
+    model = keras.Sequential([
+        build_backbone(image_size),
+        layers.GlobalAveragePooling2D(),
+        *head_layers(num_classes)
+    ])
+    return compile_model(model)
+
+
+def build_head(num_classes: int, feature_dim: int, learning_rate: float = HEAD_DEFAULTS["learning_rate"],
+               **params) -> keras.Model:
+    """Solo la cabeza, sobre los embeddings ya agrupados del backbone"""
+    head = keras.Sequential([keras.Input(shape=(feature_dim,)), *head_layers(num_classes, **params)])
+    return compile_model(head, learning_rate)
+
+
+def attach_head(backbone: keras.Model, head: keras.Model) -> keras.Model:
+    """Modelo completo (imagen → raza) con las capas ya entrenadas de la cabeza"""
+    model = keras.Sequential([backbone, layers.GlobalAveragePooling2D(), *head.layers])
+    return compile_model(model)
+
+
+def split_backbone(backbone: keras.Model, block: int) -> Tuple[keras.Model, keras.Model]:
+    """
+    Dividir MobileNetV2 justo antes del bloque indicado (1-16)
+
+    La parte inferior va de la imagen a la salida del bloque anterior. La
+    superior se reconstruye desde esa activación con las mismas capas del
+    backbone (pesos compartidos): entrenarla actualiza el backbone original.
+    """
+    names = [layer.name for layer in backbone.layers]
+    first = next((i for i, name in enumerate(names) if name.startswith(f"block_{block}_")), None)
+    if first is None:
+        raise ValueError(f"MobileNetV2 no tiene el bloque {block} (válidos: 1-16)")
+    split_layer = backbone.layers[first - 1]
+    lower = keras.Model(backbone.input, split_layer.output, name=f"mobilenet_v2_below_{block}")
+
+    split_input = keras.Input(shape=split_layer.output.shape[1:])
+    tensors = {id(split_layer.output): split_input}
+    for layer in backbone.layers[first:]:
+        inputs = layer.input
+        if isinstance(inputs, list):
+            outputs = layer([tensors[id(tensor)] for tensor in inputs])
+        else:
+            outputs = layer(tensors[id(inputs)])
+        tensors[id(layer.output)] = outputs
+    upper = keras.Model(split_input, tensors[id(backbone.output)], name=f"mobilenet_v2_from_{block}")
+    return lower, upper
+
+
+def ordered_samples(args: argparse.Namespace, image_size: int, breeds: List[str],
+                    batch_size: int) -> Tuple[List[str], List[int], tf.data.Dataset]:
+    """
+    Todas las imágenes en un orden fijo, sin barajar
+
+    Devuelve un identificador estable por imagen (ruta o hash de contenido
+    del dataset convertido), su etiqueta y el pipeline que las recorre en
+    ese mismo orden.
+    """
+    if args.data:
+        data_dir = args.data.expanduser()
+        manifest = load_prepared(data_dir, image_size, breeds)
+        entries = manifest["entries"]
+        ids = [entry["hash"] for entry in entries]
+        labels = [entry["label"] for entry in entries]
+        if manifest["format"] == "memmap":
+            dataset = build_memmap_dataset(data_dir, manifest, list(range(len(entries))), batch_size, training=False)
+        else:
+            dataset = build_tfrecord_dataset(data_dir, manifest, ids, batch_size, training=False)
+        return ids, labels, dataset
+
+    if not args.dataset.exists():
+        raise FileNotFoundError(f"Dataset no encontrado en: {args.dataset}")
+    paths, labels = list_dataset_files(args.dataset, breeds, args.max_per_breed)
+    return paths, labels, build_dataset(paths, labels, image_size, batch_size, training=False)
+
+
+def feature_cache_path(cache_dir: str, ids: List[str], image_size: int, stage: str = "features") -> str:
+    """Archivo .npy de una etapa del backbone; cambia si cambian las imágenes o el tamaño"""
+    digest = hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{stage}_mobilenet_v2_{image_size}_{digest}.npy")
+
+
+def extract_features(extractor: keras.Model, dataset: tf.data.Dataset, count: int, path: str,
+                     dtype=np.float32) -> None:
+    """Una pasada del extractor por todas las imágenes, escrita en un memmap .npy"""
+    tmp_path = path[:-len(".npy")] + ".tmp.npy"
+    features = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype,
+                                         shape=(count, *extractor.output_shape[1:]))
+    row = 0
+    for images, _ in dataset:
+        batch = extractor(images, training=False).numpy()
+        features[row:row + len(batch)] = batch
+        row += len(batch)
+        if row % 1024 < len(batch):
+            logger.info(f"🧠 {row}/{count} imágenes")
+    if row != count:
+        # Imágenes omitidas por ignore_errors: las filas ya no corresponden al índice
+        del features
+        os.remove(tmp_path)
+        raise RuntimeError(
+            f"Se esperaban {count} salidas y se calcularon {row}: hay imágenes ilegibles; "
+            f"convertir el dataset con prepare_dataset.py, que las descarta"
+        )
+    features.flush()
+    del features
+    os.replace(tmp_path, path)
+
+
+def load_feature_cache(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Salidas (memmap de solo lectura) y etiquetas de un .npy ya calculado"""
+    with open(path[:-len(".npy")] + ".json", "r", encoding="utf-8") as f:
+        index = json.load(f)
+    return np.load(path, mmap_mode="r"), np.array(index["labels"], dtype=np.int32)
+
+
+def cached_activations(cache_dir: str, ids: List[str], labels: List[int], dataset: tf.data.Dataset,
+                       image_size: int, breeds: List[str], stage: str, build_extractor,
+                       dtype=np.float32) -> Tuple[np.ndarray, np.ndarray, str]:
+    """
+    Salida de una etapa del backbone para todas las imágenes, calculada una sola vez
+
+    Se guarda junto a un índice JSON con el identificador y la etiqueta de
+    cada fila; las ejecuciones siguientes abren el memmap directamente.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = feature_cache_path(cache_dir, ids, image_size, stage)
+    if os.path.exists(path):
+        logger.info(f"⚡ En caché: {path}")
+    else:
+        logger.info(f"🧠 Pasada del backbone ({stage}) por {len(ids)} imágenes (una sola vez)...")
+        with open(path[:-len(".npy")] + ".json", "w", encoding="utf-8") as f:
+            json.dump({"image_size": image_size, "breeds": breeds, "ids": ids, "labels": labels},
+                      f, ensure_ascii=False)
+        try:
+            extract_features(build_extractor(), dataset, len(ids), path, dtype)
+        except Exception:
+            os.remove(path[:-len(".npy")] + ".json")
+            raise
+        logger.info(f"💾 Guardado en: {path} ({os.path.getsize(path) / 1024 ** 2:.0f} MB)")
+    features, cached_labels = load_feature_cache(path)
+    return features, cached_labels, path
+
+
+def cached_features(cache_dir: str, ids: List[str], labels: List[int], dataset: tf.data.Dataset,
+                    image_size: int, breeds: List[str]) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Embeddings agrupados (1280-d, float32) del backbone completo"""
+    return cached_activations(
+        cache_dir, ids, labels, dataset, image_size, breeds, "features",
+        lambda: keras.Sequential([build_backbone(image_size), layers.GlobalAveragePooling2D()])
+    )
+
+
+def train_on_features(args: argparse.Namespace, breeds: List[str]) -> Optional[keras.Model]:
+    """Entrenar solo la cabeza sobre la caché de embeddings y montar el modelo completo"""
+    image_size = args.image_size
+    try:
+        ids, labels, dataset = ordered_samples(args, image_size, breeds, args.batch_size)
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ {e}")
+        return None
+    if not ids:
+        logger.error("❌ No se encontraron imágenes")
+        return None
+
+    try:
+        features, labels, _ = cached_features(
+            os.path.expanduser(args.feature_cache), ids, labels, dataset, image_size, breeds
+        )
+    except RuntimeError as e:
+        logger.error(f"❌ {e}")
+        return None
+    train_rows, val_rows, _, _ = stratified_split(list(range(len(labels))), labels.tolist(),
+                                                  args.val_split, args.seed)
+    train_rows, val_rows = np.sort(train_rows), np.sort(val_rows)
+    logger.info(f"✂️ Entrenamiento: {len(train_rows)}, validación: {len(val_rows)}")
+
+    # Los embeddings del split caben en memoria: 12k × 1280 float32 ≈ 60 MB
+    x_train, y_train = np.asarray(features[train_rows]), labels[train_rows]
+    x_val, y_val = np.asarray(features[val_rows]), labels[val_rows]
+
+    keras.utils.set_random_seed(args.seed)
+    head = build_head(len(breeds), features.shape[1])
+    logger.info("🚀 Entrenando la cabeza sobre los embeddings...")
+    head.fit(x_train, y_train, validation_data=(x_val, y_val), epochs=args.epochs,
+             batch_size=args.batch_size, shuffle=True, verbose="auto")
+
+    _, val_accuracy = head.evaluate(x_val, y_val, verbose="silent")
+    logger.info(f"✅ Precisión en validación: {val_accuracy:.4f}")
+    return attach_head(build_backbone(image_size), head)
+
+
+def train_finetune(args: argparse.Namespace, breeds: List[str]) -> Optional[keras.Model]:
+    """
+    Fine-tuning parcial sobre activaciones cacheadas
+
+    Las capas bajo --finetune-block se ejecutan una sola vez por imagen y su
+    salida se guarda como memmap float16. Primero se entrena la cabeza con los
+    bloques superiores congelados (--epochs); después se descongelan y se
+    entrenan junto a ella con --finetune-lr (--finetune-epochs). Las
+    BatchNormalization siguen congeladas, en modo inferencia.
+    """
+    image_size = args.image_size
+    block = args.finetune_block
+    try:
+        ids, labels, dataset = ordered_samples(args, image_size, breeds, args.batch_size)
+        backbone = build_backbone(image_size)
+        lower, upper = split_backbone(backbone, block)
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ {e}")
+        return None
+    if not ids:
+        logger.error("❌ No se encontraron imágenes")
+        return None
+
+    try:
+        activations, labels, _ = cached_activations(
+            os.path.expanduser(args.feature_cache), ids, labels, dataset, image_size, breeds,
+            f"block{block}", lambda: lower, dtype=np.float16
+        )
+    except RuntimeError as e:
+        logger.error(f"❌ {e}")
+        return None
+    train_rows, val_rows, _, _ = stratified_split(list(range(len(labels))), labels.tolist(),
+                                                  args.val_split, args.seed)
+    logger.info(f"✂️ Entrenamiento: {len(train_rows)}, validación: {len(val_rows)}")
+
+    def to_float32(batch, batch_labels):
+        return tf.cast(batch, tf.float32), batch_labels
+
+    train_ds = memmap_batches(activations, labels, train_rows, args.batch_size, training=True, seed=args.seed)
+    train_ds = train_ds.map(to_float32, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+    val_ds = memmap_batches(activations, labels, val_rows, args.batch_size, training=False)
+    val_ds = val_ds.map(to_float32, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+
+    keras.utils.set_random_seed(args.seed)
+    head = build_head(len(breeds), upper.output_shape[-1])
+    model = keras.Sequential([keras.Input(shape=activations.shape[1:]), upper,
+                              layers.GlobalAveragePooling2D(), head])
+
+    logger.info(f"🚀 Entrenando la cabeza (bloques {block}-16 congelados)...")
+    upper.trainable = False
+    compile_model(model)
+    model.fit(train_ds, validation_data=val_ds, epochs=args.epochs, verbose="auto")
+
+    logger.info(f"🔓 Fine-tuning de los bloques {block}-16 (lr={args.finetune_lr})...")
+    upper.trainable = True
+    for layer in upper.layers:
+        if isinstance(layer, layers.BatchNormalization):
+            layer.trainable = False
+    compile_model(model, args.finetune_lr)
+    model.fit(train_ds, validation_data=val_ds, epochs=args.finetune_epochs, verbose="auto")
+
+    _, val_accuracy = model.evaluate(val_ds, verbose="silent")
+    logger.info(f"✅ Precisión en validación: {val_accuracy:.4f}")
+    # Las capas superiores son las del backbone: el modelo completo ya incluye el fine-tuning
+    return attach_head(backbone, head)
+
+
+def train_end_to_end(args: argparse.Namespace, breeds: List[str]) -> Optional[keras.Model]:
+    """Entrenar el modelo completo leyendo las imágenes en cada época"""
+    image_size = args.image_size
+
+    if args.data:
+        # Dataset convertido: píxeles uint8 ya redimensionados, sin decodificar JPEG
+        data_dir = args.data.expanduser()
+        logger.info(f"📁 Dataset convertido: {data_dir}")
+        try:
+            train_ds, val_ds, train_count, val_count = build_prepared_datasets(
+                data_dir, image_size, breeds, args.batch_size, args.val_split,
+                shuffle_buffer=args.shuffle_buffer, seed=args.seed
+            )
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ {e}")
+            return None
+        logger.info(f"✂️ Entrenamiento: {train_count}, validación: {val_count}")
+    else:
+        dataset_path = args.dataset
+        logger.info(f"📁 Dataset: {dataset_path}")
+
+        # Verificar dataset
+        if not dataset_path.exists():
+            logger.error(f"❌ Dataset no encontrado en: {dataset_path}")
+            return None
+
+        # Listar archivos (las imágenes se leen en streaming durante el entrenamiento)
+        logger.info("📥 Listando imágenes...")
+        paths, labels = list_dataset_files(dataset_path, breeds, args.max_per_breed)
+        if len(paths) == 0:
+            logger.error("❌ No se encontraron imágenes")
+            return None
+        logger.info(f"📈 Total de imágenes: {len(paths)}")
+
+        # Dividir datos
+        train_paths, val_paths, train_labels, val_labels = stratified_split(
+            paths, labels, args.val_split, args.seed
+        )
+        logger.info(f"✂️ Entrenamiento: {len(train_paths)}, validación: {len(val_paths)}")
+
+        cache_dir = os.path.expanduser(args.cache_dir) if args.cache_dir else None
+        train_ds = build_dataset(
+            train_paths, train_labels, image_size, args.batch_size, training=True,
+            cache_file=cache_path(cache_dir, "train", train_paths, image_size) if cache_dir else None,
+            shuffle_buffer=args.shuffle_buffer, seed=args.seed
+        )
+        val_ds = build_dataset(
+            val_paths, val_labels, image_size, args.batch_size, training=False,
+            cache_file=cache_path(cache_dir, "val", val_paths, image_size) if cache_dir else None
+        )
+
+    # Crear modelo
+    logger.info("🏗️ Creando modelo...")
+    model = build_model(len(breeds), image_size)
+
     # Entrenar modelo
     logger.info("🚀 Iniciando entrenamiento...")
-    
-    history = model.fit(
-        X_train, y_train_encoded,
-        validation_data=(X_test, y_test_encoded),
-        epochs=epochs,
-        batch_size=batch_size,
+
+    model.fit(
+        train_ds,
+        validation_data=val_ds,
+        epochs=args.epochs,
         verbose="auto"
     )
-    
+
     # Evaluar modelo
     logger.info("📊 Evaluando modelo...")
-    test_loss, test_accuracy = model.evaluate(X_test, y_test_encoded, verbose="silent")
-    logger.info(f"✅ Precisión en test: {test_accuracy:.4f}")
-    
+    test_loss, test_accuracy = model.evaluate(val_ds, verbose="silent")
+    logger.info(f"✅ Precisión en validación: {test_accuracy:.4f}")
+    return model
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo de razas bovinas")
+    parser.add_argument("--dataset", type=Path, default=DEFAULT_DATASET_PATH, help="Carpeta con una subcarpeta por raza")
+    parser.add_argument("--data", type=Path, help="Dataset convertido con prepare_dataset.py (TFRecord o memmap)")
+    parser.add_argument("--models-dir", type=Path, default=Path("models"), help="Destino del modelo y etiquetas")
+    parser.add_argument("--image-size", type=int, default=224)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--val-split", type=float, default=0.2, help="Fracción de validación (estratificada)")
+    parser.add_argument("--shuffle-buffer", type=int, default=2048, help="Imágenes en el buffer de shuffle")
+    parser.add_argument("--cache-dir", help="Caché en disco de las imágenes decodificadas (uint8)")
+    parser.add_argument("--feature-cache", help="Entrenar solo la cabeza sobre embeddings cacheados en este directorio")
+    parser.add_argument("--finetune-block", type=int,
+                        help="Fine-tuning desde este bloque de MobileNetV2 (1-16) sobre activaciones cacheadas")
+    parser.add_argument("--finetune-epochs", type=int, default=10)
+    parser.add_argument("--finetune-lr", type=float, default=1e-4)
+    parser.add_argument("--max-per-breed", type=int, help="Limitar imágenes por raza (pruebas rápidas)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Función principal de entrenamiento"""
+    args = parse_args(argv)
+    logger.info("🐄 Iniciando entrenamiento del modelo bovino")
+
+    # Configuración
+    models_dir = args.models_dir
+    models_dir.mkdir(exist_ok=True)
+    breeds = BREEDS
+
+    logger.info(f"📊 Razas: {len(breeds)}")
+
+    if args.finetune_block:
+        if not args.feature_cache:
+            logger.error("❌ --finetune-block necesita --feature-cache (directorio de las activaciones)")
+            return False
+        model = train_finetune(args, breeds)
+    elif args.feature_cache:
+        model = train_on_features(args, breeds)
+    else:
+        model = train_end_to_end(args, breeds)
+    if model is None:
+        return False
+    label_to_index = {breed: idx for idx, breed in enumerate(breeds)}
+
     # Guardar modelo
     model_path = models_dir / "bovino_model.h5"
     model.save(str(model_path))
     logger.info(f"💾 Modelo guardado en: {model_path}")
-    
+
     # Guardar etiquetas
     labels_path = models_dir / "class_labels.json"
     with open(labels_path, 'w', encoding='utf-8') as f:
         json.dump(label_to_index, f, indent=2, ensure_ascii=False)
     logger.info(f"💾 Etiquetas guardadas en: {labels_path}")
-    
+
     # Actualizar settings.py
     logger.info("⚙️ Actualizando settings.py...")
-    update_settings(breed_mapping)
-    
+    update_settings(BREED_MAPPING)
+
     logger.info("🎉 ¡Entrenamiento completado exitosamente!")
     return True
 
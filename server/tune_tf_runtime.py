@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+🧵 Auto-tuner del runtime de TensorFlow para este host y este modelo
+
+Barre hilos intra/inter-op × oneDNN × workers concurrentes × tamaño de
+batch con el modelo real y escribe el mejor perfil en TF_RUNTIME_PROFILE,
+que el servidor lee al arrancar (config/tf_runtime.py).
+
+Mide el mismo backend que cargará el servidor (MODEL_BACKEND o
+--backend). Con tflite los hilos son los num_threads de cada intérprete;
+inter-op y oneDNN no aplican y no se barren. El perfil registra el
+backend y que se midió en un solo proceso: el servidor lo ignora con otro
+backend y, con varios procesos, reparte los hilos entre ellos.
+
+Los thread pools de TensorFlow solo se configuran antes de inicializar el
+runtime, así que cada combinación de hilos se mide en un proceso hijo. Las
+combinaciones con hilos × workers por encima de las CPUs disponibles se
+omiten (sobresuscripción).
+
+Uso:
+    python tune_tf_runtime.py
+    python tune_tf_runtime.py --threads 1,2,4 --workers 1,2,4 --batches 1,8 --duration 5
+    python tune_tf_runtime.py --onednn on,off --max-latency-ms 250 --output perfil.json
+    python tune_tf_runtime.py --backend tflite --threads 1,2,4
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+import subprocess
+import time
+import socket
+import platform
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+from config.settings import Settings
+from config import tf_runtime
+from data.datasources.model_registry import ModelRegistry
+from data.datasources.tensorflow_datasource_impl import TensorFlowDataSourceImpl
+
+# El planificador envía un frame por inferencia: el perfil del servidor se elige con batch 1
+SERVING_BATCH_SIZE = 1
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _default_counts(cores: int) -> List[int]:
+    """Potencias de dos hasta el número de núcleos, más el propio número"""
+    counts = []
+    n = 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    counts.append(cores)
+    return counts
+
+
+def _default_model(settings: Settings) -> str:
+    """El mismo modelo que cargaría el servidor (misma resolución que el datasource)"""
+    datasource = TensorFlowDataSourceImpl(ModelRegistry(settings.MODEL_REGISTRY_DIR))
+    return datasource.resolve_model_paths()[1]
+
+
+def _load_model(args: argparse.Namespace):
+    """Modelo con el backend del servidor, con los hilos de esta medición"""
+    if args.backend == "tflite":
+        from data.datasources.tflite_model import TFLiteModel
+        return TFLiteModel(args.tflite_path, num_threads=args.intra, max_interpreters=max(args.workers))
+
+    import tensorflow as tf
+    tf_runtime.configure_tensorflow(tf)
+    return tf.keras.models.load_model(args.model)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure_child(args: argparse.Namespace) -> None:
+    """Proceso hijo: aplicar una configuración de hilos y medir workers × batches"""
+    topology = tf_runtime.cpu_topology()
+    tf_runtime.apply_environment({
+        "intra_op_threads": args.intra,
+        "inter_op_threads": args.inter,
+        "workers": max(args.workers),
+        "onednn": args.onednn_value,
+        "kmp_affinity": args.kmp_affinity,
+        "kmp_blocktime": args.kmp_blocktime,
+        "profile": None,
+        "topology": topology,
+    }, override=True)
+
+    model = _load_model(args)
+    size = Settings().IMAGE_SIZE
+    rng = np.random.default_rng(0)
+
+    rows = []
+    for workers in args.workers:
+        for batch_size in args.batches:
+            images = rng.random((batch_size, size, size, 3), dtype=np.float32)
+            model.predict(images, verbose=0)  # Trazado para esta forma
+
+            latencies: List[float] = []
+            lock = threading.Lock()
+            stop_at = time.perf_counter() + args.duration
+
+            def worker():
+                local = []
+                while time.perf_counter() < stop_at:
+                    start = time.perf_counter()
+                    model.predict(images, verbose=0)
+                    local.append((time.perf_counter() - start) * 1000)
+                with lock:
+                    latencies.extend(local)
+
+            threads = [threading.Thread(target=worker) for _ in range(workers)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            rows.append({
+                "backend": args.backend,
+                "intra_op_threads": args.intra,
+                "inter_op_threads": args.inter,
+                "onednn": args.onednn_value,
+                "workers": workers,
+                "batch_size": batch_size,
+                "calls": len(latencies),
+                "images_per_s": round(len(latencies) * batch_size / elapsed, 2),
+                "p50_ms": round(_percentile(latencies, 0.50), 2),
+                "p95_ms": round(_percentile(latencies, 0.95), 2),
+            })
+
+    # Última línea de stdout: resultados para el proceso padre
+    print(json.dumps(rows))
+
+
+def run_child(args: argparse.Namespace, intra: int, inter: int, onednn: str,
+              workers: List[int]) -> List[dict]:
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child",
+        "--model", args.model, "--backend", args.backend, "--tflite-path", args.tflite_path or "",
+        "--intra", str(intra), "--inter", str(inter), "--onednn-value", onednn,
+        "--workers", ",".join(map(str, workers)),
+        "--batches", ",".join(map(str, args.batches)),
+        "--duration", str(args.duration),
+        "--kmp-affinity", args.kmp_affinity, "--kmp-blocktime", args.kmp_blocktime,
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(f"❌ intra={intra} inter={inter}: {completed.stderr.strip().splitlines()[-1:]}")
+        return []
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def select_best(rows: List[dict], batch_size: int, max_latency_ms: Optional[float]) -> Optional[dict]:
+    """Mayor throughput con el batch dado, respetando el presupuesto de latencia p95"""
+    candidates = [row for row in rows if row["batch_size"] == batch_size]
+    if max_latency_ms is not None:
+        candidates = [row for row in candidates if row["p95_ms"] <= max_latency_ms]
+    return max(candidates, key=lambda row: row["images_per_s"], default=None)
+
+
+def tune(args: argparse.Namespace) -> bool:
+    settings = Settings()
+    topology = tf_runtime.cpu_topology()
+    cores = topology["cores"]
+    try:
+        # Solo como verificación: el servidor calcula la topología sin psutil
+        import psutil
+        if psutil.cpu_count(logical=False) not in (None, topology["physical_cores"]):
+            print(f"⚠️ psutil ve {psutil.cpu_count(logical=False)} núcleos físicos y el servidor "
+                  f"{topology['physical_cores']}; el perfil usa los del servidor")
+    except ImportError:
+        pass
+    threads = args.threads or _default_counts(cores)
+    workers = args.workers or _default_counts(cores)
+    onednn_values = [value if value != "default" else "" for value in args.onednn.split(",")]
+    if args.backend == "tflite":
+        # Intérpretes TFLite: solo num_threads; inter-op y oneDNN son de TensorFlow
+        from data.datasources.tflite_model import ensure_tflite
+        args.tflite_path = ensure_tflite(args.model, settings.TFLITE_CACHE_DIR)
+        args.inter = [1]
+        onednn_values = [""]
+
+    print(f"🧵 Auto-tune en {socket.gethostname()}: {cores} núcleos "
+          f"({topology['logical_cpus']} CPUs lógicas), modelo {args.model}, backend {args.backend}")
+
+    rows = []
+    for onednn in onednn_values:
+        for intra in threads:
+            for inter in args.inter:
+                # Sin sobresuscripción: hilos intra-op × workers <= CPUs disponibles
+                fitting = [w for w in workers if intra * w <= topology["logical_cpus"]]
+                if not fitting:
+                    continue
+                results = run_child(args, intra, inter, onednn, fitting)
+                for row in results:
+                    print(f"  oneDNN={row['onednn'] or 'def':<3} intra={intra:<2} inter={inter:<2} "
+                          f"workers={row['workers']:<2} batch={row['batch_size']:<3} "
+                          f"{row['images_per_s']:>9.1f} img/s  p95 {row['p95_ms']:>8.1f} ms")
+                rows.extend(results)
+
+    best = select_best(rows, SERVING_BATCH_SIZE, args.max_latency_ms)
+    if best is None:
+        print("❌ Ninguna combinación cumple las restricciones")
+        return False
+
+    profile = {
+        "created_at": datetime.now().isoformat(),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "model": args.model,
+        "backend": args.backend,
+        # Medido en un solo proceso (ver tf_runtime.resolve_runtime_config)
+        "processes": 1,
+        "topology": topology,
+        "duration_s": args.duration,
+        "max_latency_ms": args.max_latency_ms,
+        "best": {
+            **best,
+            "kmp_affinity": args.kmp_affinity,
+            "kmp_blocktime": args.kmp_blocktime,
+        },
+        "best_by_batch_size": {
+            str(batch): select_best(rows, batch, args.max_latency_ms) for batch in args.batches
+        },
+        "results": rows,
+    }
+
+    output = args.output or settings.TF_RUNTIME_PROFILE
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Mejor configuración: intra={best['intra_op_threads']} inter={best['inter_op_threads']} "
+          f"workers={best['workers']} oneDNN={best['onednn'] or 'por defecto'} "
+          f"→ {best['images_per_s']} img/s, p95 {best['p95_ms']} ms")
+    print(f"💾 Perfil guardado en: {output}")
+    return True
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Auto-tuner del runtime de TensorFlow")
+    parser.add_argument("--model", help="Modelo a medir (por defecto el que cargaría el servidor)")
+    parser.add_argument("--backend", choices=("keras", "tflite"),
+                        help="Backend a medir (por defecto MODEL_BACKEND, el que usará el servidor)")
+    parser.add_argument("--threads", type=_int_list, help="Hilos intra-op a probar (por defecto automático)")
+    parser.add_argument("--inter", type=_int_list, default=[1, 2], help="Hilos inter-op a probar")
+    parser.add_argument("--workers", type=_int_list, help="Workers concurrentes a probar (por defecto automático)")
+    parser.add_argument("--batches", type=_int_list, default=[1, 4, 8], help="Tamaños de batch")
+    parser.add_argument("--onednn", default="default", help="Valores de oneDNN: default, on, off (separados por comas)")
+    parser.add_argument("--kmp-affinity", default="", help="KMP_AFFINITY para todas las mediciones")
+    parser.add_argument("--kmp-blocktime", default="", help="KMP_BLOCKTIME para todas las mediciones")
+    parser.add_argument("--duration", type=float, default=3.0, help="Segundos por combinación")
+    parser.add_argument("--max-latency-ms", type=float, help="Presupuesto de latencia p95 por inferencia")
+    parser.add_argument("--output", help="Archivo del perfil (por defecto TF_RUNTIME_PROFILE)")
+    # Uso interno: medición de una configuración de hilos en un proceso hijo
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--intra", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--onednn-value", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--tflite-path", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    settings = Settings()
+    args.model = args.model or _default_model(settings)
+    args.backend = args.backend or settings.MODEL_BACKEND
+    if args.child:
+        args.inter = args.inter[0]
+        measure_child(args)
+        return
+
+    if not os.path.exists(args.model):
+        print(f"❌ Modelo no encontrado: {args.model}")
+        sys.exit(1)
+    if not tune(args):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,6 +1,10 @@
 """
 Configuración global de warnings para el servidor Bovino IA
 Suprime warnings innecesarios para una salida más limpia
+
+No importa TensorFlow ni OpenCV: se configuran por variables de entorno
+y loggers, de modo que las librerías pesadas solo se cargan cuando un
+camino de código las usa.
 """
 
 import os
@@ -33,31 +37,14 @@ def configure_warnings():
     print("🔇 Warnings configurados para salida limpia")
 
 def configure_openCV_warnings():
-    """Configurar warnings específicos de OpenCV"""
-    try:
-        import cv2
-        # Manejar diferentes versiones de OpenCV
-        if hasattr(cv2, 'setLogLevel'):
-            if hasattr(cv2, 'LOG_LEVEL_SILENT'):
-                cv2.setLogLevel(cv2.LOG_LEVEL_SILENT)
-            elif hasattr(cv2, 'LOG_LEVEL_ERROR'):
-                cv2.setLogLevel(cv2.LOG_LEVEL_ERROR)
-            else:
-                # Para versiones más antiguas, usar logging
-                import logging
-                logging.getLogger('cv2').setLevel(logging.ERROR)
-        print("🔇 Warnings de OpenCV suprimidos")
-    except ImportError:
-        pass
-    except Exception as e:
-        print(f"⚠️ No se pudieron suprimir warnings de OpenCV: {e}")
+    """Configurar warnings específicos de OpenCV (sin importar cv2)"""
+    # OpenCV lee el nivel de log de esta variable al cargarse
+    os.environ.setdefault('OPENCV_LOG_LEVEL', 'SILENT')
+    logging.getLogger('cv2').setLevel(logging.ERROR)
+    print("🔇 Warnings de OpenCV suprimidos")
 
 def configure_tensorflow_warnings():
-    """Configurar warnings específicos de TensorFlow"""
-    try:
-        import tensorflow as tf
-        # Configurar TensorFlow para ser menos verboso
-        tf.get_logger().setLevel(logging.ERROR)
-        print("🔇 Warnings de TensorFlow suprimidos")
-    except ImportError:
-        pass 
\ No newline at end of file
+    """Configurar warnings específicos de TensorFlow (sin importar tensorflow)"""
+    # tf.get_logger() es el logger "tensorflow" del módulo logging
+    logging.getLogger('tensorflow').setLevel(logging.ERROR)
+    print("🔇 Warnings de TensorFlow suprimidos") 
\ No newline at end of file